@@ -1,166 +1,215 @@
 import os
-import uuid
-import threading
-import subprocess
+import json
+import time
 import glob
-from flask import Flask, session, request, redirect, render_template, url_for, jsonify, send_from_directory
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
+import hashlib
+import importlib
+import threading
+from functools import partial
+from flask import Flask, session, request, redirect, render_template, url_for, jsonify, send_from_directory, Response, stream_with_context
 from spotipy.cache_handler import FlaskSessionCacheHandler
-import pandas as pd
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyOauthError
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from src.data import extract_track_info, get_audio_features, get_artist_genres
-from src.analysis import (
-    generate_statistics, analyze_genres, find_exact_duplicates, 
-    find_different_versions, generate_taste_profile # Ditambahkan
-)
+from src.auth import SCOPE, new_client, new_oauth, client_for_token
+from src.fetcher import fetch_all_items, call_with_backoff
+from src.downloader import download_tracks, download_store, zip_members
+from src.zipstream import ZipPlan, ZipStream
+from src.tasks import task_store
+from src.config import get_config_value
+from src.jobs import scheduler, QuotaExceeded, JobCancelled, PRIORITY_TRACK, PRIORITY_DOWNLOAD, PRIORITY_ANALYSIS
+from src.cache import audio_features_cache, artist_genres_cache, analysis_results_cache
+from src.metrics import registry, span, task_trace, record_task
+from src.database import init_db, get_track_summaries, get_source_incidence, get_result_rows, count_result_rows, has_result_set
+from src.results import SECTIONS, store_result
+
+# Modul analisis (pandas, scikit-learn, scipy, fuzzywuzzy) tidak diimpor saat start-up:
+# fungsi tugas mengimpornya saat pertama dibutuhkan, dan create_app bisa memanaskannya
+# di thread latar ([App] prewarm) agar tugas pertama tidak menanggung biayanya.
+PREWARM_MODULES = ('src.data', 'src.analysis', 'src.overlap', 'src.neighbors', 'sklearn.neighbors')
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 DOWNLOAD_FOLDER = os.path.join(app.root_path, 'static', 'downloads')
-os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+PROFILE_FOLDER = os.path.join(app.root_path, get_config_value('Metrics', 'profile_dir', type='str'))
 
 cache_handler = FlaskSessionCacheHandler(session)
-sp_oauth = SpotifyOAuth(
-    client_id=os.getenv("SPOTIPY_CLIENT_ID"),
-    client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"),
-    redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"),
-    scope='user-library-read user-top-read',
-    cache_handler=cache_handler,
-    show_dialog=True
-)
+sp_oauth = new_oauth(scope=SCOPE, cache_handler=cache_handler, show_dialog=True)
+
+_startup_lock = threading.Lock()
+_started = False
+
+def prewarm():
+    for module in PREWARM_MODULES:
+        importlib.import_module(module)
+
+def create_app():
+    # Langkah start-up eksplisit dan idempoten: skema database, folder download, dan
+    # pemanasan modul analisis. Server WSGI bisa memakai `app:create_app()`; dengan
+    # `app:app` langkah ini dijalankan otomatis sebelum request pertama.
+    global _started
+    with _startup_lock:
+        if not _started:
+            init_db()
+            os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+            if get_config_value('App', 'prewarm'):
+                threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+            _started = True
+    return app
 
-tasks = {}
+@app.before_request
+def ensure_started():
+    if not _started:
+        create_app()
 
 def get_spotify_client():
     if not sp_oauth.validate_token(cache_handler.get_cached_token()):
         return None
-    return spotipy.Spotify(auth_manager=sp_oauth)
+    return new_client(auth_manager=sp_oauth)
 
-def run_analysis_task(task_id, analysis_type, playlist_url):
-    try:
-        tasks[task_id]['status'] = 'running'
-        tasks[task_id]['progress'] = 10
-        tasks[task_id]['message'] = 'Mengautentikasi & mengambil data...'
-        token_info = tasks[task_id]['token_info']
-        thread_auth_manager = SpotifyOAuth(client_id=os.getenv("SPOTIPY_CLIENT_ID"), client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"), redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"), scope='user-library-read user-top-read', show_dialog=True)
-        if sp_oauth.is_token_expired(token_info):
-            token_info = thread_auth_manager.refresh_access_token(token_info['refresh_token'])
-        sp_thread_client = spotipy.Spotify(auth=token_info['access_token'], requests_timeout=20, retries=3)
-        
-        df = pd.DataFrame()
-        # ... (Logika fetch data tetap sama) ...
-        if analysis_type == 'liked_songs':
-            results = sp_thread_client.current_user_saved_tracks(limit=50)
-            tracks_raw = results['items']
-            while results['next']:
-                results = sp_thread_client.next(results)
-                tracks_raw.extend(results['items'])
-            df = extract_track_info(tracks_raw)
-        elif analysis_type == 'playlist':
-            import re
-            match = re.search(r'playlist/([a-zA-Z0-9]+)', playlist_url)
-            if match:
-                playlist_id = match.group(1)
-                results = sp_thread_client.playlist_tracks(playlist_id, limit=100)
-                tracks_raw = results['items']
-                while results['next']:
-                    results = sp_thread_client.next(results)
-                    tracks_raw.extend(results['items'])
-                df = extract_track_info(tracks_raw)
-
-        if df.empty: raise ValueError("Gagal mengambil data lagu.")
-        
-        tasks[task_id]['progress'] = 50
-        tasks[task_id]['message'] = 'Menganalisis fitur audio...'
-        df = get_audio_features(sp_thread_client, df)
-        
-        tasks[task_id]['progress'] = 75
-        tasks[task_id]['message'] = 'Menghitung statistik...'
-        artist_genre_map = get_artist_genres(sp_thread_client, df['artist_ids'].tolist())
-        stats = generate_statistics(df)
-        profile = generate_taste_profile(df) # <-- DITAMBAHKAN KEMBALI
-        genres = analyze_genres(df, artist_genre_map)
-        duplicates = find_exact_duplicates(df)
-        versions = find_different_versions(df)
-
-        tasks[task_id]['progress'] = 90
-        tasks[task_id]['message'] = 'Menyelesaikan...'
-        stats['top_artists'] = stats['top_artists'].to_dict()
-        stats['top_years'] = stats['top_years'].to_dict()
-        tasks[task_id]['result'] = {
-            'type': 'analysis', 'data': { 'stats': stats, 'profile': profile, 'genres': genres, 'duplicates': duplicates.to_dict('records'), 'versions': versions.to_dict('records')}
-        }
-        tasks[task_id]['status'] = 'complete'
-
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        tasks[task_id]['status'] = 'failed'; tasks[task_id]['message'] = str(e)
-
-def run_download_task(task_id, spotify_url, format, quality):
-    try:
-        token_info = tasks[task_id]['token_info']
-        sp_thread_client = spotipy.Spotify(auth=token_info['access_token'])
-        
-        tasks[task_id]['status'] = 'running'
-        tasks[task_id]['progress'] = 5
-        tasks[task_id]['message'] = 'Mengambil daftar lagu...'
-
-        import re
-        tracks_to_download = []
-        if 'track' in spotify_url:
-            track = sp_thread_client.track(spotify_url)
-            tracks_to_download.append({'name': track['name'], 'url': track['external_urls']['spotify']})
-        elif 'playlist' in spotify_url or 'album' in spotify_url:
-            if 'playlist' in spotify_url:
-                results = sp_thread_client.playlist_tracks(spotify_url)
-            else: # Album
-                results = sp_thread_client.album_tracks(spotify_url)
+def profile_path(task_id):
+    return os.path.join(PROFILE_FOLDER, f"{task_id}.txt")
+
+def task_tracing(task_id, kind, profile):
+    interval = get_config_value('Metrics', 'profile_interval_ms', type='float') / 1000
+    return task_trace(kind, profile_path(task_id) if profile else None, interval)
+
+def finish_task(task_id, kind, trace, status, **fields):
+    # Status akhir selalu membawa rincian waktu per tahap (timings).
+    record_task(kind, status, trace)
+    task_store.update(task_id, status=status, timings=trace.summary(), **fields)
+
+def compute_overlap(task_id, sp_client):
+    # Semua playlist user + Liked Songs: sinkronkan ke database, lalu hitung tumpang-tindihnya.
+    from src.data import sync_user_sources
+    from src.overlap import overlap_analysis
+
+    def on_progress(done, total):
+        task_store.update(task_id, progress=10 + int(60 * done / total), message=f'Menyinkronkan playlist {done}/{total}...')
+
+    with span('analysis.fetch_tracks'):
+        sources = sync_user_sources(sp_client, call_with_backoff(sp_client, sp_client.me)['id'], on_progress=on_progress, cancelled=partial(scheduler.is_cancelled, task_id))
+    scheduler.raise_if_cancelled(task_id)
+    if not sources: raise ValueError("Tidak ada playlist yang bisa dianalisis.")
+
+    task_store.update(task_id, progress=75, message='Menghitung tumpang-tindih playlist...')
+    with span('analysis.compute'):
+        memberships, tracks, edges = get_source_incidence([source_id for source_id, _ in sources])
+        return scheduler.run_cpu(overlap_analysis, sources, memberships, tracks, edges)
+
+def run_analysis_task(task_id, token_info, analysis_type, playlist_url, profile=False):
+    with task_tracing(task_id, 'analysis', profile) as trace:
+        try:
+            task_store.update(task_id, status='running', progress=10, message='Mengautentikasi & mengambil data...', profiled=profile or None)
+            sp_thread_client = client_for_token(token_info)
+            from src.data import get_all_liked_tracks, get_tracks_from_playlist, get_artist_genres
+            from src.tracks import TrackTable
+            from src.analysis import analyze_library, analysis_cache_key
+
+            if analysis_type == 'overlap':
+                data = compute_overlap(task_id, sp_thread_client)
+                finish_task(task_id, 'analysis', trace, 'complete', result=store_result(task_id, 'overlap', data), progress=100)
+                return
             
-            for item in results['items']:
-                track = item if 'playlist' in spotify_url else item
-                if track and track.get('name'):
-                    tracks_to_download.append({'name': track['name'], 'url': track['external_urls']['spotify']})
-            while results['next']:
-                results = sp_thread_client.next(results)
-                for item in results['items']:
-                    track = item if 'playlist' in spotify_url else item
-                    if track and track.get('name'):
-                        tracks_to_download.append({'name': track['name'], 'url': track['external_urls']['spotify']})
-        
-        if not tracks_to_download:
-            raise ValueError("Tidak ada lagu yang ditemukan dari URL.")
-
-        tasks[task_id]['result'] = {
-            'type': 'download_queue',
-            'tracks': [{'name': t['name'], 'status': 'Menunggu'} for t in tracks_to_download]
-        }
-        tasks[task_id]['message'] = f'Antrean siap: {len(tracks_to_download)} lagu.'
-        tasks[task_id]['progress'] = 10
-
-        for i, track in enumerate(tracks_to_download):
-            tasks[task_id]['result']['tracks'][i]['status'] = 'Mengunduh...'
-            tasks[task_id]['message'] = f'Mengunduh lagu {i+1}/{len(tracks_to_download)}: {track["name"]}'
+            tracks = TrackTable.empty_table()
+            with span('analysis.fetch_tracks'):
+                if analysis_type == 'liked_songs':
+                    user_id = call_with_backoff(sp_thread_client, sp_thread_client.me)['id']
+                    tracks = get_all_liked_tracks(sp_thread_client, user_id)
+                elif analysis_type == 'playlist':
+                    import re
+                    match = re.search(r'playlist/([a-zA-Z0-9]+)', playlist_url)
+                    if match:
+                        playlist_id = match.group(1)
+                        tracks = get_tracks_from_playlist(playlist_id, sp_thread_client)
+
+            if tracks.empty: raise ValueError("Gagal mengambil data lagu.")
+            scheduler.raise_if_cancelled(task_id)
+            
+            # Isi sumber yang sama dengan pengaturan yang sama memberi hasil yang sama: cache
+            # menyimpan ringkasan hasil, bagian-bagiannya tersimpan dengan result_id = kunci cache.
+            cache_key = analysis_cache_key(tracks)
+            result = analysis_results_cache.get_many([cache_key]).get(cache_key)
+            if result is None or not has_result_set(cache_key):
+                task_store.update(task_id, progress=50, message='Mengambil genre artis...')
+                with span('analysis.artist_genres'):
+                    artist_genre_map = get_artist_genres(sp_thread_client, tracks.artist_ids())
+                scheduler.raise_if_cancelled(task_id)
+
+                task_store.update(task_id, progress=75, message='Menghitung statistik...')
+                with span('analysis.compute'):
+                    data = scheduler.run_cpu(analyze_library, tracks, artist_genre_map)
+                scheduler.raise_if_cancelled(task_id)
+                result = store_result(cache_key, 'analysis', data)
+                analysis_results_cache.put_many({cache_key: result})
+
+            finish_task(task_id, 'analysis', trace, 'complete', result=result, progress=100)
+
+        except JobCancelled:
+            finish_task(task_id, 'analysis', trace, 'cancelled', message='Tugas dibatalkan.')
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            finish_task(task_id, 'analysis', trace, 'failed', message=str(e))
+
+def run_download_task(task_id, token_info, spotify_url, format, quality, profile=False):
+    with task_tracing(task_id, 'download', profile) as trace:
+        try:
+            sp_thread_client = client_for_token(token_info)
             
-            cmd = ["spotdl", track['url'], "--output", DOWNLOAD_FOLDER, "--format", format]
-            if format in ["mp3", "m4a"] and quality != "best":
-                cmd.extend(["--bitrate", quality])
+            task_store.update(task_id, status='running', progress=5, message='Mengambil daftar lagu...', profiled=profile or None)
+
+            tracks_to_download = []
+            with span('download.fetch_tracks'):
+                if 'track' in spotify_url:
+                    track = call_with_backoff(sp_thread_client, sp_thread_client.track, spotify_url)
+                    tracks_to_download.append({'name': track['name'], 'url': track['external_urls']['spotify']})
+                elif 'playlist' in spotify_url or 'album' in spotify_url:
+                    if 'playlist' in spotify_url:
+                        fetch_page, limit = partial(sp_thread_client.playlist_tracks, spotify_url), 100
+                    else: # Album
+                        fetch_page, limit = partial(sp_thread_client.album_tracks, spotify_url), 50
+                    
+                    for item in fetch_all_items(sp_thread_client, fetch_page, limit):
+                        track = item.get('track') if item and 'playlist' in spotify_url else item
+                        if track and track.get('name'):
+                            tracks_to_download.append({'name': track['name'], 'url': track['external_urls']['spotify']})
             
-            subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            tasks[task_id]['result']['tracks'][i]['status'] = 'Selesai'
+            if not tracks_to_download:
+                raise ValueError("Tidak ada lagu yang ditemukan dari URL.")
+
+            task_store.update(
+                task_id, progress=10, message=f'Antrean siap: {len(tracks_to_download)} lagu.',
+                result={'type': 'download_queue', 'tracks': [{'name': t['name'], 'status': 'Menunggu'} for t in tracks_to_download]}
+            )
 
-        tasks[task_id]['status'] = 'complete'
-        tasks[task_id]['message'] = 'Semua download selesai!'
+            total = len(tracks_to_download)
+            def on_update(i, status, error, throughput_tpm, **fields):
+                task = task_store.update_track(task_id, i, status=status, **({'error': error} if error else {}), **fields)
+                done = sum(t['status'] in ('Selesai', 'Gagal') for t in task['result']['tracks'])
+                task_store.update(task_id, throughput_tpm=throughput_tpm, message=f'Mengunduh lagu {done}/{total}: {tracks_to_download[i]["name"]}')
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        tasks[task_id]['status'] = 'failed'; tasks[task_id]['message'] = str(e)
+            with span('download.tracks'):
+                summary = download_tracks(tracks_to_download, DOWNLOAD_FOLDER, format, quality, on_update, cancelled=partial(scheduler.is_cancelled, task_id))
+            scheduler.raise_if_cancelled(task_id)
 
+            if summary['failed']:
+                message = f"Download selesai: {summary['completed']} berhasil, {summary['failed']} gagal."
+            else:
+                message = 'Semua download selesai!'
+            if summary['cached']:
+                message += f" ({summary['cached']} lagu sudah tersedia sebelumnya)"
+            finish_task(task_id, 'download', trace, 'complete', progress=100, message=message, throughput_tpm=summary['throughput_tpm'])
+
+        except JobCancelled:
+            finish_task(task_id, 'download', trace, 'cancelled', message='Download dibatalkan.')
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            finish_task(task_id, 'download', trace, 'failed', message=str(e))
 
 # ... (Semua rute dari @app.route('/') hingga akhir tetap sama persis) ...
 @app.route('/')
@@ -168,14 +217,18 @@ def index():
     sp = get_spotify_client()
     if not sp: return redirect(url_for('login'))
     user = None
-    try: user = sp.current_user()
-    except: session.clear(); sp = None
+    try: user = call_with_backoff(sp, sp.current_user)
+    except (SpotifyException, SpotifyOauthError) as e:
+        # Hanya token yang ditolak mengakhiri sesi; rate limit (429) atau gangguan API
+        # sementara (5xx) yang tetap gagal setelah backoff tidak membuat user logout.
+        if isinstance(e, SpotifyOauthError) or e.http_status in (400, 401, 403):
+            session.clear(); sp = None
     return render_template('index.html', user_logged_in=bool(sp), user=user)
 @app.route('/downloader')
 def downloader():
     sp = get_spotify_client()
     if not sp: return redirect(url_for('login'))
-    user = sp.current_user()
+    user = call_with_backoff(sp, sp.current_user)
     return render_template('downloader.html', user=user)
 @app.route('/login')
 def login(): return redirect(sp_oauth.get_authorize_url())
@@ -183,34 +236,249 @@ def login(): return redirect(sp_oauth.get_authorize_url())
 def logout(): session.clear(); return redirect(url_for('index'))
 @app.route('/callback')
 def callback(): sp_oauth.get_access_token(request.args.get('code')); return redirect(url_for('index'))
+def current_user_id(sp):
+    if 'user_id' not in session:
+        session['user_id'] = call_with_backoff(sp, sp.current_user)['id']
+    return session['user_id']
+
+def wants_profile():
+    # Profiler sampling per tugas: ?profile=1 / field form profile=1, atau semua tugas bila profile_tasks = 1.
+    return request.values.get('profile') == '1' or bool(get_config_value('Metrics', 'profile_tasks'))
+
+def submit_task(sp, kind, fn, *args, priority):
+    user_id = current_user_id(sp)
+    task_id = task_store.create(kind=kind, user_id=user_id, message='Menunggu giliran...')
+    try:
+        scheduler.submit(task_id, fn, task_id, sp_oauth.get_cached_token(), *args, user=user_id, priority=priority)
+    except QuotaExceeded as e:
+        task_store.update(task_id, status='failed', message=str(e))
+        return str(e), 429
+    return redirect(url_for('loading', task_id=task_id))
+
 @app.route('/start_analysis', methods=['POST'])
 def start_analysis():
     sp = get_spotify_client()
     if not sp: return redirect(url_for('login'))
-    task_id = str(uuid.uuid4())
-    tasks[task_id] = {'token_info': sp_oauth.get_cached_token()}
-    thread = threading.Thread(target=run_analysis_task, args=(task_id, request.form.get('analysis_type'), request.form.get('playlist_url', '')))
-    thread.start()
-    return redirect(url_for('loading', task_id=task_id))
+    return submit_task(sp, 'analysis', run_analysis_task, request.form.get('analysis_type'), request.form.get('playlist_url', ''), wants_profile(), priority=PRIORITY_ANALYSIS)
 @app.route('/start_download', methods=['POST'])
 def start_download():
     sp = get_spotify_client()
     if not sp: return redirect(url_for('login'))
-    task_id = str(uuid.uuid4())
-    tasks[task_id] = {'token_info': sp_oauth.get_cached_token()}
-    thread = threading.Thread(target=run_download_task, args=(task_id, request.form.get('spotify_url'), request.form.get('format'), request.form.get('quality')))
-    thread.start()
-    return redirect(url_for('loading', task_id=task_id))
+    spotify_url = request.form.get('spotify_url') or ''
+    # Download satu lagu tidak perlu menunggu di belakang playlist/album atau analisis penuh.
+    priority = PRIORITY_DOWNLOAD if 'playlist' in spotify_url or 'album' in spotify_url else PRIORITY_TRACK
+    return submit_task(sp, 'download', run_download_task, spotify_url, request.form.get('format'), request.form.get('quality'), wants_profile(), priority=priority)
+@app.route('/cancel/<task_id>', methods=['POST'])
+def cancel(task_id):
+    task = task_store.get(task_id)
+    if not task or task.get('user_id') != session.get('user_id'):
+        return jsonify({'error': 'Tugas tidak ditemukan.'}), 404
+    state = scheduler.cancel(task_id)
+    if state is None:
+        return jsonify({'error': 'Tugas sudah selesai.'}), 409
+    if state == 'queued':
+        task_store.update(task_id, status='cancelled', message='Tugas dibatalkan.')
+    return jsonify({'cancelled': True})
+@app.route('/jobs/metrics')
+def jobs_metrics(): return jsonify(scheduler.metrics())
+@app.route('/cache/metrics')
+def cache_metrics():
+    caches = (audio_features_cache, artist_genres_cache, analysis_results_cache)
+    metrics = {cache.table: cache.stats() for cache in caches}
+    from src.neighbors import feature_index
+    metrics['feature_index'] = feature_index.stats()
+    metrics['download_store'] = download_store.stats()
+    return jsonify(metrics)
+@app.route('/metrics')
+def prometheus_metrics():
+    jobs = scheduler.metrics()
+    caches = (audio_features_cache, artist_genres_cache, analysis_results_cache)
+    extra = {
+        'jobs_queue_depth': ('gauge', [({}, jobs['queue_depth'])]),
+        'jobs_running': ('gauge', [({}, jobs['running'])]),
+        'jobs_oldest_queued_seconds': ('gauge', [({}, jobs['oldest_queued_seconds'])]),
+        'cache_hits_total': ('counter', [({'cache': c.table}, c.stats()['hits']) for c in caches]),
+        'cache_misses_total': ('counter', [({'cache': c.table}, c.stats()['misses']) for c in caches]),
+    }
+    return Response(registry.render(extra), mimetype='text/plain; version=0.0.4')
+@app.route('/profile/<task_id>')
+def task_profile(task_id):
+    # Stack "collapsed" dari profiler sampling (bisa langsung dipakai flamegraph.pl / speedscope).
+    task = task_store.get(task_id)
+    if not task or task.get('user_id') != session.get('user_id') or not os.path.exists(profile_path(task_id)):
+        return "Profil tidak ditemukan.", 404
+    return send_from_directory(PROFILE_FOLDER, f"{task_id}.txt", mimetype='text/plain')
+@app.route('/similar')
+def similar():
+    # Lagu paling mirip (audio features) dengan ?track_id=..., atau dengan profil selera
+    # ?playlist_id=... / Liked Songs user, dari seluruh lagu yang ada di cache.
+    sp = get_spotify_client()
+    if not sp: return redirect(url_for('login'))
+    from src.neighbors import feature_index
+    k = max(1, min(request.args.get('k', get_config_value('Neighbors', 'default_k'), type=int), get_config_value('Neighbors', 'max_k')))
+    started = time.perf_counter()
+    track_id = request.args.get('track_id')
+    if track_id:
+        query = {'track_id': track_id}
+        neighbors = feature_index.similar_to_track(track_id, k)
+    else:
+        playlist_id = request.args.get('playlist_id')
+        source_id = f"playlist_{playlist_id}" if playlist_id else f"liked_songs_{current_user_id(sp)}"
+        profile, neighbors = feature_index.similar_to_source(source_id, k)
+        query = {'source_id': source_id, 'taste_profile': profile}
+    if neighbors is None:
+        return jsonify({'error': 'Lagu tidak ada di cache atau belum punya audio features.'}), 404
+    summaries = get_track_summaries([tid for tid, _ in neighbors])
+    tracks = [dict(summaries.get(tid, {'spotify_id': tid}), distance=round(distance, 4)) for tid, distance in neighbors]
+    return jsonify({'query': query, 'tracks': tracks, 'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)})
 @app.route('/loading/<task_id>')
 def loading(task_id): return render_template('loading.html', task_id=task_id)
 @app.route('/status/<task_id>')
-def status(task_id): return jsonify(tasks.get(task_id, {}))
+def status(task_id):
+    # Tanpa ?since: seluruh status tugas. Dengan ?since=<seq>: long-polling, menunggu
+    # sampai ada event baru (atau batas waktu) lalu mengembalikan delta saja.
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify(task_store.get(task_id) or {})
+    deadline = time.monotonic() + get_config_value('Tasks', 'longpoll_seconds')
+    interval = get_config_value('Tasks', 'poll_interval', type='float')
+    events = task_store.events_since(task_id, since)
+    while not events and time.monotonic() < deadline:
+        time.sleep(interval)
+        events = task_store.events_since(task_id, since)
+    return jsonify({'seq': events[-1][0] if events else since, 'events': [payload for _, payload in events]})
+@app.route('/events/<task_id>')
+def events(task_id):
+    # Server-Sent Events: snapshot awal lalu delta per perubahan. Klien yang tersambung
+    # ulang mengirim Last-Event-ID sehingga hanya event yang terlewat yang dikirim.
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    interval = get_config_value('Tasks', 'poll_interval', type='float')
+
+    def stream():
+        task = task_store.get(task_id)
+        if task is None:
+            yield 'event: missing\ndata: {}\n\n'
+            return
+        seq = last_id
+        if seq is None:
+            seq = task['seq']
+            yield f"id: {seq}\nevent: snapshot\ndata: {json.dumps(task)}\n\n"
+            if task.get('status') in ('complete', 'failed', 'cancelled'):
+                return
+        idle = 0.0
+        while True:
+            for seq, payload in task_store.events_since(task_id, seq):
+                idle = 0.0
+                yield f"id: {seq}\ndata: {json.dumps(payload)}\n\n"
+                if payload.get('status') in ('complete', 'failed', 'cancelled'):
+                    return
+            time.sleep(interval)
+            idle += interval
+            if idle >= 15:
+                idle = 0.0
+                if task_store.get(task_id) is None:
+                    return
+                yield ': keep-alive\n\n'
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+def finished_result(task_id):
+    task = task_store.get(task_id) or {}
+    result = task.get('result') or {}
+    if task.get('status') != 'complete' or task.get('user_id') != session.get('user_id'):
+        return None
+    if result.get('type') not in SECTIONS or 'result_id' not in result:
+        return None
+    return result
 @app.route('/results/<task_id>')
 def results(task_id):
-    task = tasks.get(task_id, {})
-    if task.get('status') != 'complete' or task.get('result', {}).get('type') != 'analysis':
+    # Halaman hanya berisi ringkasan; bagian-bagian hasil dimuat browser lewat API di bawah.
+    result = finished_result(task_id)
+    if result is None:
         return "Tugas belum selesai atau bukan hasil analisis.", 404
-    return render_template('results.html', **task.get('result', {}).get('data', {}))
+    template = 'overlap.html' if result['type'] == 'overlap' else 'results.html'
+    return render_template(template, task_id=task_id, sections=result['sections'], **result['summary'])
+@app.route('/results/<task_id>/<section>')
+def result_section(task_id, section):
+    # Item satu bagian hasil per halaman: ?cursor=<posisi terakhir>&limit=&q=<filter teks>.
+    # JSON {items, next_cursor, total}; ?format=ndjson mengalirkan semua item sisanya,
+    # satu JSON per baris. Item sudah tersimpan sebagai JSON sehingga tidak di-encode ulang.
+    result = finished_result(task_id)
+    if result is None or section not in result['sections']:
+        return jsonify({'error': 'Hasil tidak ditemukan.'}), 404
+    cursor = request.args.get('cursor', -1, type=int)
+    query = request.args.get('q', '').strip()
+    max_limit = get_config_value('Results', 'max_page_size')
+    result_id = result['result_id']
+
+    if request.args.get('format') == 'ndjson':
+        def stream(after):
+            while True:
+                rows = get_result_rows(result_id, section, after, max_limit, query)
+                if rows:
+                    yield ''.join(data + '\n' for _, data in rows)
+                if len(rows) < max_limit:
+                    return
+                after = rows[-1][0]
+        return Response(stream_with_context(stream(cursor)), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+    limit = max(1, min(request.args.get('limit', get_config_value('Results', 'page_size'), type=int), max_limit))
+    rows = get_result_rows(result_id, section, cursor, limit + 1, query)
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    items = ', '.join(data for _, data in rows[:limit])
+    # total mengikuti filter q agar cocok dengan item yang bisa dipaging klien.
+    total = count_result_rows(result_id, section, query) if query else result['sections'][section]
+    body = f'{{"items": [{items}], "next_cursor": {json.dumps(next_cursor)}, "total": {total}}}'
+    return Response(body, mimetype='application/json')
 @app.route('/download_file/<filename>')
-def download_file(filename): return send_from_directory(DOWNLOAD_FOLDER, filename, as_attachment=True)
-if __name__ == '__main__': app.run(debug=True, port=8888)
\ No newline at end of file
+def download_file(filename):
+    # File di penyimpanan download bernama <sha256>.<ext>; ?name= memberi nama asli dari spotdl.
+    return send_from_directory(DOWNLOAD_FOLDER, filename, as_attachment=True, download_name=request.args.get('name') or filename)
+@app.route('/download_zip/<task_id>')
+def download_zip(task_id):
+    # ZIP (tanpa kompresi) berisi lagu yang sudah selesai diunduh, dikirim sambil dibentuk.
+    # Tugas yang sudah berakhir: panjang arsip diketahui di muka sehingga Range/resume didukung.
+    # Tugas yang masih berjalan: lagu yang sudah selesai langsung dikirim, sisanya menyusul
+    # begitu selesai, dan direktori ZIP ditulis setelah antrean berakhir.
+    task = task_store.get(task_id)
+    if not task or task.get('user_id') != session.get('user_id') or (task.get('result') or {}).get('type') != 'download_queue':
+        return "Tugas download tidak ditemukan.", 404
+    chunk_size = get_config_value('Download', 'zip_chunk_kb') * 1024
+    headers = {'Content-Disposition': f'attachment; filename="spotify-{task_id[:8]}.zip"', 'X-Accel-Buffering': 'no'}
+    # Lagu yang muncul dua kali di antrean (file yang sama) hanya dimasukkan sekali.
+    done = lambda t: list({track['file']: track for track in t['result']['tracks'] if track.get('file')}.values())
+
+    if task.get('status') in ('complete', 'failed', 'cancelled'):
+        plan = ZipPlan(zip_members(DOWNLOAD_FOLDER, done(task), set()))
+        etag = hashlib.sha1(repr([(m.name, m.path, m.size, m.crc32) for m in plan.members]).encode()).hexdigest()
+        start, stop, code = 0, plan.length, 200
+        if request.range and len(request.range.ranges) == 1 and ('If-Range' not in request.headers or request.if_range.etag == etag):
+            bounds = request.range.range_for_length(plan.length)
+            if bounds is None:
+                return Response(status=416, headers={'Content-Range': f'bytes */{plan.length}'})
+            (start, stop), code = bounds, 206
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{plan.length}'
+        response = Response(stream_with_context(plan.iter_range(start, stop, chunk_size)), code, mimetype='application/zip', headers=headers)
+        response.content_length = stop - start
+        response.accept_ranges = 'bytes'
+        response.set_etag(etag)
+        return response
+
+    interval = get_config_value('Tasks', 'poll_interval', type='float')
+
+    def follow():
+        archive, names, sent = ZipStream(chunk_size), set(), set()
+        while True:
+            task = task_store.get(task_id)
+            if task is None:
+                break
+            ready = [t for t in done(task) if t['file'] not in sent]
+            sent.update(t['file'] for t in ready)
+            for member in zip_members(DOWNLOAD_FOLDER, ready, names):
+                yield from archive.add(member)
+            if task.get('status') in ('complete', 'failed', 'cancelled'):
+                break
+            time.sleep(interval)
+        yield archive.finish()
+
+    return Response(stream_with_context(follow()), mimetype='application/zip', headers=headers)
+if __name__ == '__main__': create_app().run(debug=True, port=8888)
\ No newline at end of file
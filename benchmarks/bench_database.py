@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from src import database
+from src.data import extract_track_info
+from benchmarks.synthetic import generate_library, generate_audio_features
+
+def _legacy_save(source_id, table):
+    # Implementasi lama save_tracks_to_db (iterrows + execute per baris), sebagai pembanding.
+    df = table.to_frame()
+    with database.get_db_connection() as conn:
+        cursor = conn.cursor()
+        for _, row in df.iterrows():
+            track_data = {col: row.get(src) for col, src in database.TRACK_COLUMNS.items()}
+            columns = ', '.join(track_data.keys())
+            placeholders = ', '.join(['?'] * len(track_data))
+            cursor.execute(f"INSERT OR REPLACE INTO tracks ({columns}) VALUES ({placeholders})", list(track_data.values()))
+            if 'artist_ids' in row and 'artists_list' in row and isinstance(row['artist_ids'], list):
+                for artist_id, artist_name in zip(row['artist_ids'], row['artists_list']):
+                    cursor.execute("INSERT OR IGNORE INTO artists (id, name) VALUES (?, ?)", (artist_id, artist_name))
+                    cursor.execute("INSERT OR IGNORE INTO track_artists (track_id, artist_id) VALUES (?, ?)", (row['spotify_id'], artist_id))
+            cursor.execute("INSERT OR REPLACE INTO source_tracks (source_id, track_id, added_at) VALUES (?, ?, ?)", (source_id, row['spotify_id'], row['added_at']))
+        cursor.execute("INSERT OR REPLACE INTO cache_log (source_id, last_fetched) VALUES (?, ?)", (source_id, datetime.now().isoformat()))
+        conn.commit()
+
+def _library_table(n):
+    table = extract_track_info(generate_library(n))
+    return table.with_features(generate_audio_features(table.tracks['spotify_id'].tolist()))
+
+def _timed(writer, table, workdir, name):
+    database.DB_FILE = os.path.join(workdir, f"{name}.db")
+    database.init_db()
+    start = time.perf_counter()
+    writer('liked_songs', table)
+    return time.perf_counter() - start
+
+def run(sizes):
+    print(f"{'tracks':>8} {'writer':>8} {'seconds':>9} {'rows/s':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            table = _library_table(n)
+            for name, writer in (('legacy', _legacy_save), ('bulk', database.save_tracks_to_db)):
+                elapsed = _timed(writer, table, workdir, f"{name}_{n}")
+                print(f"{n:>8} {name:>8} {elapsed:>9.3f} {n / elapsed:>10.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark save_tracks_to_db: loop per baris vs executemany.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,65 @@
+import argparse
+import os
+import tempfile
+import time
+
+from src import database
+from src.cache import audio_features_cache, artist_genres_cache
+from src.data import extract_track_info
+from src.fetcher import fetch_tracks_pipelined
+from benchmarks.fake_spotify import FakeSpotify
+from benchmarks.synthetic import generate_library
+
+def _legacy_fetch(sp):
+    # Paging berurutan dengan sp.next lalu lookup fitur/genre per batch setelah paging selesai.
+    results = sp.current_user_saved_tracks(limit=50)
+    tracks_raw = results['items']
+    while results['next']:
+        results = sp.next(results)
+        tracks_raw.extend(results['items'])
+    table = extract_track_info(tracks_raw)
+    ids = table.tracks['spotify_id'].unique().tolist()
+    for i in range(0, len(ids), 100):
+        sp.audio_features(ids[i:i+100])
+    artist_ids = table.artist_ids()
+    for i in range(0, len(artist_ids), 50):
+        sp.artists(artist_ids[i:i+50])
+    return len(table)
+
+def _reset_cache(workdir, name):
+    database.DB_FILE = os.path.join(workdir, f"{name}.db")
+    database.init_db()
+    audio_features_cache.clear()
+    artist_genres_cache.clear()
+
+def _pipelined_fetch(sp):
+    fetched = fetch_tracks_pipelined(sp, sp.current_user_saved_tracks, limit=50)
+    return len(extract_track_info(fetched['items']))
+
+def run(sizes, latency, rate_limit_ratio):
+    print(f"{'tracks':>8} {'fetcher':>16} {'seconds':>9} {'api calls':>10} {'429s':>6}")
+    workdir = tempfile.mkdtemp()
+    for n in sizes:
+        library = generate_library(n)
+        _reset_cache(workdir, f"fetch_{n}")
+        # Run kedua memakai cache audio features/genre dari run pertama.
+        for name, fetch in (('legacy', _legacy_fetch), ('pipelined', _pipelined_fetch), ('pipelined (warm)', _pipelined_fetch)):
+            with FakeSpotify(library=library, latency=latency, rate_limit_ratio=rate_limit_ratio, retry_after=0) as fake:
+                sp = fake.client(retries=0, status_retries=0)
+                start = time.perf_counter()
+                try:
+                    fetched = fetch(sp)
+                except Exception as e:
+                    print(f"{n:>8} {name:>16} {'gagal':>9} {sum(fake.calls.values()):>10} {sum(fake.rate_limited.values()):>6}  {type(e).__name__}")
+                    continue
+                elapsed = time.perf_counter() - start
+                assert fetched == n, f"{name} mengambil {fetched} dari {n} lagu"
+                print(f"{n:>8} {name:>16} {elapsed:>9.2f} {sum(fake.calls.values()):>10} {sum(fake.rate_limited.values()):>6}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark paging koleksi Spotify terhadap server Spotify palsu.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--latency', type=float, default=0.05, help="Latensi per request (detik).")
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="Proporsi request yang dijawab 429.")
+    args = parser.parse_args()
+    run(args.sizes, args.latency, args.rate_limit_ratio)
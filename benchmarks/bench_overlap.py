@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from itertools import combinations
+
+from src import database
+from src.data import extract_track_info
+from src.overlap import overlap_analysis
+from benchmarks.synthetic import generate_library
+
+# Analisis tumpang-tindih banyak playlist: muat keanggotaan dari database lalu hitung
+# semua pasangan dengan matriks jarang, dibandingkan dengan irisan set per pasangan.
+
+def _populate(n_tracks, n_playlists, mean_size, seed=0):
+    rng = random.Random(seed)
+    table = extract_track_info(generate_library(n_tracks, seed=seed))
+    database.save_tracks_to_db('liked_songs', table)
+    ids = table.tracks['spotify_id'].tolist()
+    playlists = []
+    for p in range(n_playlists):
+        if playlists and rng.random() < 0.05:
+            # Sebagian playlist adalah salinan (hampir) utuh playlist lain.
+            base = rng.choice(playlists)
+            members = base[:max(1, int(len(base) * rng.uniform(0.9, 1.0)))]
+        else:
+            members = rng.sample(ids, min(len(ids), max(1, int(rng.expovariate(1 / mean_size)))))
+        playlists.append(members)
+    with database.get_db_connection() as conn:
+        conn.executemany("INSERT OR IGNORE INTO source_tracks (source_id, track_id, added_at) VALUES (?, ?, '')",
+                         [(f"playlist_{p}", tid) for p, members in enumerate(playlists) for tid in members])
+        conn.commit()
+    return [(f"playlist_{p}", f"Playlist {p}") for p in range(n_playlists)] + [('liked_songs', 'Liked Songs')]
+
+def _per_pair(sources, memberships):
+    sets = {sid: set(group) for sid, group in memberships.groupby('source_id')['track_id']}
+    result = {}
+    for (a, _), (b, _) in combinations(sources, 2):
+        shared = len(sets.get(a, set()) & sets.get(b, set()))
+        if shared:
+            result[(a, b)] = shared
+    return result
+
+def run(n_tracks, n_playlists, mean_size, baseline):
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DB_FILE = os.path.join(workdir, 'overlap.db')
+        database.init_db()
+        sources = _populate(n_tracks, n_playlists, mean_size)
+
+        start = time.perf_counter()
+        memberships, tracks, edges = database.get_source_incidence([sid for sid, _ in sources])
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        result = overlap_analysis(sources, memberships, tracks, edges)
+        compute_s = time.perf_counter() - start
+
+        summary = result['summary']
+        print(f"sumber={summary['sources']} keanggotaan={summary['memberships']} lagu={summary['unique_tracks']} "
+              f"pasangan={summary['overlapping_pairs']} duplikat={len(result['duplicates'])} subset={len(result['subsets'])}")
+        print(f"{'load db':>14} {load_s:>8.3f} s")
+        print(f"{'matriks':>14} {compute_s:>8.3f} s")
+        if baseline:
+            start = time.perf_counter()
+            expected = _per_pair(sources, memberships)
+            print(f"{'set per pasangan':>14} {time.perf_counter() - start:>8.3f} s")
+            names = dict(sources)
+            for pair in result['pairs']:
+                a, b = (sid for sid, name in sources if name in (pair['a'], pair['b']))
+                assert expected.get((a, b), expected.get((b, a))) == pair['shared'], (names[a], names[b])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark analisis tumpang-tindih banyak playlist.")
+    parser.add_argument('--tracks', type=int, default=20000)
+    parser.add_argument('--playlists', type=int, default=200)
+    parser.add_argument('--mean-size', type=int, default=500, help="rata-rata jumlah lagu per playlist")
+    parser.add_argument('--no-baseline', action='store_true', help="lewati pembanding irisan set per pasangan")
+    args = parser.parse_args()
+    run(args.tracks, args.playlists, args.mean_size, not args.no_baseline)
@@ -0,0 +1,50 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import spotipy
+
+from src.auth import new_client
+from src.fetcher import fetch_all_items
+from benchmarks.fake_spotify import FakeSpotify
+from benchmarks.synthetic import generate_library
+
+def _per_call_client(fake):
+    # Pola lama: klien (dan session HTTP) baru untuk setiap halaman.
+    def fetch_page(limit, offset):
+        sp = spotipy.Spotify(auth='fake-token', requests_timeout=20)
+        sp.prefix = fake.prefix
+        return sp.current_user_saved_tracks(limit=limit, offset=offset)
+    return fetch_page
+
+def _pooled_client(fake):
+    sp = new_client(auth='fake-token')
+    sp.prefix = fake.prefix
+    return sp.current_user_saved_tracks
+
+def run(n, latency, concurrency, rounds):
+    library = generate_library(n)
+    print(f"{'client':>10} {'pages':>6} {'seconds':>9} {'ms/page':>8}")
+    with FakeSpotify(library=library, latency=latency) as fake:
+        for name, make in (('per-call', _per_call_client), ('pooled', _pooled_client)):
+            fetch_page = make(fake)
+            sp = new_client(auth='fake-token')
+            sp.prefix = fake.prefix
+            fake.calls.clear()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for _ in range(rounds):
+                    items = fetch_all_items(sp, fetch_page, 50, pool=pool)
+                    assert len(items) == n
+            elapsed = time.perf_counter() - start
+            pages = sum(fake.calls.values())
+            print(f"{name:>10} {pages:>6} {elapsed:>9.2f} {elapsed / pages * 1000 * concurrency:>8.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark klien Spotify per panggilan vs session keep-alive bersama.")
+    parser.add_argument('--tracks', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.0, help="Latensi buatan per request (detik)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    run(args.tracks, args.latency, args.concurrency, args.rounds)
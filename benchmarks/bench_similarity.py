@@ -0,0 +1,44 @@
+import argparse
+import time
+
+from fuzzywuzzy import fuzz
+
+from src.titles import clean_title
+from src.similarity import candidate_pairs, similar_title_pairs
+from benchmarks.synthetic import generate_titles
+
+def _as_set(result):
+    left, right, _ = result
+    return set(zip(left.tolist(), right.tolist()))
+
+def _legacy_pairs(titles, threshold):
+    # Loop O(n^2) lama, dipakai sebagai acuan hasil yang benar.
+    return {
+        (i, j) for i in range(len(titles)) for j in range(i + 1, len(titles))
+        if fuzz.token_set_ratio(titles[i], titles[j]) >= threshold
+    }
+
+def run(sizes, threshold, exhaustive_limit):
+    print(f"{'tracks':>8} {'method':>10} {'candidates':>12} {'pairs':>8} {'seconds':>9} {'recall':>7}")
+    for n in sizes:
+        titles = [clean_title(t) for t in generate_titles(n)]
+        baseline = None
+        methods = (['legacy'] if n <= exhaustive_limit else []) + ['blocking']
+        for method in methods:
+            start = time.perf_counter()
+            if method == 'legacy':
+                pairs = baseline = _legacy_pairs(titles, threshold)
+            else:
+                pairs = _as_set(similar_title_pairs(titles, threshold, method=method))
+            elapsed = time.perf_counter() - start
+            candidates = n * (n - 1) // 2 if method == 'legacy' else len(candidate_pairs(titles, threshold, method=method)[0])
+            recall = f"{len(pairs & baseline) / len(baseline):.4f}" if baseline else '-'
+            print(f"{n:>8} {method:>10} {candidates:>12} {len(pairs):>8} {elapsed:>9.2f} {recall:>7}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pencarian judul mirip (find_similar_titles_enhanced).")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--threshold', type=int, default=85)
+    parser.add_argument('--exhaustive-limit', type=int, default=2000, help="Ukuran maksimum yang masih dibandingkan dengan loop lama (brute force).")
+    args = parser.parse_args()
+    run(args.sizes, args.threshold, args.exhaustive_limit)
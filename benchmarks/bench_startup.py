@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold start aplikasi web: setiap putaran adalah proses Python baru (cache modul kosong)
+# yang dijalankan dari direktori kerja sementara. Diukur: impor app, create_app(),
+# request pertama, dan biaya impor modul analisis yang ditunda (yang dipanaskan oleh
+# [App] prewarm). Keluar dengan status 1 bila impor melewati batas atau modul berat
+# ikut termuat saat start-up, sehingga bisa dipakai sebagai penjaga regresi di CI.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'numpy', 'sklearn', 'scipy', 'fuzzywuzzy')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [m for m in HEAVY if m in sys.modules]
+# Tanpa pemanasan latar, agar analysis_import mengukur biaya impor yang ditunda.
+from src.config import config
+config.read_dict({'App': {'prewarm': '0'}})
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get('/jobs/metrics').status_code
+served = time.perf_counter()
+import src.analysis, src.overlap, src.neighbors, sklearn.neighbors
+warmed = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported, 'first_request': served - created,
+                  'analysis_import': warmed - served, 'status': status, 'heavy': heavy}))
+"""
+
+def _probe(workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    # Kredensial palsu cukup untuk start-up; tidak ada request ke Spotify.
+    for key, value in (('SPOTIPY_CLIENT_ID', 'bench'), ('SPOTIPY_CLIENT_SECRET', 'bench'), ('SPOTIPY_REDIRECT_URI', 'http://127.0.0.1/callback')):
+        env.setdefault(key, value)
+    script = f"HEAVY = {HEAVY!r}\n" + PROBE
+    out = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run(runs, max_import):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [_probe(workdir) for _ in range(runs)]
+    print(f"{'tahap':>16} {'median':>8} {'min':>8}")
+    for stage in ('import', 'create_app', 'first_request', 'analysis_import'):
+        values = [r[stage] for r in results]
+        print(f"{stage:>16} {statistics.median(values):>8.3f} {min(values):>8.3f}")
+    heavy = sorted({m for r in results for m in r['heavy']})
+    import_s = statistics.median(r['import'] for r in results)
+    ok = True
+    if heavy:
+        print(f"GAGAL: modul berat termuat saat impor app: {', '.join(heavy)}")
+        ok = False
+    if any(r['status'] != 200 for r in results):
+        print("GAGAL: request pertama tidak berhasil.")
+        ok = False
+    if max_import and import_s > max_import:
+        print(f"GAGAL: impor app {import_s:.3f} s melebihi batas {max_import:.3f} s")
+        ok = False
+    return ok
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark cold start aplikasi web (proses baru per putaran).")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import', type=float, default=1.0, help="batas median waktu impor app (detik), 0 = tanpa batas")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.runs, args.max_import) else 1)
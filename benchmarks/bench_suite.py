@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from src import config, database, downloader
+from src.analysis import analyze_library, find_similar_titles_enhanced, group_similar_tracks
+from src.cache import audio_features_cache, artist_genres_cache, analysis_results_cache
+from src.data import get_all_liked_tracks, get_tracks_from_playlist, get_artist_genres
+from src.titles import title_cache
+from benchmarks.fake_spotify import FakeSpotify
+from benchmarks.synthetic import generate_library
+
+# Benchmark end-to-end jalur utama aplikasi terhadap server Spotify palsu dan spotdl palsu.
+# Per ukuran koleksi dan per tahap dicatat waktu, puncak memori (tracemalloc) dan jumlah
+# panggilan API; hasilnya ditulis sebagai JSON agar bisa dibandingkan antar-run (--compare).
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+STUB_SPOTDL = os.path.join(BENCH_DIR, 'stub_spotdl')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+def _use_stub_spotdl(mode, delay, fail_rate):
+    # Worker spotdl dan perintah `spotdl` (mode cli) mewarisi environment proses ini.
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [STUB_SPOTDL, os.environ.get('PYTHONPATH')]))
+    os.environ['PATH'] = os.pathsep.join([os.path.join(STUB_SPOTDL, 'bin'), os.environ.get('PATH', '')])
+    os.environ['STUB_SPOTDL_PYTHON'] = sys.executable
+    os.environ['STUB_SPOTDL_DELAY'] = str(delay)
+    os.environ['STUB_SPOTDL_FAIL_RATE'] = str(fail_rate)
+    if not config.config.has_section('Download'):
+        config.config.add_section('Download')
+    config.config.set('Download', 'mode', mode)
+    config.config.set('Download', 'retries', '0')
+
+def _reset(workdir, n):
+    database.DB_FILE = os.path.join(workdir, f"suite_{n}.db")
+    database.init_db()
+    for cache in (audio_features_cache, artist_genres_cache, analysis_results_cache, title_cache):
+        cache.clear()
+
+class Recorder:
+    def __init__(self, fake, track_memory):
+        self.fake = fake
+        self.track_memory = track_memory
+        self.rows = []
+
+    def stage(self, size, name, fn, *args, **kwargs):
+        calls, limited = Counter(self.fake.calls), sum(self.fake.rate_limited.values())
+        if self.track_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if self.track_memory else None
+        if self.track_memory:
+            tracemalloc.stop()
+        api_calls = {k: v for k, v in (self.fake.calls - calls).items()}
+        row = {'size': size, 'stage': name, 'seconds': round(seconds, 4), 'peak_mb': None if peak is None else round(peak, 2),
+               'api_calls': api_calls, 'rate_limited': sum(self.fake.rate_limited.values()) - limited}
+        self.rows.append(row)
+        memory = f"{peak:>9.1f}" if peak is not None else f"{'-':>9}"
+        print(f"{size:>8} {name:>16} {seconds:>9.3f} {memory} {sum(api_calls.values()):>9} {row['rate_limited']:>5}")
+        return result
+
+def _download(table, output_dir, limit):
+    tracks = [{'url': url} for url in table.tracks['external_url'].head(limit)]
+    return downloader.download_tracks(tracks, output_dir, 'mp3', '320k', lambda *args, **fields: None)
+
+def run_size(n, args, workdir, track_memory):
+    library = generate_library(n, duplicate_rate=args.duplicate_rate, artist_fanout=args.artist_fanout, seed=args.seed)
+    playlist = library[: max(1, n // 2)]
+    _reset(workdir, n)
+    fake = FakeSpotify(library=library, playlists={'bench': playlist}, latency=args.latency,
+                       rate_limit_ratio=args.rate_limit_ratio, retry_after=0, seed=args.seed)
+    with fake:
+        sp = fake.client(retries=0, status_retries=0)
+        rec = Recorder(fake, track_memory)
+        table = rec.stage(n, 'sync liked', get_all_liked_tracks, sp, 'bench')
+        # Cache dianggap kedaluwarsa agar sinkronisasi kedua menempuh jalur inkremental.
+        expiration = config.get_config_value('Cache', 'expiration_hours')
+        config.config.set('Cache', 'expiration_hours', '0')
+        try:
+            rec.stage(n, 'resync liked', get_all_liked_tracks, sp, 'bench')
+        finally:
+            config.config.set('Cache', 'expiration_hours', str(expiration))
+        rec.stage(n, 'sync playlist', get_tracks_from_playlist, 'bench', sp)
+        genre_map = rec.stage(n, 'artist genres', get_artist_genres, sp, table.artist_ids())
+        rec.stage(n, 'save db', database.save_tracks_to_db, 'bench_copy', table)
+        table = rec.stage(n, 'load db', database.get_tracks_from_db, 'bench_copy')
+        rec.stage(n, 'analyze', analyze_library, table, genre_map)
+        rec.stage(n, 'similar titles', find_similar_titles_enhanced, table)
+        if n <= args.group_max:
+            rec.stage(n, 'group similar', group_similar_tracks, table)
+        if args.downloads:
+            summary = rec.stage(n, 'download', _download, table, os.path.join(workdir, f"downloads_{n}"), args.downloads)
+            rec.rows[-1]['downloads'] = summary
+    return rec.rows
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=BENCH_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+def _compare(current, track_memory, path):
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    previous = {(r['size'], r['stage']): r for r in report['results']}
+    print(f"\nDibandingkan dengan {path}:")
+    if report['meta'].get('tracemalloc') != track_memory:
+        print("Peringatan: pengaturan tracemalloc berbeda; tracemalloc memperlambat beberapa kali lipat.")
+    print(f"{'tracks':>8} {'stage':>16} {'before':>9} {'after':>9} {'change':>8}")
+    for row in current:
+        before = previous.get((row['size'], row['stage']))
+        if before and before['seconds']:
+            change = (row['seconds'] - before['seconds']) / before['seconds'] * 100
+            print(f"{row['size']:>8} {row['stage']:>16} {before['seconds']:>9.3f} {row['seconds']:>9.3f} {change:>+7.1f}%")
+
+def run(args):
+    _use_stub_spotdl(args.download_mode, args.spotdl_delay, args.spotdl_fail_rate)
+    track_memory = not args.no_memory
+    print(f"{'tracks':>8} {'stage':>16} {'seconds':>9} {'peak MB':>9} {'api calls':>9} {'429s':>5}")
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            results.extend(run_size(n, args, workdir, track_memory))
+    downloader.shutdown_workers()
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'), 'commit': _git_commit(),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'tracemalloc': track_memory, 'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nHasil disimpan di {output}")
+    if args.compare:
+        _compare(results, track_memory, args.compare)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end: sinkronisasi, database, analisis, dan download.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--artist-fanout', type=float, default=1.5, help="Rata-rata jumlah artis per lagu.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.02, help="Latensi server Spotify palsu per request (detik).")
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="Proporsi request yang dijawab 429.")
+    parser.add_argument('--downloads', type=int, default=20, help="Jumlah lagu yang diunduh dengan spotdl palsu (0 = lewati).")
+    parser.add_argument('--download-mode', choices=['worker', 'cli'], default='worker')
+    parser.add_argument('--spotdl-delay', type=float, default=0.05, help="Waktu per lagu spotdl palsu (detik).")
+    parser.add_argument('--spotdl-fail-rate', type=float, default=0.0)
+    parser.add_argument('--group-max', type=int, default=20000, help="Tahap group similar hanya untuk ukuran sampai nilai ini.")
+    parser.add_argument('--no-memory', action='store_true', help="Tanpa tracemalloc (waktu lebih akurat, tanpa puncak memori).")
+    parser.add_argument('--output', help="File JSON hasil (bawaan: benchmarks/results/suite-<waktu>.json).")
+    parser.add_argument('--compare', help="File JSON hasil run sebelumnya untuk dibandingkan.")
+    run(parser.parse_args())
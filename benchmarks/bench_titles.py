@@ -0,0 +1,42 @@
+import argparse
+import time
+
+from src.titles import clean_title, clean_titles, title_cache, _clean_sequential
+from benchmarks.synthetic import generate_library
+
+# Normalisasi judul: pengulangan str.replace versi lama vs regex terkompilasi,
+# versi batch per kolom, dan lookup cache per ID lagu.
+
+def _legacy(titles):
+    return [_clean_sequential(t.lower()) for t in titles]
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def run(sizes):
+    print(f"{'titles':>8} {'stage':>16} {'seconds':>10}")
+    for n in sizes:
+        items = [item['track'] for item in generate_library(n, duplicate_rate=0.05) if item and item.get('track')]
+        ids = [track['id'] for track in items]
+        titles = [track['name'] for track in items]
+
+        expected, legacy_s = _timed(_legacy, titles)
+        compiled, compiled_s = _timed(lambda: [clean_title(t) for t in titles])
+        batch, batch_s = _timed(clean_titles, titles)
+        title_cache.clear()
+        (cold, _), cold_s = _timed(title_cache.lookup, ids, titles)
+        (warm, _), warm_s = _timed(title_cache.lookup, ids, titles)
+        assert compiled == expected and batch == expected and cold == expected and warm == expected
+
+        rows = (('legacy loop', legacy_s), ('compiled regex', compiled_s), ('batch', batch_s),
+                ('cache (cold)', cold_s), ('cache (warm)', warm_s))
+        for stage, seconds in rows:
+            print(f"{n:>8} {stage:>16} {seconds:>10.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark normalisasi judul untuk pencarian judul mirip.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    args = parser.parse_args()
+    run(args.sizes)
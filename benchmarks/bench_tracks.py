@@ -0,0 +1,125 @@
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+import pandas as pd
+
+from src import database
+from src.analysis import generate_statistics, analyze_genres, find_exact_duplicates
+from src.data import extract_track_info
+from benchmarks.synthetic import generate_library, generate_audio_features
+
+# Implementasi lama (DataFrame dengan list Python di sel) sebagai pembanding.
+
+def _legacy_extract(tracks_raw):
+    data = []
+    for item in tracks_raw:
+        if not item or not (track := item.get('track')) or not track.get('id'):
+            continue
+        artists = track.get('artists', [])
+        data.append({
+            'name': track.get('name', 'N/A'),
+            'artists': ', '.join([a['name'] for a in artists]),
+            'artists_list': [a['name'] for a in artists],
+            'artist_ids': [a['id'] for a in artists],
+            'album': track.get('album', {}).get('name', 'N/A'),
+            'release_date': track.get('album', {}).get('release_date', 'N/A'),
+            'duration_ms': track.get('duration_ms', 0),
+            'spotify_id': track.get('id'),
+            'external_url': track.get('external_urls', {}).get('spotify', ''),
+            'added_at': item.get('added_at', '')
+        })
+    return pd.DataFrame(data)
+
+def _legacy_from_db(source_id):
+    query = """
+    SELECT t.*, GROUP_CONCAT(a.name, '|||') AS artists_list_str, GROUP_CONCAT(a.id, '|||') AS artist_ids_list_str, st.added_at
+    FROM tracks t
+    JOIN track_artists ta ON t.id = ta.track_id
+    JOIN artists a ON ta.artist_id = a.id
+    JOIN source_tracks st ON t.id = st.track_id
+    WHERE st.source_id = ?
+    GROUP BY t.id, st.added_at
+    """
+    with database.get_db_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=(source_id,))
+    # regex=False: kode lama memakai split('|||') yang oleh pandas dianggap regex dan memecah per karakter.
+    df['artists_list'] = df['artists_list_str'].str.split('|||', regex=False)
+    df['artist_ids'] = df['artist_ids_list_str'].str.split('|||', regex=False)
+    df['artists'] = df['artists_list'].apply(', '.join)
+    df.drop(columns=['artists_list_str', 'artist_ids_list_str'], inplace=True)
+    return df.rename(columns={'id': 'spotify_id'})
+
+def _legacy_statistics(df):
+    df_copy = df.dropna(subset=['artists_list']).copy()
+    all_artists = [artist for sublist in df_copy['artists_list'] for artist in sublist]
+    top_artists = pd.Series(Counter(all_artists)).sort_values(ascending=False).head(5)
+    df_copy['release_year'] = pd.to_datetime(df_copy['release_date'], errors='coerce').dt.year
+    top_years = df_copy['release_year'].value_counts().dropna().astype(int).head(5)
+    return {"top_artists": top_artists, "top_years": top_years, "total_duration_hrs": df_copy['duration_ms'].sum() / 3600000,
+            "total_tracks": len(df_copy), "unique_artists": len(set(all_artists))}
+
+def _legacy_genres(df, artist_genre_map):
+    genre_counter = Counter(g for sublist in df['artist_ids'].dropna() for aid in sublist for g in artist_genre_map.get(aid, []))
+    return genre_counter.most_common(10)
+
+def _legacy_duplicates(df):
+    return df[df.duplicated(subset=['name', 'artists'], keep=False)]
+
+def _memory_mb(*frames):
+    return sum(frame.memory_usage(deep=True).sum() for frame in frames) / 2**20
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def _genre_map(artist_ids):
+    genres = ['pop', 'rock', 'indie', 'jazz', 'hip hop', 'dangdut', 'k-pop', 'metal']
+    return {aid: [genres[i % len(genres)], genres[(i * 3) % len(genres)]] for i, aid in enumerate(sorted(artist_ids))}
+
+def run(sizes):
+    print(f"{'tracks':>8} {'stage':>14} {'legacy':>10} {'columnar':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            items = generate_library(n, duplicate_rate=0.05)
+            legacy_df, legacy_extract = _timed(_legacy_extract, items)
+            table, extract = _timed(extract_track_info, items)
+            table = table.with_features(generate_audio_features(table.tracks['spotify_id'].tolist()))
+
+            database.DB_FILE = os.path.join(workdir, f"tracks_{n}.db")
+            database.init_db()
+            database.save_tracks_to_db('liked_songs', table)
+            legacy_db, legacy_load = _timed(_legacy_from_db, 'liked_songs')
+            db_table, load = _timed(database.get_tracks_from_db, 'liked_songs')
+
+            genre_map = _genre_map(db_table.artist_ids())
+            legacy_stats, legacy_stats_s = _timed(_legacy_statistics, legacy_db)
+            stats, stats_s = _timed(generate_statistics, db_table)
+            legacy_genres, legacy_genres_s = _timed(_legacy_genres, legacy_db, genre_map)
+            genres, genres_s = _timed(analyze_genres, db_table, genre_map)
+            legacy_dupes, legacy_dupes_s = _timed(_legacy_duplicates, legacy_db)
+            dupes, dupes_s = _timed(find_exact_duplicates, db_table)
+
+            assert stats['total_tracks'] == legacy_stats['total_tracks'] and stats['unique_artists'] == legacy_stats['unique_artists']
+            assert stats['top_years'].to_dict() == legacy_stats['top_years'].to_dict()
+            assert sorted(stats['top_artists'].tolist()) == sorted(legacy_stats['top_artists'].tolist())
+            assert sorted(genres) == sorted(legacy_genres)
+            assert sorted(dupes['spotify_id']) == sorted(legacy_dupes['spotify_id'])
+
+            rows = (
+                ('extract (s)', legacy_extract, extract), ('load db (s)', legacy_load, load),
+                ('statistics (s)', legacy_stats_s, stats_s), ('genres (s)', legacy_genres_s, genres_s),
+                ('duplicates (s)', legacy_dupes_s, dupes_s),
+                ('memory (MB)', _memory_mb(legacy_db), _memory_mb(db_table.tracks, db_table.edges, db_table.artists)),
+            )
+            for stage, before, after in rows:
+                print(f"{n:>8} {stage:>14} {before:>10.3f} {after:>10.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark representasi lagu: list di sel DataFrame vs TrackTable kolumnar.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,130 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import spotipy
+
+from benchmarks.synthetic import generate_library, generate_audio_features
+
+# Server HTTP lokal yang meniru endpoint Spotify Web API yang dipakai aplikasi.
+# Latensi dan respons 429 (dengan Retry-After) bisa diatur untuk benchmark.
+
+class FakeSpotify:
+    def __init__(self, library=None, playlists=None, latency=0.0, rate_limit_ratio=0.0, retry_after=1, seed=0):
+        self.library = library if library is not None else generate_library(1000, seed=seed)
+        self.playlists = playlists or {}
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        tracks = [item['track'] for items in [self.library, *self.playlists.values()] for item in items]
+        self.tracks = {t['id']: t for t in tracks}
+        self.artists = {a['id']: a for t in tracks for a in t['artists']}
+        self.features = {f['id']: f for f in generate_audio_features(list(self.tracks), seed=seed)}
+
+    @property
+    def prefix(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1/"
+
+    def client(self, **kwargs):
+        sp = spotipy.Spotify(auth='fake-token', **kwargs)
+        sp.prefix = self.prefix
+        return sp
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _page(self, items, path, query, default_limit):
+        limit = int(query.get('limit', [default_limit])[0])
+        offset = int(query.get('offset', [0])[0])
+        nxt = f"{self.prefix}{path}?offset={offset + limit}&limit={limit}" if offset + limit < len(items) else None
+        return {'items': items[offset:offset + limit], 'total': len(items), 'limit': limit, 'offset': offset, 'next': nxt}
+
+    def route(self, path, query):
+        parts = path.strip('/').split('/')[1:]
+        ids = [i for i in query.get('ids', [''])[0].split(',') if i]
+        if parts == ['me']:
+            return 'me', {'id': 'fake-user', 'display_name': 'Fake User'}
+        if parts == ['me', 'playlists']:
+            listing = [{'id': pid, 'name': f"Playlist {pid}", 'snapshot_id': f"snap-{len(items)}", 'tracks': {'total': len(items)}}
+                       for pid, items in self.playlists.items()]
+            return 'me/playlists', self._page(listing, 'me/playlists', query, 20)
+        if parts == ['me', 'tracks']:
+            return 'me/tracks', self._page(self.library, 'me/tracks', query, 20)
+        if parts[0] == 'playlists' and len(parts) == 2:
+            items = self.playlists.get(parts[1], [])
+            return 'playlists', {'id': parts[1], 'snapshot_id': f"snap-{len(items)}", 'tracks': {'total': len(items)}}
+        if parts[0] == 'playlists' and len(parts) == 3:
+            return 'playlists/tracks', self._page(self.playlists.get(parts[1], []), '/'.join(parts), query, 100)
+        if parts[0] == 'albums' and len(parts) >= 3:
+            return 'albums/tracks', self._page([i['track'] for i in self.library], '/'.join(parts[:3]), query, 20)
+        if parts[0] == 'audio-features':
+            return 'audio-features', {'audio_features': [self.features.get(i) for i in ids]}
+        if parts[0] == 'artists':
+            return 'artists', {'artists': [dict(self.artists[i], genres=['pop']) if i in self.artists else None for i in ids]}
+        if parts[0] == 'tracks' and len(parts) == 2:
+            return 'tracks', self.tracks.get(parts[1])
+        return parts[0], None
+
+    def should_rate_limit(self):
+        with self._lock:
+            return self._rng.random() < self.rate_limit_ratio
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 agar klien bisa memakai ulang koneksi (keep-alive) seperti ke API asli.
+        protocol_version = 'HTTP/1.1'
+        # Header dan body ditulis terpisah; tanpa ini Nagle + delayed ACK menahan respons ~40 ms.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            endpoint, body = fake.route(url.path, parse_qs(url.query))
+            with fake._lock:
+                fake.calls[endpoint] += 1
+            if fake.latency:
+                time.sleep(fake.latency)
+            if fake.should_rate_limit():
+                with fake._lock:
+                    fake.rate_limited[endpoint] += 1
+                return self._send(429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}}, {'Retry-After': str(fake.retry_after)})
+            if body is None:
+                return self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+            self._send(200, body)
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+    return Handler
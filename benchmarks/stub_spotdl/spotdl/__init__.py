@@ -0,0 +1,23 @@
+import os
+import random
+import time
+
+# Pengganti paket spotdl untuk benchmark: tidak ada jaringan, tidak ada ffmpeg.
+# Setiap "download" menunggu STUB_SPOTDL_DELAY detik lalu menulis file berukuran
+# STUB_SPOTDL_BYTES; STUB_SPOTDL_FAIL_RATE adalah peluang gagal per lagu.
+
+def _setting(name, default):
+    return type(default)(os.getenv(name, default))
+
+def fake_download(url, output_dir, ext):
+    time.sleep(_setting('STUB_SPOTDL_DELAY', 0.05))
+    if random.random() < _setting('STUB_SPOTDL_FAIL_RATE', 0.0):
+        raise RuntimeError(f"Gagal (disengaja) untuk {url}")
+    track_id = url.rstrip('/').split('/')[-1].split('?')[0]
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{track_id}.{ext}")
+    size = _setting('STUB_SPOTDL_BYTES', 64 * 1024)
+    with open(path, 'wb') as f:
+        # Isi berbeda per lagu agar penyimpanan berbasis checksum tidak menganggapnya file yang sama.
+        f.write((track_id.encode() * (size // max(1, len(track_id)) + 1))[:size])
+    return path
@@ -0,0 +1,23 @@
+import argparse
+import sys
+
+from spotdl import fake_download
+
+# Meniru `spotdl <url> --output <dir> --format <ext> [--bitrate <q>]`.
+
+def main():
+    parser = argparse.ArgumentParser(prog='spotdl')
+    parser.add_argument('url')
+    parser.add_argument('--output', default='.')
+    parser.add_argument('--format', default='mp3')
+    parser.add_argument('--bitrate')
+    args = parser.parse_args()
+    try:
+        print(f"Downloaded: {fake_download(args.url, args.output, args.format)}")
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
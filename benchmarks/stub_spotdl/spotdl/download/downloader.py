@@ -0,0 +1,11 @@
+import os
+
+from spotdl import fake_download
+
+class Downloader:
+    def __init__(self, settings):
+        self.output_dir = os.path.dirname(settings['output'])
+        self.format = settings['format']
+
+    def download_song(self, song):
+        return song, fake_download(song.url, self.output_dir, self.format)
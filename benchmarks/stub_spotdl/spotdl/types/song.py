@@ -0,0 +1,7 @@
+class Song:
+    def __init__(self, url):
+        self.url = url
+
+    @classmethod
+    def from_url(cls, url):
+        return cls(url)
@@ -0,0 +1 @@
+DEFAULT_CONFIG = {'client_id': 'stub', 'client_secret': 'stub'}
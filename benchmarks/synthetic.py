@@ -0,0 +1,74 @@
+import random
+import string
+
+WORDS = (
+    "love night heart baby time life world dream fire light rain summer girl boy "
+    "dance home road sky blue gold wild young forever tonight story river ocean "
+    "stay away back down again better lonely broken sweet golden shadow city star "
+    "moon sun song dancing falling running midnight paradise echo silence thunder"
+).split()
+SMALL_WORDS = "the a you me my i in of to on your we it".split()
+SUFFIXES = [" - Remastered 2011", " (Live)", " - Radio Edit", " (Acoustic)", " - Remix", " (feat. Someone)", " [Original Mix]"]
+
+def _random_title(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(SMALL_WORDS))
+    words.append(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 7))))
+    return ' '.join(words).title()
+
+def _variant(title, rng):
+    roll = rng.random()
+    if roll < 0.5:
+        return title + rng.choice(SUFFIXES)
+    if roll < 0.8:
+        chars = list(title)
+        pos = rng.randrange(len(chars))
+        if chars[pos].isalpha():
+            chars[pos] = rng.choice(string.ascii_lowercase)
+        return ''.join(chars)
+    words = title.split()
+    rng.shuffle(words)
+    return ' '.join(words)
+
+def generate_titles(n, duplicate_rate=0.1, seed=0):
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(n):
+        if titles and rng.random() < duplicate_rate:
+            titles.append(_variant(rng.choice(titles), rng))
+        else:
+            titles.append(_random_title(rng))
+    return titles
+
+FEATURES = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'liveness', 'speechiness']
+
+def _spotify_id(rng):
+    return ''.join(rng.choices(string.ascii_letters + string.digits, k=22))
+
+def generate_library(n, duplicate_rate=0.1, artist_fanout=1.5, n_artists=None, seed=0):
+    # Item berbentuk respons /me/tracks atau /playlists/{id}/tracks.
+    rng = random.Random(seed)
+    n_artists = n_artists or max(1, n // 5)
+    artists = [{'id': _spotify_id(rng), 'name': _random_title(rng)} for _ in range(n_artists)]
+    items = []
+    for title in generate_titles(n, duplicate_rate=duplicate_rate, seed=seed):
+        count = max(1, min(len(artists), int(rng.expovariate(1 / artist_fanout)) + 1))
+        track_artists = rng.sample(artists, count)
+        track_id = _spotify_id(rng)
+        items.append({
+            'added_at': f"20{rng.randint(10, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00Z",
+            'track': {
+                'id': track_id,
+                'name': title,
+                'artists': [{'id': a['id'], 'name': a['name']} for a in track_artists],
+                'album': {'name': _random_title(rng), 'release_date': f"{rng.randint(1960, 2025)}-01-01"},
+                'duration_ms': rng.randint(90000, 420000),
+                'external_urls': {'spotify': f"https://open.spotify.com/track/{track_id}"},
+            }
+        })
+    return items
+
+def generate_audio_features(track_ids, seed=0):
+    rng = random.Random(seed)
+    return [dict({'id': tid}, **{f: rng.random() for f in FEATURES}) for tid in track_ids]
@@ -1,79 +1,178 @@
+import hashlib
+import json
+import numpy as np
 import pandas as pd
-from fuzzywuzzy import fuzz
 from collections import defaultdict, Counter
-import re
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import AgglomerativeClustering
 from sklearn.metrics.pairwise import cosine_similarity
-from .config import get_config_value
+from scipy.sparse.csgraph import connected_components
+from .config import DEFAULTS, get_config_value
+from .similarity import similar_title_pairs, similarity_graph
+from .titles import title_cache
+from .metrics import span
 
-def clean_title(title):
-    common_words = ['feat', 'ft', 'remix', 'remastered', 'live', 'acoustic', 'version', 'edit', 'original', 'radio', 'mix']
-    title_lower = title.lower()
-    for word in common_words:
-        title_lower = title_lower.replace(f' {word} ', ' ').replace(f'({word})', ' ').replace(f'[{word}]', ' ')
-    cleaned = re.sub(r'[^a-z0-9\s]', ' ', title_lower)
-    return ' '.join(cleaned.split())
+def normalized_titles(table):
+    # Judul bersih + token per lagu dari cache (proses / kolom tracks.clean_name).
+    df = table.tracks
+    stored = df['clean_name'].tolist() if 'clean_name' in df.columns else None
+    return title_cache.lookup(df['spotify_id'].tolist(), df['name'].tolist(), stored)
 
-def find_exact_duplicates(df):
+def find_exact_duplicates(table):
+    df = table.tracks
     return df[df.duplicated(subset=['name', 'artists'], keep=False)]
 
-def find_similar_titles_enhanced(df):
+def find_similar_titles_enhanced(table):
+    df = table.tracks
     threshold = get_config_value('Analysis', 'similarity_threshold')
-    similar_pairs = []
-    df_copy = df.copy()
-    df_copy['cleaned_name'] = [clean_title(t) for t in df_copy['name']]
-
-    for i in range(len(df_copy)):
-        for j in range(i + 1, len(df_copy)):
-            r1 = df_copy.iloc[i]; r2 = df_copy.iloc[j]
-            ratio = fuzz.token_set_ratio(r1['cleaned_name'], r2['cleaned_name'])
-            if ratio >= threshold:
-                similar_pairs.append({'Track 1': r1['name'], 'Artist 1': r1['artists'], 'Track 2': r2['name'], 'Artist 2': r2['artists'], 'Match (%)': ratio})
+    method = get_config_value('Analysis', 'similarity_engine', type='str')
+    names = df['name'].tolist()
+    artists = df['artists'].tolist()
+    titles, token_sets = normalized_titles(table)
+    left, right, scores = similar_title_pairs(
+        titles, threshold, method=method, token_sets=token_sets
+    )
+    similar_pairs = [
+        {'Track 1': names[i], 'Artist 1': artists[i], 'Track 2': names[j], 'Artist 2': artists[j], 'Match (%)': ratio}
+        for i, j, ratio in zip(left.tolist(), right.tolist(), scores.tolist())
+    ]
     return pd.DataFrame(similar_pairs)
 
-def group_similar_tracks(df):
+def _average_linkage(matrix, distance_threshold):
+    dist_mat = 1 - cosine_similarity(matrix)
+    model = AgglomerativeClustering(n_clusters=None, linkage='average', distance_threshold=distance_threshold, metric='precomputed')
+    return model.fit_predict(dist_mat)
+
+def _sparse_average_linkage(matrix, threshold, dense_max):
+    # Average linkage hanya menggabungkan cluster yang punya minimal satu pasangan di atas
+    # threshold, jadi cluster tidak pernah melewati batas komponen graf kemiripan.
+    graph = similarity_graph(
+        matrix, threshold / 100.0,
+        n_neighbors=get_config_value('Analysis', 'clustering_neighbors'),
+        chunk_size=get_config_value('Analysis', 'clustering_chunk_size')
+    )
+    n_components, components = connected_components(graph, directed=False)
+    labels = np.full(matrix.shape[0], -1, dtype=np.int64)
+    members = defaultdict(list)
+    for idx, component in enumerate(components):
+        members[component].append(idx)
+    next_label = 0
+    for component, idxs in members.items():
+        if len(idxs) == 1 or len(idxs) > dense_max:
+            labels[idxs] = next_label
+            next_label += 1
+            continue
+        if len(idxs) == 2:
+            merged = 1 - graph[idxs[0], idxs[1]] < 1 - (threshold / 100.0)
+            labels[idxs] = [next_label, next_label if merged else next_label + 1]
+            next_label += 1 if merged else 2
+            continue
+        sub_labels = _average_linkage(matrix[idxs], 1 - (threshold / 100.0))
+        labels[idxs] = sub_labels + next_label
+        next_label += sub_labels.max() + 1
+    return labels
+
+def group_similar_tracks(table):
+    df = table.tracks
     threshold = get_config_value('Analysis', 'similarity_threshold')
-    df_copy = df.copy()
-    df_copy['cleaned_name'] = [clean_title(t) for t in df_copy['name']]
-    titles = df_copy['cleaned_name'].tolist()
+    mode = get_config_value('Analysis', 'clustering_mode', type='str')
+    dense_max = get_config_value('Analysis', 'clustering_dense_max')
+    titles, _ = normalized_titles(table)
     if len(titles) < 2: return {}
 
     vectorizer = TfidfVectorizer()
     tfidf_matrix = vectorizer.fit_transform(titles)
-    dist_mat = 1 - cosine_similarity(tfidf_matrix)
-    model = AgglomerativeClustering(n_clusters=None, linkage='average', distance_threshold=1 - (threshold / 100.0), metric='precomputed')
-    labels = model.fit_predict(dist_mat)
+    if mode == 'dense' or (mode == 'auto' and len(titles) <= dense_max):
+        labels = _average_linkage(tfidf_matrix, 1 - (threshold / 100.0))
+    else:
+        labels = _sparse_average_linkage(tfidf_matrix, threshold, dense_max)
     
     clusters = defaultdict(list)
     for idx, label in enumerate(labels):
-        clusters[label].append(df_copy.iloc[idx].to_dict())
-    return {k: v for k, v in clusters.items() if len(v) >= 2}
+        clusters[label].append(idx)
+    groups = {}
+    for k, v in clusters.items():
+        if len(v) >= 2:
+            groups[k] = df.iloc[v].to_dict('records')
+            for record, idx in zip(groups[k], v):
+                record['cleaned_name'] = titles[idx]
+    return groups
 
-def find_different_versions(df):
+def find_different_versions(table):
+    df = table.tracks
     return df[df.duplicated(subset=['spotify_id'], keep=False)].sort_values(by=['spotify_id', 'added_at'])
 
-def generate_statistics(df):
-    df_copy = df.dropna(subset=['artists_list']).copy()
-    all_artists = [artist for sublist in df_copy['artists_list'] for artist in sublist]
-    top_artists = pd.Series(Counter(all_artists)).sort_values(ascending=False).head(5)
-    df_copy['release_year'] = pd.to_datetime(df_copy['release_date'], errors='coerce').dt.year
-    top_years = df_copy['release_year'].value_counts().dropna().astype(int).head(5)
-    unique_artists = len(set(all_artists))
+def generate_statistics(table):
+    # Hitungan artis dari tabel edge (bincount per kode artis), tahun rilis dihitung
+    # sekali per kategori release_date lalu dipetakan lewat kode kategorinya.
+    df = table.tracks
+    artist_counts = pd.Series(table.artist_counts(), index=table.artists['name'].to_numpy())
+    artist_counts = artist_counts.groupby(level=0, sort=False).sum()
+    top_artists = artist_counts.sort_values(ascending=False, kind='stable').head(5)
+    release_dates = df['release_date'].astype('category')
+    category_years = pd.to_datetime(pd.Series(release_dates.cat.categories), errors='coerce').dt.year.to_numpy()
+    codes = release_dates.cat.codes.to_numpy()
+    years = pd.Series(np.where(codes >= 0, category_years[codes], np.nan))
+    top_years = years.value_counts().dropna().astype(int).head(5)
+    top_years.index = top_years.index.astype(int)
     return {
         "top_artists": top_artists, "top_years": top_years,
-        "total_duration_hrs": df_copy['duration_ms'].sum() / 3600000,
-        "total_tracks": len(df_copy), "unique_artists": unique_artists
+        "total_duration_hrs": df['duration_ms'].sum() / 3600000,
+        "total_tracks": len(df), "unique_artists": len(artist_counts)
     }
 
-def generate_taste_profile(df):
+def generate_taste_profile(table):
+    df = table.tracks
     features = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'liveness', 'speechiness']
     available = [f for f in features if f in df.columns and pd.api.types.is_numeric_dtype(df[f]) and df[f].notna().any()]
     if not available:
         return None
     return df[available].mean().to_dict()
 
-def analyze_genres(df, artist_genre_map):
-    if 'artist_ids' not in df.columns: return []
-    genre_counter = Counter(g for sublist in df['artist_ids'].dropna() for aid in sublist for g in artist_genre_map.get(aid, []))
-    return genre_counter.most_common(10)
\ No newline at end of file
+def analyze_genres(table, artist_genre_map, limit=10):
+    # Genre dihitung per artis unik dengan bobot jumlah lagunya, bukan per pasangan lagu–artis.
+    # limit=None: semua genre, urut dari yang terbanyak.
+    genre_counter = Counter()
+    for artist_id, count in zip(table.artists['id'].tolist(), table.artist_counts().tolist()):
+        for genre in artist_genre_map.get(artist_id, []):
+            genre_counter[genre] += count
+    return genre_counter.most_common(limit)
+
+# Naikkan bila bentuk hasil analyze_library berubah agar entri cache lama tidak terpakai.
+RESULT_VERSION = 3
+
+def analysis_cache_key(table):
+    # Kunci cache hasil analisis: multiset lagu (setiap kemunculan sebagai pasangan ID +
+    # added_at, tanpa urutan) ditambah semua pengaturan [Analysis] yang memengaruhi hasil.
+    # Menambah/membuang salinan lagu atau mengubah added_at mengubah duplikat dan versi,
+    # jadi juga mengubah kunci.
+    settings = {key: get_config_value('Analysis', key, type='str') for key in DEFAULTS['Analysis']}
+    digest = hashlib.sha256(json.dumps([RESULT_VERSION, settings], sort_keys=True).encode())
+    df = table.tracks
+    added_at = df['added_at'].tolist() if 'added_at' in df.columns else [None] * len(df)
+    for track_id, added in sorted(zip(df['spotify_id'].tolist(), (a if isinstance(a, str) else '' for a in added_at))):
+        digest.update(f"{track_id}\0{added}\0".encode())
+    return digest.hexdigest()
+
+def analyze_library(table, artist_genre_map):
+    # Seluruh tahap analisis yang berat di CPU; dipanggil lewat pool proses bila diaktifkan
+    # dan disimpan per bagian sebagai JSON (lihat results.store_result), sehingga hasilnya
+    # harus berupa tipe Python biasa. Daftar panjang tidak dipotong: API hasil memakai paging.
+    with span('analysis.statistics'):
+        stats = generate_statistics(table)
+    stats['top_artists'] = {artist: int(count) for artist, count in stats['top_artists'].items()}
+    stats['top_years'] = {int(year): int(count) for year, count in stats['top_years'].items()}
+    stats['total_duration_hrs'] = float(stats['total_duration_hrs'])
+    with span('analysis.profile'):
+        profile = generate_taste_profile(table)
+    with span('analysis.genres'):
+        genres = analyze_genres(table, artist_genre_map, limit=None)
+    with span('analysis.duplicates'):
+        duplicates = find_exact_duplicates(table).to_dict('records')
+    with span('analysis.versions'):
+        versions = find_different_versions(table).to_dict('records')
+    groups = []
+    if len(table.tracks) <= get_config_value('Analysis', 'title_groups_max'):
+        with span('analysis.title_groups'):
+            groups = list(group_similar_tracks(table).values())
+    return {'stats': stats, 'profile': profile, 'genres': genres, 'duplicates': duplicates, 'versions': versions, 'groups': groups}
@@ -1,21 +1,138 @@
+import os
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
-import os
+from spotipy.cache_handler import MemoryCacheHandler
 from dotenv import load_dotenv
+from .config import get_config_value
+from .metrics import record_spotify_response
 
 load_dotenv()
 
-def get_spotify_client():
-    sp = spotipy.Spotify(
-        auth_manager=SpotifyOAuth(
-            client_id=os.getenv("SPOTIPY_CLIENT_ID"),
-            client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"),
-            redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"),
-            scope='user-library-read user-top-read user-library-modify'
-        ),
-        requests_timeout=20,    # Waktu tunggu dinaikkan menjadi 20 detik
-        retries=3,              # Coba lagi hingga 3 kali jika gagal
-        status_retries=3,       # Coba lagi juga untuk status error tertentu
-        backoff_factor=0.5      # Jeda sesaat sebelum mencoba lagi
+SCOPE = 'user-library-read user-top-read'
+
+_session_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+def shared_session():
+    # Satu requests.Session per proses agar koneksi keep-alive (dan TLS) ke API dipakai ulang.
+    # Retry di sini hanya untuk gangguan koneksi; status 429 dan 5xx dibiarkan sampai ke
+    # call_with_backoff (satu lapis retry) supaya Retry-After dihormati bersama batas per-host.
+    # Karena itu setiap panggilan API (termasuk me()/current_user() di rute) lewat call_with_backoff.
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            retries = get_config_value('Spotify', 'transport_retries')
+            adapter = HTTPAdapter(
+                pool_connections=get_config_value('Spotify', 'pool_connections'),
+                pool_maxsize=get_config_value('Spotify', 'pool_maxsize'),
+                max_retries=Retry(
+                    total=retries, connect=retries, read=False, status=0, backoff_factor=0.5,
+                    status_forcelist=(), allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+                    respect_retry_after_header=False, raise_on_status=False,
+                ),
+            )
+            session = requests.Session()
+            session.hooks['response'].append(record_spotify_response)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+class PooledSpotify(spotipy.Spotify):
+    # spotipy menutup session-nya saat objek klien dibuang; session ini milik bersama.
+    def __del__(self):
+        pass
+
+def new_client(**kwargs):
+    kwargs.setdefault('requests_timeout', get_config_value('Spotify', 'requests_timeout'))
+    return PooledSpotify(requests_session=shared_session(), **kwargs)
+
+def new_oauth(**kwargs):
+    return SpotifyOAuth(
+        client_id=os.getenv("SPOTIPY_CLIENT_ID"),
+        client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"),
+        redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"),
+        requests_session=shared_session(),
+        **kwargs
     )
-    return sp
\ No newline at end of file
+
+class TokenManager:
+    # Cache token per user (dikunci refresh_token) untuk semua tugas di proses ini.
+    # Refresh bersifat single-flight: tugas yang bersamaan menunggu satu refresh yang sama.
+    def __init__(self, max_users=1000):
+        self.max_users = max_users
+        self._tokens = OrderedDict()
+        self._refresh_locks = {}
+        self._lock = threading.Lock()
+        self._oauth = None
+        self.refreshes = 0
+
+    def _oauth_manager(self):
+        with self._lock:
+            if self._oauth is None:
+                self._oauth = new_oauth(scope=SCOPE, cache_handler=MemoryCacheHandler())
+            return self._oauth
+
+    def _cached(self, key):
+        with self._lock:
+            token_info = self._tokens.get(key)
+            if token_info:
+                self._tokens.move_to_end(key)
+            return token_info
+
+    def _store(self, key, token_info):
+        with self._lock:
+            self._tokens[key] = token_info
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_users:
+                old_key, _ = self._tokens.popitem(last=False)
+                self._refresh_locks.pop(old_key, None)
+
+    def get(self, token_info):
+        key = token_info.get('refresh_token') or token_info['access_token']
+        cached = self._cached(key)
+        if cached and cached['expires_at'] > token_info.get('expires_at', 0):
+            token_info = cached
+        if not SpotifyOAuth.is_token_expired(token_info):
+            return token_info
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(key, threading.Lock())
+        with refresh_lock:
+            cached = self._cached(key)
+            if cached and not SpotifyOAuth.is_token_expired(cached):
+                return cached
+            refreshed = self._oauth_manager().refresh_access_token(key)
+            self.refreshes += 1
+            self._store(key, refreshed)
+            return refreshed
+
+token_manager = TokenManager()
+
+class TaskAuth:
+    # Auth manager untuk klien milik tugas latar belakang: token selalu diambil dari
+    # token_manager sehingga tugas panjang tetap jalan setelah token kedaluwarsa.
+    def __init__(self, token_info):
+        self.token_info = token_info
+
+    def get_access_token(self, as_dict=False):
+        self.token_info = token_manager.get(self.token_info)
+        return self.token_info if as_dict else self.token_info['access_token']
+
+def client_for_token(token_info):
+    return new_client(auth_manager=TaskAuth(token_info))
+
+_cli_client = None
+
+def get_spotify_client():
+    global _cli_client
+    if _cli_client is None:
+        _cli_client = new_client(
+            auth_manager=new_oauth(scope='user-library-read user-top-read user-library-modify'),
+        )
+    return _cli_client
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from .config import get_config_value
+from .database import get_cache_entries, put_cache_entries, prune_cache_entries
+
+class EntityCache:
+    # Cache per-ID (audio features, genre artis) yang dipakai bersama semua user:
+    # LRU di memori proses di atas tabel SQLite, dengan TTL per entri.
+    def __init__(self, table, ttl_key, size_key='lru_size', max_rows_key=None):
+        self.table = table
+        self.ttl_key = ttl_key
+        self.size_key = size_key
+        self.max_rows_key = max_rows_key
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl_seconds(self):
+        return get_config_value('Cache', self.ttl_key, type='float') * 3600
+
+    def _remember(self, entries):
+        max_size = get_config_value('Cache', self.size_key)
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, ids):
+        now = time.time()
+        oldest = now - self._ttl_seconds()
+        found, missing = {}, []
+        with self._lock:
+            for key in ids:
+                entry = self._entries.get(key)
+                if entry and entry[1] >= oldest:
+                    found[key] = entry[0]
+                    self._entries.move_to_end(key)
+                else:
+                    missing.append(key)
+        if missing:
+            stored = get_cache_entries(self.table, missing, oldest)
+            self._remember(stored)
+            found.update({key: entry[0] for key, entry in stored.items()})
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+        return found
+
+    def put_many(self, values):
+        if not values:
+            return
+        now = time.time()
+        put_cache_entries(self.table, values, now)
+        if self.max_rows_key:
+            prune_cache_entries(self.table, now - self._ttl_seconds(), get_config_value('Cache', self.max_rows_key))
+        self._remember({key: (value, now) for key, value in values.items()})
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+audio_features_cache = EntityCache('audio_features_cache', 'features_ttl_hours')
+artist_genres_cache = EntityCache('artist_genres_cache', 'genres_ttl_hours')
+# Hasil analisis lengkap per isi sumber; entrinya besar sehingga LRU dan tabelnya dibatasi terpisah.
+analysis_results_cache = EntityCache('analysis_results_cache', 'results_ttl_hours', size_key='results_lru_size', max_rows_key='results_max_rows')
@@ -3,12 +3,100 @@ import os
 
 config = configparser.ConfigParser()
 
-if os.path.exists('config.ini'):
-    config.read('config.ini')
+# Default fallback values
+DEFAULTS = {
+    'Analysis': {
+        'similarity_threshold': 85,
+        'similarity_engine': 'blocking',
+        'clustering_mode': 'auto',
+        'clustering_dense_max': 2000,
+        'clustering_neighbors': 50,
+        'clustering_chunk_size': 1000,
+        'title_groups_max': 20000,
+    },
+    'Cache': {
+        'expiration_hours': 24,
+        'sync_mode': 'incremental',
+        'features_ttl_hours': 720,
+        'genres_ttl_hours': 168,
+        'lru_size': 50000,
+        'results_ttl_hours': 24,
+        'results_lru_size': 32,
+        'results_max_rows': 500,
+    },
+    'Spotify': {
+        'max_workers': 8,
+        'host_concurrency': 6,
+        'max_retries': 5,
+        'backoff_seconds': 1.0,
+        'requests_timeout': 20,
+        'pool_connections': 10,
+        'pool_maxsize': 32,
+        'transport_retries': 3,
+    },
+    'Download': {
+        'mode': 'worker',
+        'workers': 3,
+        'timeout_seconds': 300,
+        'retries': 2,
+        'store_max_mb': 10240,
+        'zip_chunk_kb': 1024,
+    },
+    'Overlap': {
+        'sync_workers': 4,
+        'top_n': 50,
+        'duplicate_jaccard': 0.9,
+        'subset_containment': 0.95,
+        'dense_max_cells': 16000000,
+    },
+    'Results': {
+        'page_size': 100,
+        'max_page_size': 1000,
+    },
+    'Jobs': {
+        'workers': 4,
+        'per_user': 2,
+        'max_queued_per_user': 10,
+        'cpu_executor': 'process',
+        'cpu_workers': 2,
+        'cpu_timeout': 600,
+    },
+    'Tasks': {
+        'ttl_hours': 24,
+        'max_tasks': 500,
+        'poll_interval': 0.5,
+        'longpoll_seconds': 25,
+    },
+    'Neighbors': {
+        'brute_force_max': 5000,
+        'default_k': 10,
+        'max_k': 100,
+    },
+    'Metrics': {
+        'profile_tasks': 0,
+        'profile_interval_ms': 5,
+        'profile_dir': 'profiles',
+    },
+    'App': {
+        'prewarm': 1,
+    },
+    'Database': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': '-20000',
+        'temp_store': 'MEMORY',
+        'busy_timeout': '5000',
+    },
+}
+
+# config.ini dicari di folder proyek (induk folder src), bukan di direktori kerja proses,
+# sehingga aplikasi bisa dijalankan dari mana saja (gunicorn, systemd, container, dll.).
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.ini')
+
+if os.path.exists(CONFIG_FILE):
+    config.read(CONFIG_FILE)
 else:
-    # Default fallback values
-    config['Analysis'] = {'similarity_threshold': '85'}
-    config['Cache'] = {'expiration_hours': '24'}
+    config.read_dict({section: {k: str(v) for k, v in values.items()} for section, values in DEFAULTS.items()})
 
 def get_config_value(section, key, type='int'):
     try:
@@ -20,6 +108,4 @@ def get_config_value(section, key, type='int'):
             return config.get(section, key)
     except (configparser.NoSectionError, configparser.NoOptionError):
         # Fallback to default if not found
-        if key == 'similarity_threshold': return 85
-        if key == 'expiration_hours': return 24
-        return None
\ No newline at end of file
+        return DEFAULTS.get(section, {}).get(key)
@@ -1,100 +1,171 @@
 from .auth import get_spotify_client
 import pandas as pd
-from .database import is_cache_valid, get_tracks_from_db, save_tracks_to_db
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from datetime import datetime, timedelta
+from .database import (
+    get_tracks_from_db, get_source_state, get_source_tracks, mark_source_synced, apply_source_delta
+)
 from .config import get_config_value
-from spotipy.exceptions import SpotifyException
+from .fetcher import call_with_backoff, fetch_all_items, fetch_tracks_pipelined, lookup_audio_features, lookup_artist_genres
+from .tracks import TrackTable
+from .metrics import span, submit_traced
 
 def extract_track_info(tracks_raw):
-    data = []
+    columns = {key: [] for key in ('name', 'artists', 'album', 'release_date', 'duration_ms', 'spotify_id', 'external_url', 'added_at')}
+    track_pos, artist_ids, artist_names = [], [], []
     for item in tracks_raw:
         if not item or not (track := item.get('track')) or not track.get('id'):
             continue
         
         artists = track.get('artists', [])
-        data.append({
-            'name': track.get('name', 'N/A'),
-            'artists': ', '.join([a['name'] for a in artists]),
-            'artists_list': [a['name'] for a in artists],
-            'artist_ids': [a['id'] for a in artists],
-            'album': track.get('album', {}).get('name', 'N/A'),
-            'release_date': track.get('album', {}).get('release_date', 'N/A'),
-            'duration_ms': track.get('duration_ms', 0),
-            'spotify_id': track.get('id'),
-            'external_url': track.get('external_urls', {}).get('spotify', ''),
-            'added_at': item.get('added_at', '')
-        })
-    return pd.DataFrame(data)
-
-def _fetch_from_spotify_and_save(source_id, fetch_function, *args, **kwargs):
+        album = track.get('album', {})
+        position = len(columns['spotify_id'])
+        for a in artists:
+            track_pos.append(position)
+            artist_ids.append(a['id'])
+            artist_names.append(a['name'])
+        columns['name'].append(track.get('name', 'N/A'))
+        columns['artists'].append(', '.join([a['name'] for a in artists]))
+        columns['album'].append(album.get('name', 'N/A'))
+        columns['release_date'].append(album.get('release_date', 'N/A'))
+        columns['duration_ms'].append(track.get('duration_ms', 0))
+        columns['spotify_id'].append(track.get('id'))
+        columns['external_url'].append(track.get('external_urls', {}).get('spotify', ''))
+        columns['added_at'].append(item.get('added_at', ''))
+    return TrackTable.build(pd.DataFrame(columns), track_pos, artist_ids, artist_names)
+
+def _new_tracks_with_features(table, stored, features):
+    if table.empty:
+        return table
+    ids = table.tracks['spotify_id']
+    new_table = table.select(~ids.isin(stored) & ~ids.duplicated())
+    return merge_audio_features(new_table, features) if not new_table.empty else new_table
+
+def _full_sync(sp, source_id, fetch_function, limit, stored, snapshot_id=None):
     print(f"Mengambil data dari Spotify API untuk: {source_id}")
     
-    results = fetch_function(*args, **kwargs)
-    tracks_raw = results['items']
-    while results['next']:
-        results = get_spotify_client().next(results)
-        tracks_raw.extend(results['items'])
+    fetched = fetch_tracks_pipelined(sp, fetch_function, limit, genres=False)
+    with span('sync.extract'):
+        table = extract_track_info(fetched['items'])
+        new_tracks = _new_tracks_with_features(table, stored, fetched['features'])
+    # Keanggotaan (termasuk lagu yang muncul lebih dari sekali) disamakan lewat selisih per kemunculan.
+    apply_source_delta(source_id, new_tracks, [], snapshot_id, members=table)
 
-    df = extract_track_info(tracks_raw)
-    
-    if not df.empty:
-        sp = get_spotify_client()
-        df_with_features = get_audio_features(sp, df.copy())
-        save_tracks_to_db(source_id, df_with_features)
-        return df_with_features
-    return pd.DataFrame()
-
-def get_all_liked_tracks():
-    source_id = 'liked_songs'
+def _sync_liked_tracks(sp, source_id, stored):
+    # Liked Songs terurut dari yang terbaru: berhenti begitu bertemu added_at yang sudah tersimpan.
+    latest = max((a for a in stored.values() if a), default='')
+    new_items, offset, total = [], 0, None
+    with span('sync.paging'):
+        while True:
+            page = call_with_backoff(sp, sp.current_user_saved_tracks, limit=50, offset=offset)
+            total = page.get('total') if total is None else total
+            fresh = [item for item in page['items'] if item and (item.get('added_at') or '') > latest]
+            new_items.extend(fresh)
+            if len(fresh) < len(page['items']) or not page['next']:
+                break
+            offset += 50
+
+    table = extract_track_info(new_items)
+    new_ids = set(table.tracks['spotify_id']) - set(stored)
+    if total is not None and len(stored) + len(new_ids) != total:
+        # Ada lagu yang dihapus dari Liked Songs, perlu daftar lengkap untuk menghitung selisihnya.
+        return _full_sync(sp, source_id, sp.current_user_saved_tracks, 50, stored)
+    with span('sync.lookups'):
+        features = lookup_audio_features(sp, list(new_ids)) if new_ids else []
+    apply_source_delta(source_id, _new_tracks_with_features(table, stored, features), [])
+
+def _is_fresh(state):
     expiration = get_config_value('Cache', 'expiration_hours')
-    if is_cache_valid(source_id, expiration):
+    return state is not None and datetime.now() - state['last_fetched'] < timedelta(hours=expiration)
+
+def _incremental():
+    return get_config_value('Cache', 'sync_mode', type='str') == 'incremental'
+
+def sync_liked_tracks(sp=None, user_id=None):
+    # Pastikan Liked Songs di database mutakhir (cache, sinkronisasi inkremental, atau penuh).
+    source_id = f"liked_songs_{user_id}" if user_id else 'liked_songs'
+    state = get_source_state(source_id)
+    if _is_fresh(state):
         print("Memuat 'Liked Songs' dari cache database...")
-        return get_tracks_from_db(source_id)
+        return source_id
     
-    sp = get_spotify_client()
-    return _fetch_from_spotify_and_save(source_id, sp.current_user_saved_tracks, limit=50)
+    sp = sp or get_spotify_client()
+    stored = get_source_tracks(source_id)
+    if stored and _incremental():
+        _sync_liked_tracks(sp, source_id, stored)
+    else:
+        _full_sync(sp, source_id, sp.current_user_saved_tracks, 50, stored)
+    return source_id
+
+def get_all_liked_tracks(sp=None, user_id=None):
+    return get_tracks_from_db(sync_liked_tracks(sp, user_id))
 
-def get_tracks_from_playlist(playlist_id):
+def sync_playlist(playlist_id, sp=None, snapshot_id=None):
+    # snapshot_id bisa diberikan dari daftar playlist user sehingga tidak perlu request tambahan.
     source_id = f"playlist_{playlist_id}"
-    expiration = get_config_value('Cache', 'expiration_hours')
-    if is_cache_valid(source_id, expiration):
+    state = get_source_state(source_id)
+    if _is_fresh(state):
         print(f"Memuat playlist {playlist_id} dari cache database...")
-        return get_tracks_from_db(source_id)
+        return source_id
         
-    sp = get_spotify_client()
-    return _fetch_from_spotify_and_save(source_id, sp.playlist_tracks, playlist_id=playlist_id, limit=100)
+    sp = sp or get_spotify_client()
+    snapshot_id = snapshot_id or call_with_backoff(sp, sp.playlist, playlist_id, fields='snapshot_id').get('snapshot_id')
+    if state and _incremental() and snapshot_id and state['snapshot_id'] == snapshot_id:
+        print(f"Playlist {playlist_id} tidak berubah (snapshot_id sama), memakai cache database...")
+        mark_source_synced(source_id, snapshot_id)
+        return source_id
 
-# --- PERUBAHAN DI SINI ---
-def get_audio_features(sp_client, df):
-    ids = df['spotify_id'].dropna().unique().tolist()
-    if not ids: return df
-
-    features_list = []
-    for i in range(0, len(ids), 100):
-        batch = ids[i:i+100]
-        try:
-            batch_features = sp_client.audio_features(batch)
-            features_list.extend(f for f in batch_features if f)
-        except Exception as e:
-            print(f"Peringatan: Gagal mengambil audio features. Error: {e}")
-    
+    _full_sync(sp, source_id, partial(sp.playlist_tracks, playlist_id), 100, get_source_tracks(source_id), snapshot_id)
+    return source_id
+
+def get_tracks_from_playlist(playlist_id, sp=None):
+    return get_tracks_from_db(sync_playlist(playlist_id, sp))
+
+def sync_user_sources(sp, user_id, include_liked=True, on_progress=None, cancelled=None):
+    # Semua playlist milik/diikuti user (ditambah Liked Songs) disinkronkan ke database.
+    # Mengembalikan [(source_id, nama)] sesuai urutan di Spotify; on_progress(selesai, total).
+    # Playlist yang gagal disinkronkan (mis. sudah dihapus) dilewati dengan peringatan.
+    # Bila cancelled() bernilai benar, playlist yang belum mulai dilewati.
+    with span('sync.playlists'):
+        playlists = [p for p in fetch_all_items(sp, sp.current_user_playlists, 50) if p and p.get('id')]
+    jobs = [(partial(sync_liked_tracks, sp, user_id), 'Liked Songs')] if include_liked else []
+    jobs += [(partial(sync_playlist, p['id'], sp, p.get('snapshot_id')), p.get('name') or p['id']) for p in playlists]
+
+    def run(fn):
+        return None if cancelled and cancelled() else fn()
+
+    sources = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=get_config_value('Overlap', 'sync_workers')) as pool:
+        futures = {submit_traced(pool, run, fn): i for i, (fn, _) in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                source_id = future.result()
+                sources[i] = (source_id, jobs[i][1]) if source_id else None
+            except Exception as e:
+                print(f"Peringatan: Gagal menyinkronkan '{jobs[i][1]}'. Error: {e}")
+            if on_progress:
+                on_progress(done, len(jobs))
+    return [source for source in sources if source]
+
+def merge_audio_features(table, features_list):
     if not features_list:
         print("Peringatan: Tidak ada data audio features yang berhasil diambil.")
-        return df
+        return table
+
+    return table.with_features(features_list)
+
+# --- PERUBAHAN DI SINI ---
+def get_audio_features(sp_client, table):
+    ids = table.tracks['spotify_id'].dropna().unique().tolist()
+    if not ids: return table
 
-    features_df = pd.DataFrame(features_list).rename(columns={'id': 'spotify_id'})
-    return df.merge(features_df, on='spotify_id', how='left')
+    return merge_audio_features(table, lookup_audio_features(sp_client, ids))
 
 # --- PERUBAHAN DI SINI ---
 def get_artist_genres(sp_client, artist_ids):
-    unique_ids = list(set(aid for sublist in artist_ids for aid in sublist))
+    unique_ids = list(dict.fromkeys(artist_ids))
     if not unique_ids: return {}
     
-    genre_map = {}
-    for i in range(0, len(unique_ids), 50):
-        batch = unique_ids[i:i+50]
-        try:
-            for artist in sp_client.artists(batch)['artists']:
-                if artist: genre_map[artist['id']] = artist['genres']
-        except Exception:
-            pass
-    return genre_map
\ No newline at end of file
+    return lookup_artist_genres(sp_client, unique_ids)
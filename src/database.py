@@ -1,13 +1,56 @@
+import json
+import os
 import sqlite3
-import pandas as pd
+import time
 from datetime import datetime, timedelta
+from itertools import repeat
+from .config import get_config_value
+from .titles import clean_titles
+from .metrics import timed_db
 
-DB_FILE = "spotify_data.db"
+# Di akar proyek (seperti config.ini), bukan di direktori kerja proses: server WSGI, worker,
+# dan skrip yang dijalankan dari folder lain tetap memakai database yang sama.
+DB_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'spotify_data.db')
+
+# pandas/numpy (dan TrackTable) hanya diimpor oleh fungsi yang membutuhkannya, sehingga
+# mengimpor modul ini (dipakai hampir semua modul lain) tetap murah saat start-up.
+
+PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'temp_store', 'busy_timeout')
+
+TRACK_COLUMNS = {
+    'id': 'spotify_id', 'name': 'name', 'album': 'album', 'release_date': 'release_date',
+    'duration_ms': 'duration_ms', 'external_url': 'external_url', 'danceability': 'danceability',
+    'energy': 'energy', 'valence': 'valence', 'acousticness': 'acousticness',
+    'instrumentalness': 'instrumentalness', 'liveness': 'liveness', 'speechiness': 'speechiness',
+    'clean_name': 'clean_name'
+}
+AUDIO_FEATURES = ('danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'liveness', 'speechiness')
+CACHE_TABLES = ('audio_features_cache', 'artist_genres_cache', 'analysis_results_cache')
+
+INSERT_TRACK_SQL = f"INSERT OR REPLACE INTO tracks ({', '.join(TRACK_COLUMNS)}) VALUES ({', '.join(['?'] * len(TRACK_COLUMNS))})"
 
 def get_db_connection():
-    return sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(DB_FILE)
+    for pragma in PRAGMAS:
+        value = get_config_value('Database', pragma, type='str')
+        if value:
+            conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+# Satu baris per kemunculan lagu di sumber: playlist boleh memuat lagu yang sama berulang
+# kali (occurrence 0, 1, ...), dan analisis duplikat/versi membutuhkan setiap kemunculannya.
+SOURCE_TRACKS_SQL = """
+CREATE TABLE IF NOT EXISTS source_tracks (
+    source_id TEXT, track_id TEXT, occurrence INTEGER DEFAULT 0, added_at TEXT,
+    PRIMARY KEY (source_id, track_id, occurrence), FOREIGN KEY (track_id) REFERENCES tracks (id)
+)"""
+
+_initialized = set()
 
 def init_db():
+    # Langkah start-up eksplisit (lihat create_app di app.py); idempoten per file database.
+    if DB_FILE in _initialized:
+        return
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -23,13 +66,50 @@ def init_db():
             FOREIGN KEY (track_id) REFERENCES tracks (id), FOREIGN KEY (artist_id) REFERENCES artists (id)
         )""")
         cursor.execute("CREATE TABLE IF NOT EXISTS cache_log (source_id TEXT PRIMARY KEY, last_fetched TIMESTAMP)")
+        _migrate_source_tracks(cursor)
+        cursor.execute(SOURCE_TRACKS_SQL)
+        for table in CACHE_TABLES:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, data TEXT, fetched_at REAL)")
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS source_tracks (
-            source_id TEXT, track_id TEXT, added_at TEXT, PRIMARY KEY (source_id, track_id),
-            FOREIGN KEY (track_id) REFERENCES tracks (id)
+        CREATE TABLE IF NOT EXISTS download_index (
+            spotify_id TEXT, format TEXT, quality TEXT, path TEXT, name TEXT, size INTEGER, checksum TEXT,
+            created_at REAL, last_used_at REAL, PRIMARY KEY (spotify_id, format, quality)
         )""")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_download_index_lru ON download_index (last_used_at)")
+        # Hasil analisis per bagian (lihat results.store_result): satu baris JSON per item,
+        # dengan teks pencarian huruf kecil untuk filter ?q=.
+        cursor.execute("CREATE TABLE IF NOT EXISTS result_sets (id TEXT PRIMARY KEY, type TEXT, created_at REAL)")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS result_rows (
+            result_id TEXT, section TEXT, position INTEGER, search TEXT, data TEXT,
+            PRIMARY KEY (result_id, section, position)
+        ) WITHOUT ROWID""")
+        _ensure_column(cursor, 'cache_log', 'snapshot_id', 'TEXT')
+        # Judul yang sudah dinormalisasi (lihat titles.clean_title), diisi saat lagu disimpan.
+        _ensure_column(cursor, 'tracks', 'clean_name', 'TEXT')
+        # CRC32 file download, dipakai header ZIP saat ekspor (lihat zipstream).
+        _ensure_column(cursor, 'download_index', 'crc32', 'INTEGER')
         conn.commit()
+    _initialized.add(DB_FILE)
+
+def _migrate_source_tracks(cursor):
+    # Skema lama berkunci (source_id, track_id) sehingga kemunculan berulang tergabung. Salin ke
+    # skema baru, lalu paksa playlist disinkronkan penuh lagi agar kemunculan berulangnya kembali.
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(source_tracks)")]
+    if not columns or 'occurrence' in columns:
+        return
+    cursor.execute("ALTER TABLE source_tracks RENAME TO source_tracks_old")
+    cursor.execute(SOURCE_TRACKS_SQL)
+    cursor.execute("INSERT INTO source_tracks (source_id, track_id, occurrence, added_at) SELECT source_id, track_id, 0, added_at FROM source_tracks_old")
+    cursor.execute("DROP TABLE source_tracks_old")
+    cursor.execute("DELETE FROM cache_log WHERE source_id LIKE 'playlist\\_%' ESCAPE '\\'")
+
+def _ensure_column(cursor, table, column, declaration):
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
 
+@timed_db
 def is_cache_valid(source_id, expiration_hours):
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -41,65 +121,398 @@ def is_cache_valid(source_id, expiration_hours):
                 return True
     return False
 
+@timed_db
+def get_source_state(source_id):
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT last_fetched, snapshot_id FROM cache_log WHERE source_id = ?", (source_id,)).fetchone()
+    if not row:
+        return None
+    return {'last_fetched': datetime.fromisoformat(row[0]), 'snapshot_id': row[1]}
+
+@timed_db
+def get_source_tracks(source_id):
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT track_id, added_at FROM source_tracks WHERE source_id = ?", (source_id,))
+        return dict(rows.fetchall())
+
+@timed_db
+def mark_source_synced(source_id, snapshot_id=None):
+    with get_db_connection() as conn:
+        _mark_synced(conn.cursor(), source_id, snapshot_id)
+        conn.commit()
+
+@timed_db
+def get_cache_entries(table, ids, min_fetched_at):
+    entries = {}
+    with get_db_connection() as conn:
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i+500]
+            rows = conn.execute(
+                f"SELECT id, data, fetched_at FROM {table} WHERE fetched_at >= ? AND id IN ({', '.join(['?'] * len(batch))})",
+                [min_fetched_at, *batch]
+            )
+            entries.update({row[0]: (json.loads(row[1]), row[2]) for row in rows})
+    return entries
+
+@timed_db
+def put_cache_entries(table, values, fetched_at):
+    with get_db_connection() as conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {table} (id, data, fetched_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(value), fetched_at) for key, value in values.items()]
+        )
+        conn.commit()
+
+@timed_db
+def prune_cache_entries(table, min_fetched_at, keep):
+    # Buang entri kedaluwarsa dan sisakan paling banyak `keep` entri terbaru.
+    with get_db_connection() as conn:
+        conn.execute(
+            f"DELETE FROM {table} WHERE fetched_at < ? OR id IN (SELECT id FROM {table} ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+            (min_fetched_at, keep)
+        )
+        conn.commit()
+
+@timed_db
 def get_tracks_from_db(source_id):
-    query = """
-    SELECT
-        t.*,
-        GROUP_CONCAT(a.name, '|||') AS artists_list_str,
-        GROUP_CONCAT(a.id, '|||') AS artist_ids_list_str,
-        st.added_at
-    FROM tracks t
-    JOIN track_artists ta ON t.id = ta.track_id
-    JOIN artists a ON ta.artist_id = a.id
-    JOIN source_tracks st ON t.id = st.track_id
+    # Dua query datar (lagu dan edge lagu–artis) alih-alih GROUP_CONCAT yang harus dipecah lagi per baris.
+    import pandas as pd
+    from .tracks import TrackTable
+    tracks_query = """
+    SELECT t.*, st.added_at, st.occurrence
+    FROM source_tracks st
+    JOIN tracks t ON t.id = st.track_id
+    WHERE st.source_id = ?
+    """
+    edges_query = """
+    SELECT ta.track_id, st.occurrence, a.id, a.name
+    FROM source_tracks st
+    JOIN track_artists ta ON ta.track_id = st.track_id
+    JOIN artists a ON a.id = ta.artist_id
     WHERE st.source_id = ?
-    GROUP BY t.id, st.added_at
     """
     with get_db_connection() as conn:
-        df = pd.read_sql_query(query, conn, params=(source_id,))
-    
-    if not df.empty:
-        df['artists_list'] = df['artists_list_str'].str.split('|||')
-        df['artist_ids'] = df['artist_ids_list_str'].str.split('|||')
-        df['artists'] = df['artists_list'].apply(', '.join)
-        df.drop(columns=['artists_list_str', 'artist_ids_list_str'], inplace=True)
-        df.rename(columns={'id': 'spotify_id'}, inplace=True)
-    return df
+        tracks = pd.read_sql_query(tracks_query, conn, params=(source_id,))
+        edges = conn.execute(edges_query, (source_id,)).fetchall()
+        _backfill_clean_names(conn, tracks)
+
+    tracks.rename(columns={'id': 'spotify_id'}, inplace=True)
+    edge_tracks, edge_occurrences, artist_ids, artist_names = zip(*edges) if edges else ((), (), (), ())
+    # Seperti JOIN sebelumnya, lagu tanpa artis tidak ikut dimuat.
+    has_artist = tracks['spotify_id'].isin(set(edge_tracks)).to_numpy()
+    if not has_artist.all():
+        tracks = tracks[has_artist]
+    # Baris lagu unik per (ID, kemunculan); tanpa lagu berulang cukup indeks ID saja.
+    if tracks['occurrence'].any():
+        track_pos = pd.MultiIndex.from_arrays([tracks['spotify_id'], tracks['occurrence']]).get_indexer(
+            pd.MultiIndex.from_arrays([edge_tracks, edge_occurrences]))
+    else:
+        track_pos = pd.Index(tracks['spotify_id']).get_indexer(edge_tracks)
+    return TrackTable.build(tracks.drop(columns='occurrence'), track_pos, artist_ids, artist_names)
+
+@timed_db
+def get_source_incidence(source_ids):
+    # Keanggotaan lagu di banyak sumber sekaligus, untuk analisis tumpang-tindih. Satu baris
+    # GROUP_CONCAT per sumber jauh lebih murah daripada jutaan baris (source_id, track_id);
+    # nama lagu dan edge lagu–artis lalu diambil lewat primary key untuk lagu unik saja.
+    # Mengembalikan memberships (source_id, track_id), tracks (track_id, name), dan
+    # edges (track_id, artist_id, artist_name).
+    import numpy as np
+    import pandas as pd
+    source_ids = list(source_ids)
+    owners, counts, members = [], [], []
+    with get_db_connection() as conn:
+        for i in range(0, len(source_ids), 500):
+            batch = source_ids[i:i + 500]
+            rows = conn.execute(
+                f"SELECT source_id, GROUP_CONCAT(DISTINCT track_id) FROM source_tracks WHERE source_id IN ({', '.join(['?'] * len(batch))}) GROUP BY source_id",
+                batch
+            ).fetchall()
+            for source_id, track_ids in rows:
+                track_ids = track_ids.split(',')
+                owners.append(source_id)
+                counts.append(len(track_ids))
+                members.extend(track_ids)
+        # Kolom category: cukup kode integer + nilai unik (murah dikirim ke pool proses).
+        memberships = pd.DataFrame({
+            'source_id': pd.Categorical.from_codes(np.repeat(np.arange(len(owners)), counts), pd.Index(owners, dtype=object)),
+            'track_id': pd.Categorical(np.array(members, dtype=object)),
+        })
+        unique_ids = memberships['track_id'].cat.categories.tolist()
+        rows = []
+        for i in range(0, len(unique_ids), 500):
+            batch = unique_ids[i:i + 500]
+            rows += conn.execute(
+                f"""SELECT t.id, t.name, a.id, a.name
+                FROM tracks t
+                LEFT JOIN track_artists ta ON ta.track_id = t.id
+                LEFT JOIN artists a ON a.id = ta.artist_id
+                WHERE t.id IN ({', '.join(['?'] * len(batch))})""",
+                batch
+            ).fetchall()
+    rows = pd.DataFrame(rows, columns=['track_id', 'name', 'artist_id', 'artist_name'])
+    tracks = rows[['track_id', 'name']].drop_duplicates('track_id', ignore_index=True)
+    edges = rows[['track_id', 'artist_id', 'artist_name']].dropna(subset=['artist_id']).reset_index(drop=True)
+    return memberships, tracks, edges
+
+@timed_db
+def get_track_features_since(last_rowid):
+    # Lagu (dengan audio features lengkap) yang ditulis setelah rowid tertentu. INSERT OR REPLACE
+    # memberi rowid baru, jadi lagu yang ditulis ulang juga ikut terbaca. Memakai indeks rowid.
+    complete = ' AND '.join(f"{f} IS NOT NULL" for f in AUDIO_FEATURES)
+    query = f"SELECT rowid, id, {', '.join(AUDIO_FEATURES)} FROM tracks WHERE rowid > ? AND rowid <= ? AND {complete} ORDER BY rowid"
+    with get_db_connection() as conn:
+        # Batas atas dibaca dulu agar baris yang masuk di antara dua query tidak terlewat.
+        max_rowid = max(conn.execute("SELECT MAX(rowid) FROM tracks").fetchone()[0] or 0, last_rowid)
+        rows = conn.execute(query, (last_rowid, max_rowid)).fetchall()
+    return rows, max_rowid
+
+@timed_db
+def get_track_summaries(track_ids):
+    # Nama, artis, album, dan URL untuk sejumlah kecil lagu (hasil pencarian tetangga).
+    if not track_ids:
+        return {}
+    placeholders = ', '.join(['?'] * len(track_ids))
+    query = f"""
+    SELECT t.id, t.name, t.album, t.external_url, GROUP_CONCAT(a.name, ', ')
+    FROM tracks t
+    LEFT JOIN track_artists ta ON ta.track_id = t.id
+    LEFT JOIN artists a ON a.id = ta.artist_id
+    WHERE t.id IN ({placeholders})
+    GROUP BY t.id
+    """
+    with get_db_connection() as conn:
+        rows = conn.execute(query, list(track_ids)).fetchall()
+    return {row[0]: {'spotify_id': row[0], 'name': row[1], 'album': row[2], 'external_url': row[3], 'artists': row[4] or ''} for row in rows}
+
+def _clean_names(df):
+    return clean_titles(df['name'].astype(object).fillna('').tolist())
+
+def _backfill_clean_names(conn, tracks):
+    # Lagu yang tersimpan sebelum kolom clean_name ada: hitung sekali lalu simpan.
+    missing = tracks['clean_name'].isna()
+    if not missing.any():
+        return
+    cleaned = _clean_names(tracks[missing])
+    tracks.loc[missing, 'clean_name'] = cleaned
+    conn.executemany("UPDATE tracks SET clean_name = ? WHERE id = ?", zip(cleaned, tracks.loc[missing, 'id']))
+    conn.commit()
+
+def _column_values(df, column):
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column]
+    return values.astype(object).where(values.notna(), None).tolist()
+
+def _write_tracks(cursor, source_id, table, members=True):
+    df = table.tracks
+    if 'clean_name' not in df.columns:
+        df = df.assign(clean_name=_clean_names(df))
+    track_ids = _column_values(df, 'spotify_id')
+    track_rows = list(zip(*(_column_values(df, col) for col in TRACK_COLUMNS.values())))
+
+    edge_track_ids, edge_artist_ids, _ = table.track_artists()
+    artist_rows = list(zip(table.artists['id'].tolist(), table.artists['name'].tolist()))
+    track_artist_rows = list(zip(edge_track_ids.tolist(), edge_artist_ids.tolist()))
+
+    cursor.executemany(INSERT_TRACK_SQL, track_rows)
+    cursor.executemany("INSERT OR IGNORE INTO artists (id, name) VALUES (?, ?)", artist_rows)
+    cursor.executemany("INSERT OR IGNORE INTO track_artists (track_id, artist_id) VALUES (?, ?)", track_artist_rows)
+    if members:
+        _write_members(cursor, source_id, df)
+
+def _member_rows(source_id, df):
+    # Keanggotaan sumber sesuai urutan baris; lagu yang berulang mendapat occurrence 1, 2, ...
+    occurrences = df.groupby('spotify_id', sort=False).cumcount().tolist() if len(df) else []
+    return list(zip(repeat(source_id), _column_values(df, 'spotify_id'), occurrences, _column_values(df, 'added_at')))
+
+def _write_members(cursor, source_id, df):
+    cursor.executemany("INSERT OR REPLACE INTO source_tracks (source_id, track_id, occurrence, added_at) VALUES (?, ?, ?, ?)", _member_rows(source_id, df))
+
+def _sync_members(cursor, source_id, df):
+    # Samakan keanggotaan tersimpan dengan daftar lengkap df lewat selisih per
+    # (track_id, occurrence): hanya baris yang hilang dihapus dan baris baru / berubah
+    # added_at yang ditulis, bukan menulis ulang seluruh sumber.
+    wanted = {(track_id, occurrence): added_at for _, track_id, occurrence, added_at in _member_rows(source_id, df)}
+    stored = {(track_id, occurrence): added_at for track_id, occurrence, added_at in cursor.execute(
+        "SELECT track_id, occurrence, added_at FROM source_tracks WHERE source_id = ?", (source_id,)
+    )}
+    cursor.executemany(
+        "DELETE FROM source_tracks WHERE source_id = ? AND track_id = ? AND occurrence = ?",
+        [(source_id, track_id, occurrence) for track_id, occurrence in stored.keys() - wanted.keys()]
+    )
+    cursor.executemany(
+        "INSERT OR REPLACE INTO source_tracks (source_id, track_id, occurrence, added_at) VALUES (?, ?, ?, ?)",
+        [(source_id, *key, added_at) for key, added_at in wanted.items() if key not in stored or stored[key] != added_at]
+    )
+
+def _mark_synced(cursor, source_id, snapshot_id=None):
+    cursor.execute("""
+    INSERT INTO cache_log (source_id, last_fetched, snapshot_id) VALUES (?, ?, ?)
+    ON CONFLICT(source_id) DO UPDATE SET
+        last_fetched = excluded.last_fetched,
+        snapshot_id = COALESCE(excluded.snapshot_id, cache_log.snapshot_id)
+    """, (source_id, datetime.now().isoformat(), snapshot_id))
+
+@timed_db
+def save_tracks_to_db(source_id, table, snapshot_id=None):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        _write_tracks(cursor, source_id, table)
+        _mark_synced(cursor, source_id, snapshot_id)
+        conn.commit()
 
-def save_tracks_to_db(source_id, df):
+@timed_db
+def apply_source_delta(source_id, new_tracks, removed_ids, snapshot_id=None, members=None):
+    # Sinkronisasi inkremental: hanya lagu baru yang ditulis, lagu yang hilang dari sumber dihapus.
+    # members (TrackTable daftar lengkap sumber, termasuk lagu berulang) menjadi keanggotaan
+    # sumber lewat selisih dengan yang tersimpan; data lagunya tetap hanya ditulis untuk new_tracks.
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        for _, row in df.iterrows():
-            # PERBAIKAN DI SINI: Mapping dari 'spotify_id' ke 'id'
-            track_data = {
-                'id': row.get('spotify_id'),
-                'name': row.get('name'),
-                'album': row.get('album'),
-                'release_date': row.get('release_date'),
-                'duration_ms': row.get('duration_ms'),
-                'external_url': row.get('external_url'),
-                'danceability': row.get('danceability'),
-                'energy': row.get('energy'),
-                'valence': row.get('valence'),
-                'acousticness': row.get('acousticness'),
-                'instrumentalness': row.get('instrumentalness'),
-                'liveness': row.get('liveness'),
-                'speechiness': row.get('speechiness')
-            }
-            
-            columns = ', '.join(track_data.keys())
-            placeholders = ', '.join(['?'] * len(track_data))
-            cursor.execute(f"INSERT OR REPLACE INTO tracks ({columns}) VALUES ({placeholders})", list(track_data.values()))
-            
-            if 'artist_ids' in row and 'artists_list' in row and isinstance(row['artist_ids'], list):
-                for artist_id, artist_name in zip(row['artist_ids'], row['artists_list']):
-                    cursor.execute("INSERT OR IGNORE INTO artists (id, name) VALUES (?, ?)", (artist_id, artist_name))
-                    cursor.execute("INSERT OR IGNORE INTO track_artists (track_id, artist_id) VALUES (?, ?)", (row['spotify_id'], artist_id))
-            
-            cursor.execute("INSERT OR REPLACE INTO source_tracks (source_id, track_id, added_at) VALUES (?, ?, ?)", (source_id, row['spotify_id'], row['added_at']))
-
-        cursor.execute("INSERT OR REPLACE INTO cache_log (source_id, last_fetched) VALUES (?, ?)", (source_id, datetime.now().isoformat()))
+        if not new_tracks.empty:
+            _write_tracks(cursor, source_id, new_tracks, members=members is None)
+        if members is not None:
+            _sync_members(cursor, source_id, members.tracks)
+        cursor.executemany("DELETE FROM source_tracks WHERE source_id = ? AND track_id = ?", [(source_id, tid) for tid in removed_ids])
+        _mark_synced(cursor, source_id, snapshot_id)
         conn.commit()
 
-init_db()
\ No newline at end of file
+DOWNLOAD_COLUMNS = ('spotify_id', 'format', 'quality', 'path', 'name', 'size', 'checksum', 'crc32', 'created_at', 'last_used_at')
+
+@timed_db
+def get_download_entry(spotify_id, format, quality, used_at=None):
+    # Entri indeks download untuk satu kunci; used_at memperbarui waktu pakai terakhir (LRU).
+    with get_db_connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(DOWNLOAD_COLUMNS)} FROM download_index WHERE spotify_id = ? AND format = ? AND quality = ?",
+            (spotify_id, format, quality)
+        ).fetchone()
+        if row and used_at is not None:
+            conn.execute("UPDATE download_index SET last_used_at = ? WHERE spotify_id = ? AND format = ? AND quality = ?", (used_at, spotify_id, format, quality))
+            conn.commit()
+    return dict(zip(DOWNLOAD_COLUMNS, row)) if row else None
+
+@timed_db
+def put_download_entry(entry):
+    with get_db_connection() as conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO download_index ({', '.join(DOWNLOAD_COLUMNS)}) VALUES ({', '.join(['?'] * len(DOWNLOAD_COLUMNS))})",
+            [entry.get(c) for c in DOWNLOAD_COLUMNS]
+        )
+        conn.commit()
+
+@timed_db
+def delete_download_entry(spotify_id, format, quality):
+    # Hapus entri; kembalikan True bila tidak ada entri lain yang masih memakai file yang sama.
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT path FROM download_index WHERE spotify_id = ? AND format = ? AND quality = ?", (spotify_id, format, quality)).fetchone()
+        conn.execute("DELETE FROM download_index WHERE spotify_id = ? AND format = ? AND quality = ?", (spotify_id, format, quality))
+        conn.commit()
+        if row is None:
+            return False
+        return conn.execute("SELECT COUNT(*) FROM download_index WHERE path = ?", (row[0],)).fetchone()[0] == 0
+
+@timed_db
+def get_download_usage():
+    # Total ukuran file unik (satu file bisa dipakai beberapa kunci bila isinya sama).
+    with get_db_connection() as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM download_index GROUP BY path)").fetchone()[0]
+
+@timed_db
+def get_lru_download_entries(limit, offset=0):
+    with get_db_connection() as conn:
+        rows = conn.execute(f"SELECT {', '.join(DOWNLOAD_COLUMNS)} FROM download_index ORDER BY last_used_at LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+    return [dict(zip(DOWNLOAD_COLUMNS, row)) for row in rows]
+
+@timed_db
+def get_task_download_files(min_updated_at):
+    # File download yang dirujuk antrean tugas yang belum kedaluwarsa (diperbarui sejak
+    # min_updated_at); tabel tasks dibuat oleh TaskStore dan mungkin belum ada.
+    with get_db_connection() as conn:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'").fetchone():
+            return set()
+        rows = conn.execute("""
+            SELECT DISTINCT json_extract(track.value, '$.file')
+            FROM tasks, json_each(tasks.result, '$.tracks') AS track
+            WHERE json_extract(tasks.result, '$.type') = 'download_queue' AND tasks.updated_at >= ?
+            AND json_extract(track.value, '$.file') IS NOT NULL
+        """, (min_updated_at,)).fetchall()
+    return {row[0] for row in rows}
+
+@timed_db
+def get_download_files(paths):
+    # Ukuran, CRC32, dan waktu dibuat per file di folder download (satu baris per path).
+    paths = list(dict.fromkeys(paths))
+    found = {}
+    with get_db_connection() as conn:
+        for i in range(0, len(paths), 500):
+            batch = paths[i:i + 500]
+            rows = conn.execute(
+                f"SELECT path, MAX(size), MAX(crc32), MIN(created_at) FROM download_index WHERE path IN ({', '.join(['?'] * len(batch))}) GROUP BY path",
+                batch
+            ).fetchall()
+            found.update({path: {'size': size, 'crc32': crc, 'created_at': created} for path, size, crc, created in rows})
+    return found
+
+@timed_db
+def set_download_crc(path, crc32):
+    with get_db_connection() as conn:
+        conn.execute("UPDATE download_index SET crc32 = ? WHERE path = ?", (crc32, path))
+        conn.commit()
+
+@timed_db
+def put_result_set(result_id, result_type, sections):
+    # sections: {bagian: [(teks pencarian, JSON item)]}; menggantikan isi lama result_id ini.
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM result_rows WHERE result_id = ?", (result_id,))
+        conn.execute("INSERT OR REPLACE INTO result_sets (id, type, created_at) VALUES (?, ?, ?)", (result_id, result_type, time.time()))
+        conn.executemany(
+            "INSERT INTO result_rows (result_id, section, position, search, data) VALUES (?, ?, ?, ?, ?)",
+            [(result_id, section, position, search, data) for section, rows in sections.items() for position, (search, data) in enumerate(rows)]
+        )
+        conn.commit()
+
+@timed_db
+def has_result_set(result_id):
+    with get_db_connection() as conn:
+        return conn.execute("SELECT 1 FROM result_sets WHERE id = ?", (result_id,)).fetchone() is not None
+
+def _result_filter(result_id, section, query):
+    # Syarat WHERE bersama untuk halaman dan jumlah item: query menyaring item berisi teks
+    # itu (tanpa beda huruf besar/kecil); %, _ dan \ di dalamnya dicari apa adanya.
+    sql = "result_id = ? AND section = ?"
+    params = [result_id, section]
+    if query:
+        escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        sql += " AND search LIKE ? ESCAPE '\\'"
+        params.append(f"%{escaped}%")
+    return sql, params
+
+@timed_db
+def get_result_rows(result_id, section, after, limit, query=None):
+    # Satu halaman (posisi, JSON item) setelah posisi `after`, urut posisi (cursor paging
+    # lewat primary key).
+    sql, params = _result_filter(result_id, section, query)
+    with get_db_connection() as conn:
+        return conn.execute(f"SELECT position, data FROM result_rows WHERE {sql} AND position > ? ORDER BY position LIMIT ?", [*params, after, limit]).fetchall()
+
+@timed_db
+def count_result_rows(result_id, section, query=None):
+    sql, params = _result_filter(result_id, section, query)
+    with get_db_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM result_rows WHERE {sql}", params).fetchone()[0]
+
+@timed_db
+def prune_result_sets(min_created_at):
+    # Hasil yang tidak lagi dirujuk tugas mana pun maupun cache hasil analisis dihapus;
+    # hasil yang lebih baru dari min_created_at dibiarkan (mungkin sedang disimpan).
+    with get_db_connection() as conn:
+        ids = [row[0] for row in conn.execute("""
+            SELECT id FROM result_sets WHERE created_at < ?
+            AND id NOT IN (SELECT id FROM analysis_results_cache)
+            AND id NOT IN (SELECT json_extract(result, '$.result_id') FROM tasks WHERE json_extract(result, '$.result_id') IS NOT NULL)
+        """, (min_created_at,))]
+        for result_id in ids:
+            conn.execute("DELETE FROM result_rows WHERE result_id = ?", (result_id,))
+            conn.execute("DELETE FROM result_sets WHERE id = ?", (result_id,))
+        conn.commit()
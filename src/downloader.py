@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from .config import get_config_value
+from .database import get_download_entry, put_download_entry, delete_download_entry, get_download_usage, get_lru_download_entries, get_download_files, set_download_crc, get_task_download_files
+from .metrics import registry, record, submit_traced
+from .zipstream import Member
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spotdl_worker.py')
+
+class SpotdlWorker:
+    def __init__(self):
+        self.proc = None
+        self.lines = None
+        self.fatal = None
+
+    def _ensure_started(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                [sys.executable, WORKER_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                text=True, encoding='utf-8', bufsize=1
+            )
+            self.lines = queue.Queue()
+            threading.Thread(target=self._pump, args=(self.proc, self.lines), daemon=True).start()
+
+    @staticmethod
+    def _pump(proc, lines):
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+        self.proc = None
+
+    def download(self, job, timeout):
+        self._ensure_started()
+        try:
+            self.proc.stdin.write(json.dumps(job) + '\n')
+            self.proc.stdin.flush()
+            line = self.lines.get(timeout=timeout)
+        except queue.Empty:
+            self.stop()
+            return {'ok': False, 'error': f"Timeout setelah {timeout} detik."}
+        except (BrokenPipeError, OSError) as e:
+            self.stop()
+            return {'ok': False, 'error': f"Worker spotdl berhenti: {e}"}
+        if line is None:
+            self.stop()
+            return {'ok': False, 'error': 'Worker spotdl berhenti tanpa hasil.'}
+        result = json.loads(line)
+        if result.get('fatal'):
+            self.fatal = result['fatal']
+            self.stop()
+        return result
+
+_pool_lock = threading.Lock()
+_idle_workers = None
+
+def _worker_pool():
+    global _idle_workers
+    with _pool_lock:
+        if _idle_workers is None:
+            _idle_workers = queue.Queue()
+            for _ in range(get_config_value('Download', 'workers')):
+                _idle_workers.put(SpotdlWorker())
+        return _idle_workers
+
+def shutdown_workers():
+    # Hentikan semua proses spotdl yang menganggur; pool dibuat ulang saat dibutuhkan lagi.
+    global _idle_workers
+    with _pool_lock:
+        pool, _idle_workers = _idle_workers, None
+    while pool is not None and not pool.empty():
+        pool.get_nowait().stop()
+
+def _bitrate(format, quality):
+    return quality if format in ["mp3", "m4a"] and quality != "best" else None
+
+def _cli_download(url, output_dir, format, quality, timeout):
+    cmd = ["spotdl", url, "--output", output_dir, "--format", format]
+    if _bitrate(format, quality):
+        cmd.extend(["--bitrate", quality])
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'ok': False, 'error': f"Timeout setelah {timeout} detik."}
+    except FileNotFoundError:
+        return {'ok': False, 'error': 'spotdl tidak ditemukan di PATH.'}
+    if proc.returncode != 0:
+        return {'ok': False, 'error': (proc.stderr or proc.stdout or f"exit code {proc.returncode}").strip()[-500:]}
+    return {'ok': True, 'error': None}
+
+def download_one(url, output_dir, format, quality, timeout=None, mode=None):
+    timeout = timeout or get_config_value('Download', 'timeout_seconds')
+    mode = mode or get_config_value('Download', 'mode', type='str')
+    if mode != 'worker':
+        return _cli_download(url, output_dir, format, quality, timeout)
+
+    pool = _worker_pool()
+    worker = pool.get()
+    try:
+        if worker.fatal:
+            return _cli_download(url, output_dir, format, quality, timeout)
+        job = {'id': url, 'url': url, 'output': output_dir, 'format': format, 'bitrate': _bitrate(format, quality)}
+        result = worker.download(job, timeout)
+        if result.get('fatal'):
+            print(f"Peringatan: worker spotdl tidak bisa dipakai ({result['fatal']}), beralih ke CLI.")
+            return _cli_download(url, output_dir, format, quality, timeout)
+        return result
+    finally:
+        pool.put(worker)
+
+_TRACK_ID = re.compile(r'track[/:]([A-Za-z0-9]+)')
+
+def _checksum(path):
+    # sha256 (nama file di store) dan CRC32 (header ZIP ekspor) dalam satu kali baca.
+    digest, crc = hashlib.sha256(), 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return digest.hexdigest(), crc
+
+class DownloadStore:
+    # Indeks download bersama semua user, dikunci (spotify_id, format, kualitas efektif).
+    # File disimpan berdasarkan isi (<sha256>.<ext>) di folder download; nama asli dari
+    # spotdl disimpan di indeks untuk nama unduhan. Permintaan bersamaan untuk kunci yang
+    # sama di proses ini menunggu satu download yang sama. Total ukuran dibatasi
+    # [Download] store_max_mb dengan membuang file yang paling lama tidak dipakai.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.downloads = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(url, format, quality):
+        match = _TRACK_ID.search(url or '')
+        return (match.group(1), format, _bitrate(format, quality) or 'auto') if match else None
+
+    def _hit(self, root, key):
+        entry = get_download_entry(*key, used_at=time.time())
+        if entry is None:
+            return None
+        if not os.path.exists(os.path.join(root, entry['path'])):
+            # File dihapus di luar indeks: lupakan entri dan unduh ulang.
+            delete_download_entry(*key)
+            return None
+        return entry
+
+    def fetch(self, root, url, format, quality):
+        key = self.key(url, format, quality)
+        if key is None:
+            return download_one(url, root, format, quality)
+        entry = self._hit(root, key)
+        if entry:
+            with self._lock:
+                self.hits += 1
+            return {'ok': True, 'error': None, 'file': entry['path'], 'name': entry['name'], 'cached': True}
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return dict(future.result(), cached=True)
+        try:
+            # Download lain untuk kunci yang sama mungkin baru selesai sebelum kita jadi pemimpin.
+            entry = self._hit(root, key)
+            result = {'ok': True, 'error': None, 'file': entry['path'], 'name': entry['name']} if entry else self._download(root, key, url, format, quality)
+        except Exception as e:
+            result = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        future.set_result(result)
+        return dict(result, cached=False)
+
+    def _download(self, root, key, url, format, quality):
+        staging = os.path.join(root, '.staging', uuid.uuid4().hex)
+        os.makedirs(staging)
+        try:
+            result = download_one(url, staging, format, quality)
+            if not result['ok']:
+                return result
+            produced = result.get('path') or next((os.path.join(staging, f) for f in os.listdir(staging)), None)
+            if not produced or not os.path.exists(produced):
+                return {'ok': False, 'error': 'spotdl tidak menghasilkan file.'}
+            checksum, crc = _checksum(produced)
+            name = os.path.basename(produced)
+            path = f"{checksum}{os.path.splitext(name)[1]}"
+            target = os.path.join(root, path)
+            if os.path.exists(target):
+                os.remove(produced)
+            else:
+                os.replace(produced, target)
+            now = time.time()
+            put_download_entry({
+                'spotify_id': key[0], 'format': key[1], 'quality': key[2], 'path': path, 'name': name,
+                'size': os.path.getsize(target), 'checksum': checksum, 'crc32': crc, 'created_at': now, 'last_used_at': now,
+            })
+            with self._lock:
+                self.downloads += 1
+            self.evict(root, keep=path)
+            return {'ok': True, 'error': None, 'file': path, 'name': name}
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self, root, keep=None):
+        # File yang masih dirujuk tugas yang belum kedaluwarsa (bisa diunduh lagi lewat
+        # /download_file atau ZIP) dan file keep (baru disimpan, belum tercatat di tugasnya)
+        # tidak dibuang; bila hanya file seperti itu yang tersisa, batas ukuran terlampaui sementara.
+        max_bytes = get_config_value('Download', 'store_max_mb') * 2**20
+        if max_bytes <= 0:
+            return
+        usage = get_download_usage()
+        if usage <= max_bytes:
+            return
+        protected = get_task_download_files(time.time() - get_config_value('Tasks', 'ttl_hours', type='float') * 3600)
+        protected.add(keep)
+        skipped = 0
+        while usage > max_bytes:
+            entries = get_lru_download_entries(100, skipped)
+            if not entries:
+                break
+            for entry in entries:
+                if usage <= max_bytes:
+                    break
+                if entry['path'] in protected:
+                    skipped += 1
+                    continue
+                if delete_download_entry(entry['spotify_id'], entry['format'], entry['quality']):
+                    try:
+                        os.remove(os.path.join(root, entry['path']))
+                    except FileNotFoundError:
+                        pass
+                    usage -= entry['size']
+                with self._lock:
+                    self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'coalesced': self.coalesced, 'downloads': self.downloads,
+                    'evicted': self.evicted, 'bytes': get_download_usage()}
+
+download_store = DownloadStore()
+
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+def _archive_name(track, used):
+    # Nama anggota ZIP dari nama asli spotdl; nama kembar diberi akhiran " (2)", " (3)", ...
+    base, ext = os.path.splitext(_UNSAFE_NAME.sub('_', track.get('filename') or track['file']))
+    name, n = base + ext, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base} ({n}){ext}"
+    used.add(name.lower())
+    return name
+
+def zip_members(root, tracks, used_names):
+    # Anggota ZIP untuk lagu yang sudah selesai (punya 'file'). Ukuran dan CRC32 diambil dari
+    # indeks download; entri lama tanpa CRC dihitung sekali lalu disimpan. File yang sudah
+    # tidak ada (dibuang dari store) dilewati.
+    files = get_download_files(t['file'] for t in tracks)
+    members = []
+    for track in tracks:
+        path = os.path.join(root, track['file'])
+        if not os.path.exists(path):
+            continue
+        info = files.get(track['file']) or {}
+        size, crc = info.get('size'), info.get('crc32')
+        if size is None or crc is None:
+            size, crc = os.path.getsize(path), _checksum(path)[1]
+            if info:
+                set_download_crc(track['file'], crc)
+        members.append(Member(_archive_name(track, used_names), path, size, crc, info.get('created_at') or os.path.getmtime(path)))
+    return members
+
+def download_tracks(tracks, output_dir, format, quality, on_update, cancelled=None):
+    # on_update(index, status, error, throughput_tpm, **fields) dipanggil setiap status lagu berubah;
+    # saat selesai fields berisi file (nama di output_dir), filename (nama asli dari spotdl), dan cached.
+    # Bila cancelled() bernilai benar, lagu yang belum mulai dilewati.
+    retries = get_config_value('Download', 'retries')
+    started = time.monotonic()
+    finished = {'done': 0}
+    lock = threading.Lock()
+
+    def throughput():
+        minutes = (time.monotonic() - started) / 60
+        return round(finished['done'] / minutes, 2) if minutes > 0 else 0.0
+
+    def run(index, track):
+        result = {'ok': False, 'error': None}
+        if cancelled and cancelled():
+            return {'ok': False, 'error': 'Dibatalkan.', 'cancelled': True}
+        track_started = time.perf_counter()
+        for attempt in range(retries + 1):
+            on_update(index, 'Mengunduh...' if attempt == 0 else f'Mencoba ulang ({attempt}/{retries})...', None, throughput())
+            result = download_store.fetch(output_dir, track['url'], format, quality)
+            if result['ok']:
+                break
+        seconds = time.perf_counter() - track_started
+        outcome = ('cached' if result.get('cached') else 'ok') if result['ok'] else 'failed'
+        registry.observe('download_track_duration_seconds', seconds, result=outcome)
+        record('downloads', outcome, seconds, retries=attempt)
+        with lock:
+            finished['done'] += 1
+        fields = {'file': result['file'], 'filename': result['name'], 'cached': result['cached']} if result['ok'] and result.get('file') else {}
+        on_update(index, 'Selesai' if result['ok'] else 'Gagal', result.get('error'), throughput(), **fields)
+        return result
+
+    with ThreadPoolExecutor(max_workers=get_config_value('Download', 'workers')) as pool:
+        results = [f.result() for f in [submit_traced(pool, run, i, track) for i, track in enumerate(tracks)]]
+    return {
+        'completed': sum(r['ok'] for r in results),
+        'failed': sum(not r['ok'] and not r.get('cancelled') for r in results),
+        'cancelled': sum(bool(r.get('cancelled')) for r in results),
+        'cached': sum(bool(r['ok'] and r.get('cached')) for r in results),
+        'throughput_tpm': throughput(),
+    }
@@ -0,0 +1,168 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urlparse
+from spotipy.exceptions import SpotifyException
+from .cache import audio_features_cache, artist_genres_cache
+from .config import get_config_value
+from .metrics import record_spotify_retry, submit_traced, span
+
+_host_lock = threading.Lock()
+_host_slots = {}
+
+def _host_semaphore(sp_client):
+    host = urlparse(getattr(sp_client, 'prefix', '')).netloc or 'api.spotify.com'
+    with _host_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(get_config_value('Spotify', 'host_concurrency'))
+        return _host_slots[host]
+
+def _retry_delay(error, attempt):
+    retry_after = (getattr(error, 'headers', None) or {}).get('Retry-After')
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return get_config_value('Spotify', 'backoff_seconds', type='float') * (2 ** attempt)
+
+def call_with_backoff(sp_client, fn, *args, **kwargs):
+    max_retries = get_config_value('Spotify', 'max_retries')
+    for attempt in range(max_retries + 1):
+        with _host_semaphore(sp_client):
+            try:
+                return fn(*args, **kwargs)
+            except SpotifyException as e:
+                retryable = e.http_status == 429 or (e.http_status or 0) >= 500
+                if not retryable or attempt == max_retries:
+                    raise
+                delay = _retry_delay(e, attempt)
+                record_spotify_retry(getattr(getattr(fn, 'func', fn), '__name__', 'call'), e.http_status)
+        time.sleep(delay)
+
+def _page_offsets(first_page, limit):
+    if not first_page.get('next'):
+        return []
+    return list(range(limit, first_page.get('total') or 0, limit))
+
+def fetch_all_items(sp_client, fetch_page, limit, on_items=None, pool=None):
+    # Halaman pertama memberi 'total', sisa offset diambil paralel lalu disusun ulang sesuai urutan.
+    first = call_with_backoff(sp_client, fetch_page, limit=limit, offset=0)
+    pages = {0: first['items']}
+    if on_items:
+        on_items(first['items'])
+    offsets = _page_offsets(first, limit)
+    if offsets:
+        own_pool = pool is None
+        pool = pool or ThreadPoolExecutor(max_workers=get_config_value('Spotify', 'max_workers'))
+        try:
+            futures = {submit_traced(pool, call_with_backoff, sp_client, fetch_page, limit=limit, offset=o): o for o in offsets}
+            for future in as_completed(futures):
+                items = future.result()['items']
+                pages[futures[future]] = items
+                if on_items:
+                    on_items(items)
+        finally:
+            if own_pool:
+                pool.shutdown(wait=True)
+    return [item for offset in sorted(pages) for item in pages[offset]]
+
+def audio_features_batch(sp_client, batch):
+    return dict(zip(batch, call_with_backoff(sp_client, sp_client.audio_features, batch)))
+
+def artist_genres_batch(sp_client, batch):
+    found = {a['id']: a['genres'] for a in call_with_backoff(sp_client, sp_client.artists, batch)['artists'] if a}
+    return {aid: found.get(aid) for aid in batch}
+
+class _Batcher:
+    # Mengumpulkan ID unik, melayani yang sudah ada di cache, dan mengirim sisanya
+    # ke API dalam batch berukuran penuh.
+    def __init__(self, pool, fn, size, cache=None, label='data'):
+        self.pool, self.fn, self.size, self.cache, self.label = pool, fn, size, cache, label
+        self.seen, self.pending, self.futures, self.found = set(), [], [], {}
+
+    def add(self, ids):
+        new = [i for i in dict.fromkeys(ids) if i and i not in self.seen]
+        self.seen.update(new)
+        if self.cache is not None and new:
+            hits = self.cache.get_many(new)
+            self.found.update(hits)
+            new = [i for i in new if i not in hits]
+        self.pending.extend(new)
+        while len(self.pending) >= self.size:
+            self.flush()
+
+    def _run(self, batch):
+        try:
+            values = self.fn(batch)
+        except Exception as e:
+            print(f"Peringatan: Gagal mengambil {self.label}. Error: {e}")
+            return {}
+        if self.cache is not None:
+            self.cache.put_many(values)
+        return values
+
+    def flush(self):
+        if self.pending:
+            batch, self.pending = self.pending[:self.size], self.pending[self.size:]
+            self.futures.append(submit_traced(self.pool, self._run, batch))
+
+    def results(self):
+        while self.pending:
+            self.flush()
+        merged = dict(self.found)
+        for future in self.futures:
+            merged.update(future.result())
+        return merged
+
+def _feature_batcher(pool, sp_client):
+    return _Batcher(pool, partial(audio_features_batch, sp_client), 100, audio_features_cache, 'audio features')
+
+def _genre_batcher(pool, sp_client):
+    return _Batcher(pool, partial(artist_genres_batch, sp_client), 50, artist_genres_cache, 'genre artis')
+
+def _features_list(values):
+    return [f for f in values.values() if f]
+
+def _genre_map(values):
+    return {aid: genres for aid, genres in values.items() if genres is not None}
+
+def lookup_audio_features(sp_client, ids):
+    with ThreadPoolExecutor(max_workers=get_config_value('Spotify', 'max_workers')) as pool:
+        batcher = _feature_batcher(pool, sp_client)
+        batcher.add(ids)
+        return _features_list(batcher.results())
+
+def lookup_artist_genres(sp_client, ids):
+    with ThreadPoolExecutor(max_workers=get_config_value('Spotify', 'max_workers')) as pool:
+        batcher = _genre_batcher(pool, sp_client)
+        batcher.add(ids)
+        return _genre_map(batcher.results())
+
+def _item_track(item):
+    if not item:
+        return None
+    return item.get('track') if 'track' in item else item
+
+def fetch_tracks_pipelined(sp_client, fetch_page, limit, features=True, genres=True):
+    # Lookup audio_features (100 ID) dan artists (50 ID) dimulai begitu halaman lagu tiba,
+    # bukan setelah seluruh paging selesai.
+    with ThreadPoolExecutor(max_workers=get_config_value('Spotify', 'max_workers')) as pool:
+        feature_batches = _feature_batcher(pool, sp_client)
+        genre_batches = _genre_batcher(pool, sp_client)
+
+        def on_items(items):
+            tracks = [t for t in map(_item_track, items) if t and t.get('id')]
+            if features:
+                feature_batches.add(t['id'] for t in tracks)
+            if genres:
+                genre_batches.add(a.get('id') for t in tracks for a in t.get('artists', []))
+
+        with span('sync.paging'):
+            items = fetch_all_items(sp_client, fetch_page, limit, on_items=on_items, pool=pool)
+        # Sisa lookup yang belum selesai saat paging berakhir.
+        with span('sync.lookups'):
+            return {
+                'items': items,
+                'features': _features_list(feature_batches.results()),
+                'genres': _genre_map(genre_batches.results()),
+            }
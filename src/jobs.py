@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from .config import get_config_value
+from .metrics import run_traced, merge_trace
+from .tasks import task_store
+
+# Penjadwal tugas latar belakang: sejumlah worker tetap mengambil job dari antrean
+# prioritas (angka kecil lebih dulu), dengan batas job berjalan per user.
+#
+# Antrean dan thread worker milik proses ini, tetapi dengan store (TaskStore) batas per user
+# dan pembatalan memakai status tugas bersama di SQLite: job baru diambil lewat
+# store.claim (atomik, menghitung tugas running user di semua worker proses) dan tanda
+# pembatalan dari proses mana pun terlihat oleh proses yang menjalankan job. Tanpa store
+# semuanya hanya berlaku di dalam satu proses.
+
+PRIORITY_TRACK = 0
+PRIORITY_DOWNLOAD = 1
+PRIORITY_ANALYSIS = 2
+
+class QuotaExceeded(Exception):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id, fn, args, user, priority):
+        self.id, self.fn, self.args, self.user, self.priority = job_id, fn, args, user, priority
+        self.cancel_event = threading.Event()
+        self.state = 'queued'
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+
+class JobScheduler:
+    def __init__(self, workers=None, per_user=None, max_queued_per_user=None, store=None):
+        self.workers = workers or get_config_value('Jobs', 'workers')
+        self.per_user = per_user or get_config_value('Jobs', 'per_user')
+        self.max_queued_per_user = max_queued_per_user or get_config_value('Jobs', 'max_queued_per_user')
+        self.store = store
+        self._cond = threading.Condition()
+        self._heap = []
+        self._order = itertools.count()
+        self._jobs = {}
+        self._running = Counter()
+        self._queued = Counter()
+        self._waits = deque(maxlen=1000)
+        self._finished = Counter()
+        self._threads = []
+        self._cpu_pool = None
+
+    def _start(self):
+        if not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job_id, fn, *args, user=None, priority=PRIORITY_ANALYSIS):
+        # Tugas job ini sendiri sudah tercatat pending di store, jadi tidak ikut dihitung.
+        queued = self.store.count_user_tasks(user, 'pending', exclude=job_id) if self.store else 0
+        with self._cond:
+            if max(queued, self._queued[user]) >= self.max_queued_per_user:
+                raise QuotaExceeded(f"Terlalu banyak tugas dalam antrean (maksimum {self.max_queued_per_user}).")
+            job = Job(job_id, fn, args, user, priority)
+            self._jobs[job_id] = job
+            self._queued[user] += 1
+            heapq.heappush(self._heap, (priority, next(self._order), job))
+            self._start()
+            self._cond.notify()
+        return job
+
+    def _next_job(self):
+        # Job dengan prioritas tertinggi yang user-nya belum mencapai batas job berjalan.
+        # Job yang ternyata sudah dibatalkan lewat store dibuang dari antrean.
+        busy = set()
+        for entry in sorted(self._heap):
+            job = entry[2]
+            if job.user in busy or self._running[job.user] >= self.per_user:
+                continue
+            claim = self.store.claim(job.id, job.user, self.per_user) if self.store else 'claimed'
+            if claim == 'busy':
+                busy.add(job.user)
+                continue
+            self._heap.remove(entry)
+            heapq.heapify(self._heap)
+            if claim == 'cancelled':
+                job.state = 'cancelled'
+                self._queued[job.user] -= 1
+                self._finished['cancelled'] += 1
+                del self._jobs[job.id]
+                continue
+            return job
+        return None
+
+    def _work(self):
+        # Dengan store, slot user bisa dibebaskan job di proses lain tanpa notify di sini;
+        # antrean diperiksa ulang tiap poll_interval.
+        timeout = get_config_value('Tasks', 'poll_interval', type='float') if self.store else None
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait(timeout)
+                    job = self._next_job()
+                self._queued[job.user] -= 1
+                self._running[job.user] += 1
+                job.state, job.started_at = 'running', time.monotonic()
+                self._waits.append(job.started_at - job.submitted_at)
+            try:
+                job.fn(*job.args)
+                job.state = 'cancelled' if job.cancel_event.is_set() else 'done'
+            except JobCancelled:
+                job.state = 'cancelled'
+            except Exception as e:
+                print(f"Peringatan: job {job.id} gagal. Error: {e}")
+                job.state = 'failed'
+            with self._cond:
+                self._running[job.user] -= 1
+                self._finished[job.state] += 1
+                del self._jobs[job.id]
+                self._cond.notify_all()
+
+    def cancel(self, job_id):
+        # Job di antrean langsung dibuang; job yang berjalan berhenti di titik
+        # pemeriksaan berikutnya (raise_if_cancelled). Mengembalikan state job saat dibatalkan.
+        # Dengan store, job di worker proses lain ikut dibatalkan lewat tanda di store.
+        with self._cond:
+            job = self._jobs.get(job_id)
+            state = None
+            if job is not None and not job.cancel_event.is_set():
+                job.cancel_event.set()
+                state = job.state
+                if state == 'queued':
+                    self._heap = [entry for entry in self._heap if entry[2] is not job]
+                    heapq.heapify(self._heap)
+                    self._queued[job.user] -= 1
+                    self._finished['cancelled'] += 1
+                    del self._jobs[job_id]
+        if self.store is not None:
+            return self.store.request_cancel(job_id) or state
+        return state
+
+    def is_cancelled(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if not job.cancel_event.is_set() and self.store is not None and self.store.is_cancel_requested(job_id):
+            job.cancel_event.set()
+        return job.cancel_event.is_set()
+
+    def raise_if_cancelled(self, job_id):
+        if self.is_cancelled(job_id):
+            raise JobCancelled(job_id)
+
+    def run_cpu(self, fn, *args):
+        # Tahap berat di CPU dijalankan di pool proses agar tidak berebut GIL dengan
+        # thread yang melayani request. cpu_executor = thread menjalankannya langsung.
+        if get_config_value('Jobs', 'cpu_executor', type='str') != 'process':
+            return fn(*args)
+        with self._cond:
+            if self._cpu_pool is None:
+                # spawn, bukan fork: fork dari server multithread bisa menyalin lock yang sedang
+                # dipegang thread lain (mis. registry metrik) sehingga proses anak macet selamanya.
+                self._cpu_pool = ProcessPoolExecutor(max_workers=get_config_value('Jobs', 'cpu_workers'),
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            pool = self._cpu_pool
+        timeout = get_config_value('Jobs', 'cpu_timeout', type='float') or None
+        future = pool.submit(run_traced, fn, *args)
+        try:
+            # Span yang tercatat di proses anak dibawa pulang dan digabung ke Trace tugas ini.
+            result, exported = future.result(timeout=timeout)
+        except FuturesTimeout:
+            self._discard_cpu_pool(pool)
+            raise TimeoutError(f"Tahap analisis melebihi batas waktu {timeout:g} detik.") from None
+        merge_trace(exported)
+        return result
+
+    def _discard_cpu_pool(self, pool):
+        # Pool dengan proses yang macet diganti baru; shutdown() tidak menghentikan proses
+        # yang sedang berjalan, jadi proses anaknya dihentikan paksa.
+        with self._cond:
+            if self._cpu_pool is pool:
+                self._cpu_pool = None
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def metrics(self):
+        with self._cond:
+            now = time.monotonic()
+            queued = [entry[2] for entry in self._heap]
+            waits = sorted(self._waits)
+            return {
+                'workers': self.workers,
+                'queue_depth': len(queued),
+                'queue_depth_by_priority': dict(Counter(job.priority for job in queued)),
+                'running': sum(self._running.values()),
+                'oldest_queued_seconds': round(max((now - job.submitted_at for job in queued), default=0.0), 3),
+                'wait_seconds': {
+                    'count': len(waits),
+                    'mean': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                    'max': round(waits[-1], 3) if waits else 0.0,
+                },
+                'finished': dict(self._finished),
+            }
+
+scheduler = JobScheduler(store=task_store)
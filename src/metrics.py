@@ -0,0 +1,249 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+# Instrumentasi ringan tanpa dependensi tambahan: counter dan histogram berlabel yang
+# dirender dalam format teks Prometheus (/metrics), plus Trace per tugas (durasi tahap,
+# panggilan Spotify, operasi database, download per lagu) untuk ditampilkan di status tugas.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+HELP = {
+    'stage_duration_seconds': ('histogram', 'Durasi tahap tugas (sync.*, analysis.*, download.*).'),
+    'task_duration_seconds': ('histogram', 'Durasi total tugas per jenis dan status akhir.'),
+    'spotify_request_duration_seconds': ('histogram', 'Latensi request HTTP ke Spotify per endpoint.'),
+    'spotify_requests_total': ('counter', 'Request HTTP ke Spotify per endpoint dan status.'),
+    'spotify_retries_total': ('counter', 'Percobaan ulang panggilan Spotify (backoff 429/5xx dan transport).'),
+    'db_operation_duration_seconds': ('histogram', 'Durasi operasi database per fungsi.'),
+    'download_track_duration_seconds': ('histogram', 'Durasi download per lagu (spotdl).'),
+}
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets = self._histograms.get(key)
+            if buckets is None:
+                buckets = self._histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            buckets[-2] += seconds
+            buckets[-1] += 1
+
+    def render(self, extra=None):
+        # extra: {nama: (jenis, [(labels dict, nilai)])} yang dihitung saat request (antrean, cache).
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+        lines, described = [], set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, (kind, name))[1]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append(f"{name}{_label_text(labels)} {value}")
+        for (name, labels), values in histograms:
+            describe(name, 'histogram')
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{name}_sum{_label_text(labels)} {values[-2]:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {values[-1]}")
+        for name, (kind, samples) in (extra or {}).items():
+            describe(name, kind)
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(tuple(sorted(labels.items())))} {value}")
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+class Trace:
+    # Ringkasan waktu satu tugas: {bagian: {kunci: {'count', 'seconds', ...}}}.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections = {}
+        self.started = time.monotonic()
+
+    def add(self, section, key, seconds=0.0, count=1, **fields):
+        with self._lock:
+            entry = self._sections.setdefault(section, {}).setdefault(key, {'count': 0, 'seconds': 0.0})
+            entry['count'] += count
+            entry['seconds'] += seconds
+            for field, value in fields.items():
+                entry[field] = entry.get(field, 0) + value
+
+    def merge(self, exported):
+        for section, entries in exported.items():
+            for key, entry in entries.items():
+                self.add(section, key, **entry)
+
+    def export(self):
+        with self._lock:
+            return {section: {key: dict(entry) for key, entry in entries.items()} for section, entries in self._sections.items()}
+
+    def summary(self):
+        exported = self.export()
+        for entries in exported.values():
+            for entry in entries.values():
+                entry['seconds'] = round(entry['seconds'], 4)
+        exported['total_seconds'] = round(time.monotonic() - self.started, 3)
+        return exported
+
+_current = contextvars.ContextVar('trace', default=None)
+
+def current_trace():
+    return _current.get()
+
+def record(section, key, seconds, **fields):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(section, key, seconds, **fields)
+
+def submit_traced(pool, fn, *args, **kwargs):
+    # ThreadPoolExecutor tidak mewarisi contextvars; bawa Trace tugas ke thread pool.
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        registry.observe('stage_duration_seconds', seconds, stage=stage)
+        record('stages', stage, seconds)
+
+def timed_db(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            registry.observe('db_operation_duration_seconds', seconds, operation=fn.__name__)
+            record('db', fn.__name__, seconds)
+    return wrapper
+
+_KNOWN_SEGMENTS = {
+    'me', 'tracks', 'playlists', 'albums', 'artists', 'audio-features', 'users', 'top',
+    'following', 'api', 'token', 'browse', 'recommendations', 'search', 'authorize',
+}
+
+def endpoint_label(path):
+    # /v1/playlists/<id>/tracks -> playlists/{id}/tracks agar label tidak meledak per ID.
+    parts = [p for p in path.split('?')[0].strip('/').split('/') if p and p != 'v1']
+    return '/'.join(p if p in _KNOWN_SEGMENTS else '{id}' for p in parts) or '/'
+
+def record_spotify_response(response, *args, **kwargs):
+    # Hook response requests.Session: latensi dan status per endpoint, plus retry transport urllib3.
+    endpoint = endpoint_label(response.request.path_url)
+    seconds = response.elapsed.total_seconds()
+    registry.inc('spotify_requests_total', endpoint=endpoint, status=response.status_code)
+    registry.observe('spotify_request_duration_seconds', seconds, endpoint=endpoint)
+    retries = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+    if retries:
+        registry.inc('spotify_retries_total', len(retries), endpoint=endpoint, reason='transport')
+    record('spotify', endpoint, seconds, retries=len(retries), errors=int(response.status_code >= 400))
+
+def record_spotify_retry(method, status):
+    registry.inc('spotify_retries_total', endpoint=method, reason=str(status))
+    record('spotify_backoff', method, 0.0, retries=1)
+
+def run_traced(fn, *args):
+    # Dipanggil di pool proses (JobScheduler.run_cpu): kembalikan hasil beserta Trace-nya
+    # agar bisa digabung ke Trace tugas di proses utama.
+    trace = Trace()
+    token = _current.set(trace)
+    try:
+        return fn(*args), trace.export()
+    finally:
+        _current.reset(token)
+
+def merge_trace(exported):
+    # Gabungkan hasil run_traced ke Trace saat ini dan ke registry proses ini.
+    trace = _current.get()
+    if trace is not None:
+        trace.merge(exported)
+    for stage, entry in exported.get('stages', {}).items():
+        registry.observe('stage_duration_seconds', entry['seconds'], stage=stage)
+    for operation, entry in exported.get('db', {}).items():
+        registry.observe('db_operation_duration_seconds', entry['seconds'], operation=operation)
+
+class SamplingProfiler:
+    # Profiler sampling sederhana untuk satu thread: stack diambil tiap interval dan
+    # dihitung dalam format "collapsed" (fungsi;fungsi;... jumlah) untuk flamegraph.
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def task_trace(kind, profile_path=None, interval=0.005):
+    # Trace untuk satu tugas di thread saat ini; bila profile_path diisi, thread ini juga
+    # diprofil dan hasilnya ditulis ke file tersebut saat tugas selesai.
+    trace = Trace()
+    token = _current.set(trace)
+    profiler = SamplingProfiler(threading.get_ident(), interval).start() if profile_path else None
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        if profiler:
+            profiler.stop()
+            profiler.write(profile_path)
+
+def record_task(kind, status, trace):
+    registry.observe('task_duration_seconds', time.monotonic() - trace.started, kind=kind, status=status)
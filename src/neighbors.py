@@ -0,0 +1,169 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from .config import get_config_value
+from .database import AUDIO_FEATURES, get_track_features_since, get_source_tracks, get_source_state
+
+# Indeks tetangga terdekat atas audio features semua lagu di cache (tabel tracks).
+# Fitur dinormalisasi (z-score per kolom) lalu disimpan dalam KD-tree. Baris yang
+# ditulis setelah tree dibangun dicari secara brute force sampai jumlahnya melewati
+# brute_force_max, baru tree dibangun ulang. Lagu baru dibaca lewat rowid (lihat
+# get_track_features_since), jadi setiap query hanya membaca selisihnya, bukan seluruh tabel.
+
+class FeatureIndex:
+    def __init__(self, max_profiles=256):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = []
+        self._positions = {}
+        self._raw = np.empty((0, len(AUDIO_FEATURES)))
+        self._scaled = np.empty((0, len(AUDIO_FEATURES)))
+        self._live = np.empty(0, dtype=bool)
+        self._mean = np.zeros(len(AUDIO_FEATURES))
+        self._std = np.ones(len(AUDIO_FEATURES))
+        self._tree = None
+        self._tree_size = 0
+        self._stale_in_tree = 0
+        self._last_rowid = 0
+        self.rebuilds = 0
+
+    def _append(self, rows):
+        ids, vectors = [], []
+        for row in rows:
+            track_id, vector = row[1], np.asarray(row[2:], dtype=float)
+            old = self._positions.get(track_id)
+            if old is not None:
+                if np.array_equal(self._raw[old], vector):
+                    continue
+                # Lagu ditulis ulang dengan fitur berbeda: baris lama dinonaktifkan.
+                self._live[old] = False
+                if old < self._tree_size:
+                    self._stale_in_tree += 1
+            self._positions[track_id] = len(self._ids) + len(ids)
+            ids.append(track_id)
+            vectors.append(vector)
+        if not ids:
+            return
+        raw = np.vstack(vectors)
+        self._ids.extend(ids)
+        self._raw = np.vstack([self._raw, raw])
+        self._scaled = np.vstack([self._scaled, (raw - self._mean) / self._std])
+        self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+
+    def _rebuild(self):
+        # Buang baris nonaktif, hitung ulang normalisasi, lalu bangun tree (atau tidak sama
+        # sekali bila koleksinya cukup kecil untuk brute force).
+        keep = np.flatnonzero(self._live)
+        self._ids = [self._ids[i] for i in keep]
+        self._positions = {track_id: i for i, track_id in enumerate(self._ids)}
+        self._raw = self._raw[keep]
+        self._live = np.ones(len(keep), dtype=bool)
+        if len(keep):
+            self._mean = self._raw.mean(axis=0)
+            self._std = np.maximum(self._raw.std(axis=0), 1e-6)
+        self._scaled = (self._raw - self._mean) / self._std
+        if len(keep) > get_config_value('Neighbors', 'brute_force_max'):
+            # scikit-learn baru dimuat saat tree pertama kali dibutuhkan (start-up tetap ringan).
+            from sklearn.neighbors import KDTree
+            self._tree, self._tree_size = KDTree(self._scaled), len(keep)
+        else:
+            self._tree, self._tree_size = None, 0
+        self._stale_in_tree = 0
+        self.rebuilds += 1
+
+    def refresh(self):
+        with self._lock:
+            rows, self._last_rowid = get_track_features_since(self._last_rowid)
+            first_load = not self._ids
+            self._append(rows)
+            pending = len(self._ids) - self._tree_size
+            limit = get_config_value('Neighbors', 'brute_force_max')
+            if first_load and self._ids or pending > limit or self._stale_in_tree > limit:
+                self._rebuild()
+
+    def _tree_candidates(self, scaled, k, exclude):
+        # Perbesar jumlah tetangga yang diminta sampai cukup banyak yang lolos filter
+        # (baris nonaktif / lagu yang dikecualikan), alih-alih meminta k + len(exclude) sekaligus.
+        want = k + self._stale_in_tree
+        while True:
+            want = min(want, self._tree_size)
+            dist, idx = self._tree.query(scaled[None, :], k=want)
+            usable = sum(1 for i in idx[0] if self._live[i] and self._ids[i] not in exclude)
+            if usable >= k or want == self._tree_size:
+                return [idx[0]], [dist[0]]
+            want *= 4
+
+    def _search(self, vector, k, exclude):
+        scaled = (vector - self._mean) / self._std
+        positions, distances = [], []
+        if self._tree is not None:
+            positions, distances = self._tree_candidates(scaled, k, exclude)
+        pending = self._scaled[self._tree_size:]
+        if len(pending):
+            positions.append(np.arange(self._tree_size, len(self._ids)))
+            distances.append(np.sqrt(((pending - scaled) ** 2).sum(axis=1)))
+        if not positions:
+            return []
+        positions, distances = np.concatenate(positions), np.concatenate(distances)
+        results = []
+        for i in np.argsort(distances, kind='stable'):
+            position = positions[i]
+            track_id = self._ids[position]
+            if self._live[position] and track_id not in exclude:
+                results.append((track_id, float(distances[i])))
+                if len(results) == k:
+                    break
+        return results
+
+    def similar_to_track(self, track_id, k):
+        # None bila lagu tidak ada di cache atau belum punya audio features lengkap.
+        self.refresh()
+        with self._lock:
+            position = self._positions.get(track_id)
+            if position is None:
+                return None
+            return self._search(self._raw[position], k, {track_id})
+
+    def taste_profile(self, track_ids):
+        # Rata-rata audio features lagu-lagu sumber yang ada di indeks (None bila tidak ada).
+        self.refresh()
+        with self._lock:
+            positions = [p for p in map(self._positions.get, track_ids) if p is not None]
+            if not positions:
+                return None
+            return dict(zip(AUDIO_FEATURES, self._raw[positions].mean(axis=0).tolist()))
+
+    def _source_profile(self, source_id):
+        # Profil dan himpunan lagu sumber, disimpan sampai sumber disinkronkan ulang
+        # (last_fetched berubah) atau ada lagu baru masuk indeks.
+        state = get_source_state(source_id)
+        version = (state and state['last_fetched'], self._last_rowid)
+        with self._lock:
+            cached = self._profiles.get(source_id)
+            if cached and cached[0] == version:
+                self._profiles.move_to_end(source_id)
+                return cached[1], cached[2]
+        track_ids = set(get_source_tracks(source_id))
+        profile = self.taste_profile(track_ids)
+        with self._lock:
+            self._profiles[source_id] = (version, profile, track_ids)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile, track_ids
+
+    def similar_to_source(self, source_id, k, exclude_known=True):
+        # Lagu terdekat dengan profil selera (rata-rata fitur) sebuah sumber, mis. liked_songs_<user>.
+        self.refresh()
+        profile, track_ids = self._source_profile(source_id)
+        if profile is None:
+            return None, None
+        with self._lock:
+            return profile, self._search(np.array([profile[f] for f in AUDIO_FEATURES]), k, track_ids if exclude_known else set())
+
+    def stats(self):
+        with self._lock:
+            return {'tracks': int(self._live.sum()), 'in_tree': self._tree_size,
+                    'pending': len(self._ids) - self._tree_size, 'rebuilds': self.rebuilds}
+
+feature_index = FeatureIndex()
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from .config import get_config_value
+from .metrics import span
+
+# Analisis tumpang-tindih banyak sumber (semua playlist user + Liked Songs) sekaligus.
+# Keanggotaan disusun sebagai matriks insidensi jarang sumber×lagu A (dan sumber×artis B);
+# jumlah lagu bersama semua pasangan sumber adalah A·Aᵀ, sehingga Jaccard, containment,
+# dan deteksi duplikat dihitung dengan beberapa operasi matriks, bukan merge per pasangan.
+
+def _incidence(rows, cols, shape):
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+def _ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+def _pairwise(matrix):
+    # Irisan, Jaccard, dan containment (irisan / sumber yang lebih kecil) semua pasangan baris.
+    # Hasil S×S hampir selalu padat; selama matriks kecil (<= dense_max_cells, sehingga hitungan
+    # di float32 tetap eksak) perkalian padat BLAS jauh lebih cepat daripada sparse×sparse.
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+    if matrix.shape[0] * matrix.shape[1] <= get_config_value('Overlap', 'dense_max_cells'):
+        dense = matrix.astype(np.float32).toarray()
+        shared = np.rint(dense @ dense.T).astype(np.int64)
+    else:
+        shared = (matrix @ matrix.T).toarray()
+    jaccard = _ratio(shared, sizes[:, None] + sizes[None, :] - shared)
+    containment = _ratio(shared, np.minimum(sizes[:, None], sizes[None, :]))
+    return sizes, shared, jaccard, containment
+
+def _positions(index, column):
+    # Posisi nilai kolom di index (-1 bila tidak ada); kolom category cukup dipetakan per kategori.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return np.append(index.get_indexer(column.cat.categories), -1)[column.cat.codes.to_numpy()]
+    return index.get_indexer(column)
+
+def incidence_matrices(source_ids, memberships, edges):
+    # A: sumber×lagu, E: lagu×artis (biner, CSR), beserta ID lagu dan tabel artis per kolom.
+    rows = _positions(pd.Index(source_ids), memberships['source_id'])
+    known = rows >= 0
+    track_codes, track_ids = pd.factorize(memberships['track_id'][known])
+    track_ids = np.asarray(track_ids, dtype=object)
+    A = _incidence(rows[known], track_codes, (len(source_ids), len(track_ids)))
+    edge_tracks = pd.Index(track_ids).get_indexer(edges['track_id'])
+    edges = edges[edge_tracks >= 0]
+    artist_codes, artist_ids = pd.factorize(edges['artist_id'])
+    artists = pd.DataFrame({'id': artist_ids, 'name': edges['artist_name'].groupby(artist_codes).first().to_numpy()})
+    E = _incidence(edge_tracks[edge_tracks >= 0], artist_codes, (len(track_ids), len(artists)))
+    return A, E, track_ids, artists
+
+def overlap_analysis(sources, memberships, tracks, edges):
+    # sources: [(source_id, nama)]; memberships, tracks, dan edges seperti hasil
+    # database.get_source_incidence. Hasil berupa tipe Python biasa (disimpan sebagai JSON).
+    top_n = get_config_value('Overlap', 'top_n')
+    duplicate_jaccard = get_config_value('Overlap', 'duplicate_jaccard', type='float')
+    subset_containment = get_config_value('Overlap', 'subset_containment', type='float')
+    source_ids = [source_id for source_id, _ in sources]
+    names = np.array([name for _, name in sources], dtype=object)
+
+    with span('overlap.matrices'):
+        A, E, track_ids, artists = incidence_matrices(source_ids, memberships, edges)
+        B = A @ E
+        B.data[:] = 1
+
+    with span('overlap.pairs'):
+        sizes, shared, jaccard, containment = _pairwise(A)
+        artist_sizes, _, artist_jaccard, _ = _pairwise(B)
+        i, j = np.nonzero(np.triu(shared, 1))
+        order = np.lexsort((-shared[i, j], -jaccard[i, j]))
+        i, j = i[order], j[order]
+        pair_jaccard, pair_containment = jaccard[i, j], containment[i, j]
+
+    def pair(a, b):
+        small, large = (a, b) if sizes[a] <= sizes[b] else (b, a)
+        return {
+            'a': names[a], 'b': names[b], 'shared': int(shared[a, b]),
+            'jaccard': round(float(jaccard[a, b]), 4), 'containment': round(float(containment[a, b]), 4),
+            'artist_jaccard': round(float(artist_jaccard[a, b]), 4),
+            'smaller': names[small], 'larger': names[large],
+        }
+
+    with span('overlap.spread'):
+        track_spread = np.asarray(A.sum(axis=0)).ravel()
+        artist_spread = np.asarray(B.sum(axis=0)).ravel()
+        artist_tracks = np.asarray(E.sum(axis=0)).ravel()
+        exclusive = A @ (track_spread == 1).astype(np.int32)
+        track_names = tracks.set_index('track_id')['name'].reindex(track_ids).to_numpy(dtype=object)
+        by_track = A.tocsc()
+
+        closest = np.where(np.eye(len(sources), dtype=bool), -1.0, jaccard).argmax(axis=1) if len(sources) > 1 else np.zeros(len(sources), dtype=int)
+        top_tracks = [t for t in np.argsort(-track_spread, kind='stable')[:top_n] if track_spread[t] > 1]
+        top_artists = [a for a in np.argsort(-artist_spread, kind='stable')[:top_n] if artist_spread[a] > 1]
+
+    duplicates = pair_jaccard >= duplicate_jaccard
+    subsets = ~duplicates & (pair_containment >= subset_containment)
+    return {
+        'summary': {
+            'sources': len(sources), 'memberships': int(A.nnz), 'unique_tracks': len(track_ids),
+            'shared_tracks': int((track_spread > 1).sum()), 'unique_artists': len(artists),
+            'overlapping_pairs': len(i),
+        },
+        'sources': [{
+            'source_id': source_ids[s], 'name': names[s], 'tracks': int(sizes[s]), 'artists': int(artist_sizes[s]),
+            'exclusive_tracks': int(exclusive[s]),
+            'closest': names[closest[s]] if len(sources) > 1 and shared[s, closest[s]] else None,
+            'closest_jaccard': round(float(jaccard[s, closest[s]]), 4) if len(sources) > 1 else 0.0,
+        } for s in range(len(sources))],
+        'pairs': [pair(a, b) for a, b in zip(i[:top_n], j[:top_n])],
+        'duplicates': [pair(a, b) for a, b in zip(i[duplicates], j[duplicates])],
+        'subsets': [pair(a, b) for a, b in zip(i[subsets], j[subsets])],
+        'top_tracks': [{
+            'spotify_id': track_ids[t], 'name': track_names[t], 'sources': int(track_spread[t]),
+            'source_names': names[by_track.indices[by_track.indptr[t]:by_track.indptr[t + 1]]].tolist(),
+        } for t in top_tracks],
+        'top_artists': [{
+            'artist': artists['name'].iat[a], 'sources': int(artist_spread[a]), 'tracks': int(artist_tracks[a]),
+        } for a in top_artists],
+    }
@@ -0,0 +1,69 @@
+import json
+import math
+from functools import partial
+from .database import put_result_set
+from .metrics import span
+
+# Hasil analisis disimpan per bagian di tabel result_rows (satu baris JSON ringkas per item)
+# alih-alih satu dokumen besar di status tugas: status hanya membawa ringkasan kecil dan
+# jumlah item per bagian, sedangkan daftar panjang diambil per halaman lewat
+# /results/<task_id>/<bagian> (cursor = posisi item terakhir, filter ?q=).
+
+TRACK_FIELDS = ('name', 'artists', 'album', 'spotify_id', 'external_url')
+
+def _value(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+def _pick(fields, record):
+    return {field: _value(record.get(field)) for field in fields}
+
+def _genre(item):
+    genre, count = item
+    return {'genre': genre, 'count': count}
+
+def _group(records):
+    return {'size': len(records), 'tracks': [_pick(TRACK_FIELDS + ('cleaned_name',), record) for record in records]}
+
+# Bagian per jenis hasil dan cara mengubah tiap item menjadi baris ringkas; kunci hasil lain
+# (stats, profile, summary) menjadi ringkasan di status tugas.
+SECTIONS = {
+    'analysis': {
+        'genres': _genre,
+        'duplicates': partial(_pick, TRACK_FIELDS),
+        'versions': partial(_pick, TRACK_FIELDS + ('added_at',)),
+        'groups': _group,
+    },
+    'overlap': {
+        'duplicates': dict,
+        'subsets': dict,
+        'pairs': dict,
+        'top_artists': dict,
+        'top_tracks': dict,
+        'sources': dict,
+    },
+}
+
+def _search_text(value):
+    # Semua teks di dalam item (termasuk daftar bertingkat) untuk filter ?q=.
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return []
+    return [text for item in value for text in _search_text(item)]
+
+def store_result(result_id, result_type, data):
+    # Simpan bagian-bagian hasil dan kembalikan isi kecil untuk field result tugas.
+    sections = SECTIONS[result_type]
+    with span('results.store'):
+        rows = {}
+        for section, compact in sections.items():
+            items = [compact(item) for item in data.get(section) or []]
+            rows[section] = [(' '.join(_search_text(item)).lower(), json.dumps(item)) for item in items]
+        put_result_set(result_id, result_type, rows)
+    return {
+        'type': result_type, 'result_id': result_id,
+        'summary': {key: value for key, value in data.items() if key not in sections},
+        'sections': {section: len(items) for section, items in rows.items()},
+    }
@@ -0,0 +1,211 @@
+import numpy as np
+import scipy.sparse as sp
+from collections import defaultdict
+from fuzzywuzzy import fuzz
+
+# Kandidat pasangan judul mirip tanpa membandingkan semua n*(n-1)/2 pasangan.
+#
+# 'blocking' (default) memberi pasangan yang sama persis dengan loop lama. token_set_ratio
+# adalah maksimum tiga rasio; untuk masing-masing ada sumber kandidat yang terjamin:
+#   - ratio(irisan, judul): inverted index atas token hasil clean_title dengan prefix
+#     filtering. Rasio >= threshold mensyaratkan token bersama menutupi minimal t/(2-t)
+#     karakter judul, sehingga irisan pasti mengenai prefix (token paling langka).
+#   - ratio(judul1, judul2): rasio <= 2 * irisan histogram karakter / (panjang1 + panjang2),
+#     dan irisan histogram semua pasangan dihitung sebagai perkalian matriks indikator
+#     "karakter c muncul >= k kali" per blok (BLAS), jadi tidak ada pasangan yang terlewat.
+# 'exhaustive' membandingkan semua pasangan, dipakai untuk verifikasi.
+
+# Jumlah sel maksimum satu blok perkalian matriks karakter (float32), membatasi memori.
+CHAR_BLOCK_CELLS = 1 << 24
+
+def _weight(token):
+    return len(token) + 1
+
+def _min_shared_fraction(threshold):
+    # fuzz membulatkan skor, jadi batas bawah rasio sebenarnya adalah (t - 0.5) / 100
+    t = max(0.0, min(1.0, (threshold - 0.5) / 100.0))
+    return t / (2 - t)
+
+def _prefix_tokens(tokens, doc_freq, alpha):
+    ordered = sorted(tokens, key=lambda tok: (doc_freq[tok], tok))
+    budget = (1 - alpha) * sum(_weight(tok) for tok in ordered)
+    prefix, covered = [], 0
+    for tok in ordered:
+        prefix.append(tok)
+        covered += _weight(tok)
+        if covered > budget:
+            break
+    return prefix
+
+def _encode(i, j, n):
+    lo, hi = np.minimum(i, j), np.maximum(i, j)
+    keep = lo != hi
+    return lo[keep].astype(np.int64) * n + hi[keep]
+
+def _token_candidates(token_sets, threshold):
+    n = len(token_sets)
+    alpha = _min_shared_fraction(threshold)
+
+    postings = defaultdict(list)
+    for idx, tokens in enumerate(token_sets):
+        for tok in tokens:
+            postings[tok].append(idx)
+    doc_freq = {tok: len(ids) for tok, ids in postings.items()}
+
+    codes = []
+    for idx, tokens in enumerate(token_sets):
+        if not tokens:
+            continue
+        probe = [postings[tok] for tok in _prefix_tokens(tokens, doc_freq, alpha)]
+        others = np.fromiter((o for ids in probe for o in ids), dtype=np.int64)
+        codes.append(_encode(np.full(len(others), idx, dtype=np.int64), others, n))
+    return codes
+
+def _char_occurrences(token_sets):
+    # Baris per judul (token unik terurut, dipisah spasi: string yang dibandingkan
+    # token_set_ratio), kolom per (karakter, kemunculan ke-k). Perkalian dua baris =
+    # jumlah min(histogram karakter) kedua judul.
+    joined = [' '.join(sorted(tokens)) for tokens in token_sets]
+    columns, rows, cols = {}, [], []
+    for idx, text in enumerate(joined):
+        seen = defaultdict(int)
+        for ch in text:
+            seen[ch] += 1
+            rows.append(idx)
+            cols.append(columns.setdefault((ch, seen[ch]), len(columns)))
+    matrix = np.zeros((len(joined), max(1, len(columns))), dtype=np.float32)
+    matrix[rows, cols] = 1
+    return matrix, np.fromiter((len(j) for j in joined), dtype=np.float32, count=len(joined))
+
+def _char_candidates(token_sets, threshold):
+    # Semua pasangan dengan 2 * irisan karakter >= t * (panjang1 + panjang2). Judul diurutkan
+    # menurut panjang sehingga tiap blok cukup dibandingkan dengan judul yang panjangnya
+    # masih mungkin (<= panjang / alpha) dan hanya segitiga atas yang dihitung.
+    n = len(token_sets)
+    t = max(0.0, min(1.0, (threshold - 0.5) / 100.0))
+    alpha = max(t / (2 - t), 1e-6)
+    matrix, lengths = _char_occurrences(token_sets)
+    order = np.argsort(lengths, kind='stable')
+    matrix, lengths = matrix[order], lengths[order]
+    block = max(1, CHAR_BLOCK_CELLS // n)
+    codes = []
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        if not lengths[stop - 1]:
+            continue
+        end = np.searchsorted(lengths, lengths[stop - 1] / alpha + 1e-3, side='right')
+        slack = matrix[start:stop] @ matrix[start:end].T
+        slack *= 2
+        slack -= t * lengths[start:stop, None]
+        slack -= t * lengths[None, start:end]
+        rows, cols = np.nonzero(slack >= -1e-3)
+        keep = (cols > rows) & (lengths[start + rows] > 0)
+        codes.append(_encode(order[start + rows[keep]], order[start + cols[keep]], n))
+    return codes
+
+def _bound_filter(token_sets, left, right, threshold, chunk_size=50000):
+    # Batas atas ketiga rasio token_set_ratio per pasangan, sebelum fuzz dipanggil:
+    #   - ratio(irisan, judul) = 2*|irisan|/(|irisan| + |judul|), karena irisan adalah awalan
+    #     judul gabungan; panjangnya dari bobot token (panjang + 1 spasi).
+    #   - ratio(judul1, judul2) <= 2*irisan histogram karakter/(panjang1 + panjang2), karena
+    #     LCS tidak melebihi irisan histogram.
+    # clean_title hanya menghasilkan ASCII, jadi histogram byte = histogram karakter.
+    vocab, indices, indptr = {}, [], [0]
+    for tokens in token_sets:
+        indices.extend(vocab.setdefault(tok, len(vocab)) for tok in tokens)
+        indptr.append(len(indices))
+    membership = sp.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(len(token_sets), max(1, len(vocab))))
+    weights = np.zeros(membership.shape[1], dtype=np.float32)
+    weights[:len(vocab)] = [len(tok) + 1 for tok in vocab]
+    lengths = membership @ weights - 1
+    joined = [' '.join(sorted(tokens)).encode('ascii') for tokens in token_sets]
+    hist = np.stack([np.bincount(np.frombuffer(j, dtype=np.uint8), minlength=256) for j in joined]).astype(np.uint16)
+    hist = hist[:, hist.any(axis=0)]
+    bound = (threshold - 0.5) / 100.0 - 1e-9
+    keep = np.zeros(len(left), dtype=bool)
+    for start in range(0, len(left), chunk_size):
+        l, r = left[start:start + chunk_size], right[start:start + chunk_size]
+        sect = np.asarray(membership[l].multiply(membership[r]) @ weights).ravel() - 1
+        shortest = np.minimum(lengths[l], lengths[r])
+        sect_ratio = np.divide(2 * sect, sect + shortest, out=np.zeros_like(sect), where=sect > 0)
+        chars = np.minimum(hist[l], hist[r]).sum(axis=1)
+        full_ratio = 2 * chars / np.maximum(lengths[l] + lengths[r], 1)
+        keep[start:start + chunk_size] = np.maximum(sect_ratio, full_ratio) >= bound
+    return left[keep], right[keep]
+
+def _token_set_ratio(tokens1, tokens2):
+    # Sama dengan fuzz.token_set_ratio untuk keluaran clean_title, tanpa full_process ulang.
+    if not tokens1 or not tokens2:
+        return 0
+    sect = ' '.join(sorted(tokens1 & tokens2))
+    diff1 = ' '.join(sorted(tokens1 - tokens2))
+    diff2 = ' '.join(sorted(tokens2 - tokens1))
+    combined1 = (sect + ' ' + diff1).strip()
+    combined2 = (sect + ' ' + diff2).strip()
+    return max(fuzz.ratio(sect, combined1), fuzz.ratio(sect, combined2), fuzz.ratio(combined1, combined2))
+
+def _candidates(titles, token_sets, threshold, method):
+    n = len(titles)
+    empty = np.empty(0, dtype=np.int64)
+    if n < 2:
+        return empty, empty
+    if method == 'exhaustive':
+        left, right = np.triu_indices(n, k=1)
+        return left.astype(np.int64), right.astype(np.int64)
+    if method == 'blocking':
+        codes = _token_candidates(token_sets, threshold) + _char_candidates(token_sets, threshold)
+    else:
+        raise ValueError(f"Metode similarity tidak dikenal: {method}")
+    codes = np.concatenate(codes) if codes else empty
+    if not len(codes):
+        return empty, empty
+    # Deduplikasi lewat sort: np.unique (jalur hash di numpy 2) jauh lebih lambat di sini.
+    codes = np.sort(codes)
+    codes = codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+    return codes // n, codes % n
+
+def candidate_pairs(cleaned_titles, threshold, method='blocking', token_sets=None):
+    titles = list(cleaned_titles)
+    token_sets = token_sets if token_sets is not None else [frozenset(t.split()) for t in titles]
+    left, right = _candidates(titles, token_sets, threshold, method)
+    if len(left):
+        left, right = _bound_filter(token_sets, left, right, threshold)
+    return left, right
+
+def similar_title_pairs(cleaned_titles, threshold, method='blocking', token_sets=None):
+    # token_sets: himpunan token per judul yang sudah dihitung (mis. dari title_cache).
+    titles = list(cleaned_titles)
+    token_sets = token_sets if token_sets is not None else [frozenset(t.split()) for t in titles]
+    left, right = candidate_pairs(titles, threshold, method, token_sets=token_sets)
+    scores = np.fromiter(
+        (_token_set_ratio(token_sets[i], token_sets[j]) for i, j in zip(left.tolist(), right.tolist())),
+        dtype=np.int64, count=len(left)
+    )
+    keep = scores >= threshold
+    return left[keep], right[keep], scores[keep]
+
+def similarity_graph(matrix, min_similarity, n_neighbors=50, chunk_size=1000):
+    # Graf k-tetangga terdekat dari vektor sparse yang sudah ternormalisasi L2
+    # (misalnya TF-IDF), dibangun per potongan baris agar memori tetap linear.
+    n = matrix.shape[0]
+    matrix = sp.csr_matrix(matrix)
+    rows, cols, values = [], [], []
+    for start in range(0, n, chunk_size):
+        block = (matrix[start:start + chunk_size] @ matrix.T).tocsr()
+        block.data[block.data < min_similarity - 1e-9] = 0
+        block.eliminate_zeros()
+        for offset in range(block.shape[0]):
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            idx, sim = block.indices[lo:hi], block.data[lo:hi]
+            if n_neighbors and len(sim) > n_neighbors:
+                top = np.argpartition(-sim, n_neighbors - 1)[:n_neighbors]
+                idx, sim = idx[top], sim[top]
+            rows.append(np.full(len(idx), start + offset, dtype=np.int64))
+            cols.append(idx)
+            values.append(sim)
+    if not rows:
+        return sp.csr_matrix((n, n))
+    graph = sp.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n))
+    graph.setdiag(0)
+    graph.eliminate_zeros()
+    return graph.maximum(graph.T)
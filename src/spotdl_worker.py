@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Proses spotdl berumur panjang: membaca job JSON per baris dari stdin dan
+# menulis hasil JSON per baris ke stdout, sehingga interpreter dan klien spotdl
+# hanya di-start sekali. Keluaran lain dari spotdl dialihkan ke stderr.
+# spotdl menulis ke folder privat proses ini lalu file dipindah ke folder job, sehingga
+# satu Downloader per (format, bitrate) bisa dipakai untuk folder tujuan apa pun.
+
+def _emit(out, payload):
+    out.write(json.dumps(payload) + '\n')
+    out.flush()
+
+def main():
+    out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+    try:
+        from spotdl.download.downloader import Downloader
+        from spotdl.types.song import Song
+        from spotdl.utils.config import DEFAULT_CONFIG
+        from spotdl.utils.spotify import SpotifyClient
+        SpotifyClient.init(
+            client_id=os.getenv("SPOTIPY_CLIENT_ID") or DEFAULT_CONFIG['client_id'],
+            client_secret=os.getenv("SPOTIPY_CLIENT_SECRET") or DEFAULT_CONFIG['client_secret'],
+        )
+    except Exception as e:
+        fatal = f"{type(e).__name__}: {e}"
+        for line in sys.stdin:
+            _emit(out, {'id': json.loads(line).get('id'), 'ok': False, 'fatal': fatal, 'error': fatal})
+        return
+
+    downloaders = {}
+    private_dir = tempfile.mkdtemp(prefix='spotdl-worker-')
+    for line in sys.stdin:
+        job = json.loads(line)
+        key = (job['format'], job.get('bitrate'))
+        try:
+            if key not in downloaders:
+                downloaders[key] = Downloader({
+                    'output': os.path.join(private_dir, '{artists} - {title}.{output-ext}'),
+                    'format': job['format'], 'bitrate': job.get('bitrate'),
+                    'simple_tui': True, 'log_level': 'ERROR',
+                })
+            _, path = downloaders[key].download_song(Song.from_url(job['url']))
+            if path:
+                os.makedirs(job['output'], exist_ok=True)
+                target = os.path.join(job['output'], os.path.basename(str(path)))
+                shutil.move(str(path), target)
+                _emit(out, {'id': job['id'], 'ok': True, 'path': target, 'error': None})
+            else:
+                _emit(out, {'id': job['id'], 'ok': False, 'error': 'spotdl tidak menghasilkan file.'})
+        except Exception as e:
+            _emit(out, {'id': job['id'], 'ok': False, 'error': f"{type(e).__name__}: {e}"})
+
+if __name__ == '__main__':
+    main()
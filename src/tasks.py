@@ -0,0 +1,211 @@
+import json
+import math
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from .config import get_config_value
+from .database import get_db_connection, prune_result_sets
+
+# Penyimpanan status tugas di SQLite agar bisa dipakai bersama beberapa worker
+# proses, dengan TTL dan batas jumlah tugas. Setiap perubahan juga dicatat
+# sebagai event berurutan (seq) sehingga klien cukup menerima selisihnya.
+
+COLUMNS = ('status', 'progress', 'message', 'result')
+RESULT_GRACE_SECONDS = 3600
+
+def _plain(value):
+    # Hasil analisis berisi tipe numpy dan NaN dari pandas; ubah ke JSON standar
+    # agar bisa disimpan dan di-parse oleh browser.
+    if isinstance(value, dict):
+        return {str(_plain(k)): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Selain tipe bawaan hanya tipe numpy yang mungkin muncul. numpy diimpor di sini, bukan
+    # diambil dari sys.modules: impor yang sedang berjalan di thread prewarm ditunggu sampai
+    # selesai, bukan dipakai setengah jadi.
+    import numpy as np
+    if isinstance(value, np.ndarray):
+        return [_plain(v) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        return _plain(value.item())
+    return value
+
+class TaskStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = get_db_connection()
+        if not self._initialized:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY, status TEXT, progress INTEGER, message TEXT, result TEXT,
+                extra TEXT, seq INTEGER DEFAULT 0, created_at REAL, updated_at REAL
+            )""")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_events (
+                task_id TEXT, seq INTEGER, payload TEXT, PRIMARY KEY (task_id, seq)
+            )""")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _row_to_task(row):
+        task = json.loads(row[5] or '{}')
+        task.update({'status': row[1], 'progress': row[2], 'message': row[3], 'result': json.loads(row[4]) if row[4] else None, 'seq': row[6]})
+        return {k: v for k, v in task.items() if v is not None}
+
+    def _read(self, conn, task_id):
+        row = conn.execute("SELECT id, status, progress, message, result, extra, seq FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def _write(self, conn, task_id, task, payload):
+        extra = {k: v for k, v in task.items() if k not in COLUMNS and k != 'seq'}
+        seq = task.get('seq', 0) + 1
+        conn.execute(
+            "UPDATE tasks SET status = ?, progress = ?, message = ?, result = ?, extra = ?, seq = ?, updated_at = ? WHERE id = ?",
+            (task.get('status'), task.get('progress'), task.get('message'),
+             json.dumps(task['result']) if task.get('result') is not None else None,
+             json.dumps(extra), seq, time.time(), task_id)
+        )
+        conn.execute("INSERT INTO task_events (task_id, seq, payload) VALUES (?, ?, ?)", (task_id, seq, json.dumps(payload)))
+        return seq
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE: baca-lalu-tulis atomik juga terhadap worker proses lain.
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def _modify(self, task_id, change):
+        with self._transaction() as conn:
+            task = self._read(conn, task_id)
+            if task is None:
+                return None
+            payload = change(task)
+            task['seq'] = self._write(conn, task_id, task, payload)
+            return task
+
+    @staticmethod
+    def _count(conn, user_id, status, exclude=None):
+        return conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = ? AND json_extract(extra, '$.user_id') IS ? AND id IS NOT ?",
+            (status, user_id, exclude)
+        ).fetchone()[0]
+
+    def count_user_tasks(self, user_id, status, exclude=None):
+        conn = self._connect()
+        try:
+            return self._count(conn, user_id, status, exclude)
+        finally:
+            conn.close()
+
+    def claim(self, task_id, user_id, max_running):
+        # Dipanggil penjadwal sebelum menjalankan tugas: 'cancelled' bila tugas dibatalkan
+        # (atau sudah tidak menunggu), 'busy' bila user sudah punya max_running tugas berjalan
+        # di worker proses mana pun, selain itu tugas ditandai running dan 'claimed'.
+        with self._transaction() as conn:
+            task = self._read(conn, task_id)
+            if task is None or task.get('cancel_requested') or task.get('status') != 'pending':
+                return 'cancelled'
+            if self._count(conn, user_id, 'running') >= max_running:
+                return 'busy'
+            task['status'] = 'running'
+            task['seq'] = self._write(conn, task_id, task, {'status': 'running'})
+            return 'claimed'
+
+    def request_cancel(self, task_id):
+        # Tandai pembatalan agar terlihat oleh worker proses yang memegang tugas. Mengembalikan
+        # 'queued' / 'running' menurut status saat itu, None bila sudah selesai atau sudah dibatalkan.
+        with self._transaction() as conn:
+            task = self._read(conn, task_id)
+            if task is None or task.get('cancel_requested') or task.get('status') not in ('pending', 'running'):
+                return None
+            state = 'queued' if task['status'] == 'pending' else 'running'
+            task['cancel_requested'] = True
+            task['seq'] = self._write(conn, task_id, task, {'cancel_requested': True})
+            return state
+
+    def is_cancel_requested(self, task_id):
+        task = self.get(task_id)
+        return bool(task and task.get('cancel_requested'))
+
+    def create(self, **fields):
+        task_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("INSERT INTO tasks (id, status, progress, message, extra, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (task_id, fields.pop('status', 'pending'), fields.pop('progress', 0), fields.pop('message', None), json.dumps(fields), now, now))
+                conn.commit()
+            finally:
+                conn.close()
+        self.evict()
+        return task_id
+
+    def update(self, task_id, **fields):
+        fields = _plain(fields)
+        def change(task):
+            task.update(fields)
+            return fields
+        return self._modify(task_id, change)
+
+    def update_track(self, task_id, index, **fields):
+        # Perubahan satu baris antrean download, dikirim sebagai delta kecil.
+        fields = _plain(fields)
+        def change(task):
+            task['result']['tracks'][index].update(fields)
+            return {'track': dict(fields, index=index)}
+        return self._modify(task_id, change)
+
+    def get(self, task_id):
+        conn = self._connect()
+        try:
+            return self._read(conn, task_id)
+        finally:
+            conn.close()
+
+    def events_since(self, task_id, seq):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT seq, payload FROM task_events WHERE task_id = ? AND seq > ? ORDER BY seq", (task_id, seq)).fetchall()
+            return [(row[0], json.loads(row[1])) for row in rows]
+        finally:
+            conn.close()
+
+    def evict(self):
+        oldest = time.time() - get_config_value('Tasks', 'ttl_hours', type='float') * 3600
+        max_tasks = get_config_value('Tasks', 'max_tasks')
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("""
+                DELETE FROM tasks WHERE updated_at < ? OR id IN (
+                    SELECT id FROM tasks ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )""", (oldest, max_tasks))
+                conn.execute("DELETE FROM task_events WHERE task_id NOT IN (SELECT id FROM tasks)")
+                conn.commit()
+            finally:
+                conn.close()
+        # Hasil per bagian (results.store_result) ikut dibuang bila tidak dirujuk lagi; yang
+        # baru disimpan diberi jeda karena tugasnya mungkin belum sempat diperbarui.
+        prune_result_sets(time.time() - RESULT_GRACE_SECONDS)
+
+task_store = TaskStore()
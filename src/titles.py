@@ -0,0 +1,73 @@
+import re
+import threading
+from collections import OrderedDict
+from .config import get_config_value
+
+# Normalisasi judul untuk pencarian judul mirip. Ke-33 str.replace versi lama
+# digabung menjadi satu regex; hasilnya identik dengan pengulangan lama.
+
+COMMON_WORDS = ('feat', 'ft', 'remix', 'remastered', 'live', 'acoustic', 'version', 'edit', 'original', 'radio', 'mix')
+
+_WORDS = '|'.join(COMMON_WORDS)
+_STOP_WORDS = re.compile(rf' (?:{_WORDS}) |\((?:{_WORDS})\)|\[(?:{_WORDS})\]')
+# Kata umum yang berdempetan/bertumpuk ("feat ft", "(feat)ft") bisa saling memicu pada
+# replace berurutan versi lama; judul seperti itu (jarang) memakai jalur lama.
+_CHAINED = re.compile(rf'(?=[ ()\[\]](?:{_WORDS})[ ()\[\]])')
+_NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+
+def _clean_sequential(title_lower):
+    for word in COMMON_WORDS:
+        title_lower = title_lower.replace(f' {word} ', ' ').replace(f'({word})', ' ').replace(f'[{word}]', ' ')
+    return ' '.join(_NON_ALNUM.sub(' ', title_lower).split())
+
+def clean_title(title):
+    title_lower = title.lower()
+    if len(_CHAINED.findall(title_lower)) > 1:
+        return _clean_sequential(title_lower)
+    return ' '.join(_NON_ALNUM.sub(' ', _STOP_WORDS.sub(' ', title_lower)).split())
+
+def clean_titles(titles):
+    # Satu kolom judul sekaligus. Judul yang berulang (versi/duplikat) cukup dihitung sekali;
+    # ini lebih cepat daripada operasi .str pandas yang tetap memanggil regex per elemen.
+    cleaned = {}
+    return [cleaned[t] if t in cleaned else cleaned.setdefault(t, clean_title(t)) for t in titles]
+
+class TitleCache:
+    # Judul bersih dan himpunan tokennya per ID lagu, dihitung sekali per proses.
+    # Nilai dari kolom tracks.clean_name (bila ada) dipakai sebelum menghitung ulang.
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, track_ids, names, stored=None):
+        entries = [None] * len(track_ids)
+        missing = []
+        with self._lock:
+            for i, track_id in enumerate(track_ids):
+                entry = self._entries.get(track_id)
+                if entry is not None:
+                    entries[i] = entry
+                    self._entries.move_to_end(track_id)
+                elif stored is not None and isinstance(stored[i], str):
+                    entries[i] = (stored[i], frozenset(stored[i].split()))
+                else:
+                    missing.append(i)
+        if missing:
+            for i, cleaned in zip(missing, clean_titles([names[i] for i in missing])):
+                entries[i] = (cleaned, frozenset(cleaned.split()))
+        self._remember(track_ids, entries)
+        return [e[0] for e in entries], [e[1] for e in entries]
+
+    def _remember(self, track_ids, entries):
+        max_size = get_config_value('Cache', 'lru_size')
+        with self._lock:
+            for track_id, entry in zip(track_ids, entries):
+                self._entries[track_id] = entry
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+title_cache = TitleCache()
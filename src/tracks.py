@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from .database import AUDIO_FEATURES
+
+# Representasi kolumnar koleksi lagu. Satu baris per lagu di `tracks` (string yang
+# berulang disimpan sebagai category), relasi lagu–artis di `edges` (dua kolom int32:
+# posisi baris lagu dan kode artis), dan daftar artis unik di `artists` (id, name).
+# Tidak ada list Python di dalam sel DataFrame.
+
+CATEGORY_COLUMNS = ('name', 'album', 'release_date', 'artists')
+
+def _per_track(track_pos, values, n):
+    # Kelompokkan nilai edge per baris lagu (urutan edge dipertahankan).
+    buckets = [[] for _ in range(n)]
+    for pos, value in zip(track_pos, values):
+        buckets[pos].append(value)
+    return buckets
+
+def _edges(track_pos, artist_ids, artist_names):
+    codes, unique_ids = pd.factorize(pd.Series(artist_ids, dtype=object))
+    names = pd.Series(artist_names, dtype=object).groupby(codes).first()
+    artists = pd.DataFrame({'id': unique_ids.astype(object), 'name': names.to_numpy(dtype=object)})
+    edges = pd.DataFrame({'track': np.asarray(track_pos, dtype=np.int32), 'artist': codes.astype(np.int32)})
+    return edges, artists
+
+class TrackTable:
+    def __init__(self, tracks, edges, artists):
+        self.tracks = tracks
+        self.edges = edges
+        self.artists = artists
+
+    @classmethod
+    def build(cls, tracks, track_pos, artist_ids, artist_names):
+        # tracks: DataFrame satu baris per lagu; tiga list berikutnya adalah edge lagu–artis
+        # berurutan (posisi baris lagu, ID artis, nama artis).
+        tracks = tracks.reset_index(drop=True)
+        edges, artists = _edges(track_pos, artist_ids, artist_names)
+        if 'artists' not in tracks.columns:
+            names = artists['name'].to_numpy()[edges['artist'].to_numpy()]
+            tracks['artists'] = [', '.join(group) for group in _per_track(edges['track'].tolist(), names.tolist(), len(tracks))]
+        for column in CATEGORY_COLUMNS:
+            if column in tracks.columns:
+                # Kategori dalam urutan kemunculan (tanpa sort) lebih murah dari astype('category').
+                codes, uniques = pd.factorize(tracks[column])
+                tracks[column] = pd.Categorical.from_codes(codes, uniques)
+        return cls(tracks, edges, artists)
+
+    @classmethod
+    def empty_table(cls):
+        return cls.build(pd.DataFrame(columns=['spotify_id']), [], [], [])
+
+    def __len__(self):
+        return len(self.tracks)
+
+    @property
+    def empty(self):
+        return self.tracks.empty
+
+    def artist_ids(self):
+        return self.artists['id'].tolist()
+
+    def artist_counts(self):
+        # Jumlah lagu per artis (urutan sama dengan self.artists).
+        return np.bincount(self.edges['artist'].to_numpy(), minlength=len(self.artists))
+
+    def track_artists(self):
+        # (ID lagu, ID artis, nama artis) per edge, untuk ditulis ke database.
+        track_ids = self.tracks['spotify_id'].to_numpy(dtype=object)[self.edges['track'].to_numpy()]
+        codes = self.edges['artist'].to_numpy()
+        return track_ids, self.artists['id'].to_numpy()[codes], self.artists['name'].to_numpy()[codes]
+
+    def select(self, mask):
+        # Subset lagu (boolean mask sepanjang tracks); edge dipetakan ke posisi baris baru.
+        mask = np.asarray(mask, dtype=bool)
+        new_pos = np.cumsum(mask) - 1
+        keep = mask[self.edges['track'].to_numpy()]
+        edges = self.edges[keep]
+        used, codes = np.unique(edges['artist'].to_numpy(), return_inverse=True)
+        return TrackTable(
+            self.tracks[mask].reset_index(drop=True),
+            pd.DataFrame({'track': new_pos[edges['track'].to_numpy()].astype(np.int32), 'artist': codes.astype(np.int32)}),
+            self.artists.iloc[used].reset_index(drop=True),
+        )
+
+    def with_features(self, features_list):
+        # Hanya kolom audio feature yang digabung: respons API juga membawa duration_ms, uri,
+        # dll. yang akan bertabrakan dengan kolom lagu (duration_ms_x/_y).
+        features = pd.DataFrame(features_list).rename(columns={'id': 'spotify_id'})
+        columns = [column for column in AUDIO_FEATURES if column in features.columns]
+        features = features[['spotify_id', *columns]].drop_duplicates('spotify_id')
+        tracks = self.tracks.drop(columns=[column for column in columns if column in self.tracks.columns])
+        return TrackTable(tracks.merge(features, on='spotify_id', how='left'), self.edges, self.artists)
+
+    def to_frame(self):
+        # Bentuk lama (kolom artists_list / artist_ids berisi list) untuk kode yang masih membutuhkannya.
+        df = self.tracks.copy()
+        track_pos = self.edges['track'].tolist()
+        codes = self.edges['artist'].to_numpy()
+        for column, values in (('artists_list', self.artists['name'].to_numpy()), ('artist_ids', self.artists['id'].to_numpy())):
+            df[column] = _per_track(track_pos, values[codes].tolist(), len(df))
+        return df
@@ -0,0 +1,128 @@
+import struct
+import time
+
+# Penulis ZIP streaming tanpa kompresi (STORED) dengan dukungan ZIP64. Ukuran dan CRC32
+# setiap anggota sudah diketahui sebelum datanya dikirim (dari indeks download), sehingga
+# header lokal ditulis lengkap tanpa data descriptor. Akibatnya susunan byte arsip bisa
+# dihitung di muka: panjang total diketahui dan potongan (HTTP Range) bisa dilayani
+# dengan melompat langsung ke file yang bersangkutan.
+
+ZIP64_LIMIT = 0xFFFFFFFF
+UTF8_FLAG = 0x0800
+
+def _dos_time(timestamp):
+    t = time.localtime(max(timestamp, 315532800))
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+class Member:
+    def __init__(self, name, path, size, crc32, mtime):
+        self.name = name.encode('utf-8')
+        self.path = path
+        self.size = size
+        self.crc32 = crc32
+        self.mtime = mtime
+        self.offset = None
+
+    @property
+    def zip64(self):
+        return self.size >= ZIP64_LIMIT or self.offset >= ZIP64_LIMIT
+
+    def local_header(self):
+        dos_time, dos_date = _dos_time(self.mtime)
+        size = ZIP64_LIMIT if self.zip64 else self.size
+        extra = struct.pack('<HHQQ', 0x0001, 16, self.size, self.size) if self.zip64 else b''
+        return struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if self.zip64 else 20, UTF8_FLAG, 0, dos_time, dos_date,
+            self.crc32, size, size, len(self.name), len(extra)
+        ) + self.name + extra
+
+    def central_header(self):
+        dos_time, dos_date = _dos_time(self.mtime)
+        fields = []
+        size = self.size
+        if self.size >= ZIP64_LIMIT:
+            fields += [self.size, self.size]
+            size = ZIP64_LIMIT
+        offset = self.offset
+        if self.offset >= ZIP64_LIMIT:
+            fields.append(self.offset)
+            offset = ZIP64_LIMIT
+        extra = struct.pack('<HH', 0x0001, 8 * len(fields)) + struct.pack(f'<{len(fields)}Q', *fields) if fields else b''
+        version = 45 if self.zip64 else 20
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, version, version, UTF8_FLAG, 0, dos_time, dos_date,
+            self.crc32, size, size, len(self.name), len(extra), 0, 0, 0, 0o100644 << 16, offset
+        ) + self.name + extra
+
+def _end_records(count, cd_offset, cd_size):
+    records = b''
+    if count >= 0xFFFF or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+        zip64_offset = cd_offset + cd_size
+        records += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+        records += struct.pack('<IIQI', 0x07064b50, 0, zip64_offset, 1)
+    return records + struct.pack(
+        '<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+        min(cd_size, ZIP64_LIMIT), min(cd_offset, ZIP64_LIMIT), 0
+    )
+
+def _read_file(path, start, length, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                raise IOError(f"File berubah saat dikirim: {path}")
+            length -= len(chunk)
+            yield chunk
+
+class ZipPlan:
+    # Susunan arsip untuk daftar anggota yang sudah pasti: segmen byte (header, direktori)
+    # dan segmen file, masing-masing dengan offset absolutnya.
+    def __init__(self, members):
+        self.members = members
+        self.segments = []
+        offset = 0
+        for member in members:
+            member.offset = offset
+            header = member.local_header()
+            self.segments.append((offset, header, None))
+            offset += len(header)
+            self.segments.append((offset, None, member))
+            offset += member.size
+        directory = b''.join(m.central_header() for m in members)
+        tail = directory + _end_records(len(members), offset, len(directory))
+        self.segments.append((offset, tail, None))
+        self.length = offset + len(tail)
+
+    def iter_range(self, start, stop, chunk_size):
+        # Byte [start, stop) dari arsip; file dibaca per potongan chunk_size.
+        for seg_start, data, member in self.segments:
+            seg_length = len(data) if data is not None else member.size
+            seg_stop = seg_start + seg_length
+            if seg_stop <= start or seg_start >= stop:
+                continue
+            lo, hi = max(start, seg_start) - seg_start, min(stop, seg_stop) - seg_start
+            if data is not None:
+                yield data[lo:hi]
+            else:
+                yield from _read_file(member.path, lo, hi - lo, chunk_size)
+
+class ZipStream:
+    # Arsip yang anggotanya baru diketahui sambil berjalan (antrean download masih jalan):
+    # add() mengembalikan byte anggota itu, finish() mengembalikan direktori pusat.
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.members = []
+        self.offset = 0
+
+    def add(self, member):
+        member.offset = self.offset
+        header = member.local_header()
+        self.members.append(member)
+        self.offset += len(header) + member.size
+        yield header
+        yield from _read_file(member.path, 0, member.size, self.chunk_size)
+
+    def finish(self):
+        directory = b''.join(m.central_header() for m in self.members)
+        return directory + _end_records(len(self.members), self.offset, len(directory))
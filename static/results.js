@@ -0,0 +1,89 @@
+// Bagian hasil analisis dimuat per halaman dari /results/<task_id>/<bagian> begitu terlihat
+// di layar. Kolom tabel diambil dari <th data-field="..." data-format="...">.
+(function () {
+    const FORMATS = {
+        fixed2: value => Number(value).toFixed(2),
+        percent: value => `${Math.round(value * 100)}%`,
+        capitalize: value => value ? value.charAt(0).toUpperCase() + value.slice(1) : '',
+        list: value => (value || []).join(', '),
+        tracks: value => (value || []).map(track => `${track.name} — ${track.artists}`).join('; '),
+        closest: (value, item) => value ? `${value} (${Number(item.closest_jaccard).toFixed(2)})` : '',
+    };
+
+    function initSection(section) {
+        const tbody = section.querySelector('tbody');
+        const more = section.querySelector('.load-more');
+        const filter = section.querySelector('.section-filter');
+        const columns = [...section.querySelectorAll('th')].map(th => ({
+            field: th.dataset.field, format: FORMATS[th.dataset.format], strong: th.hasAttribute('data-strong'),
+        }));
+        let cursor = null, query = '', generation = 0;
+
+        function render(item) {
+            const tr = document.createElement('tr');
+            columns.forEach(column => {
+                const td = document.createElement('td');
+                const value = item[column.field];
+                const text = column.format ? column.format(value, item) : (value ?? '');
+                const target = column.strong ? td.appendChild(document.createElement('strong')) : td;
+                target.textContent = text;
+                tr.appendChild(td);
+            });
+            return tr;
+        }
+
+        async function load(reset) {
+            // Permintaan yang sudah usang (filter berubah di tengah jalan) diabaikan.
+            const current = reset ? ++generation : generation;
+            const params = new URLSearchParams();
+            if (!reset && cursor !== null) params.set('cursor', cursor);
+            if (section.dataset.limit) params.set('limit', section.dataset.limit);
+            if (query) params.set('q', query);
+            more.disabled = true;
+            try {
+                const response = await fetch(`${section.dataset.sectionUrl}?${params}`);
+                const page = await response.json();
+                if (current !== generation) return;
+                if (!response.ok) throw new Error(page.error);
+                if (reset) tbody.replaceChildren();
+                page.items.forEach(item => tbody.appendChild(render(item)));
+                if (!tbody.children.length) {
+                    const td = tbody.insertRow().insertCell();
+                    td.colSpan = columns.length;
+                    td.textContent = query ? 'No matches.' : (section.dataset.empty || 'Nothing to show.');
+                }
+                cursor = page.next_cursor;
+            } catch (error) {
+                console.error('Gagal memuat bagian hasil:', error);
+            } finally {
+                if (current === generation) {
+                    more.style.display = cursor === null ? 'none' : '';
+                    more.disabled = false;
+                }
+            }
+        }
+
+        more.addEventListener('click', () => load(false));
+        if (filter) {
+            let timer;
+            filter.addEventListener('input', () => {
+                clearTimeout(timer);
+                timer = setTimeout(() => { query = filter.value.trim(); load(true); }, 250);
+            });
+        }
+        return () => load(true);
+    }
+
+    const sections = document.querySelectorAll('[data-section-url]');
+    const observer = 'IntersectionObserver' in window ? new IntersectionObserver(entries => {
+        entries.filter(entry => entry.isIntersecting).forEach(entry => {
+            observer.unobserve(entry.target);
+            entry.target.loadFirstPage();
+        });
+    }, { rootMargin: '200px' }) : null;
+    sections.forEach(section => {
+        section.loadFirstPage = initSection(section);
+        if (observer) observer.observe(section);
+        else section.loadFirstPage();
+    });
+})();
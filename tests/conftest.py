@@ -0,0 +1,44 @@
+import importlib
+import pytest
+from src import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Database SQLite sementara per test.
+    monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / 'test.db'))
+    database.init_db()
+    return database.DB_FILE
+
+
+def _track_item(track_id, name, artist, added_at=''):
+    return {
+        'added_at': added_at,
+        'track': {
+            'id': track_id, 'name': name, 'duration_ms': 200000,
+            'artists': [{'id': f'artist_{artist}', 'name': artist}],
+            'album': {'name': 'Album', 'release_date': '2020-01-01'},
+            'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'},
+        },
+    }
+
+
+@pytest.fixture
+def track_item():
+    # Pembuat item playlist dalam bentuk respons API Spotify.
+    return _track_item
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    for name, value in (('SPOTIPY_CLIENT_ID', 'id'), ('SPOTIPY_CLIENT_SECRET', 'secret'), ('SPOTIPY_REDIRECT_URI', 'http://localhost/callback')):
+        monkeypatch.setenv(name, value)
+    app = importlib.import_module('app')
+    # task_store global membuat tabelnya sekali per proses; database test selalu baru.
+    monkeypatch.setattr(app.task_store, '_initialized', False)
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 'user'
+    client.task_store = app.task_store
+    client.app_module = app
+    return client
@@ -0,0 +1,19 @@
+from src.analysis import analysis_cache_key
+from src.data import extract_track_info
+
+
+def key(track_item, *entries):
+    return analysis_cache_key(extract_track_info([track_item(t, f'Song {t}', 'A', added_at) for t, added_at in entries]))
+
+
+def test_cache_key_ignores_order_only(track_item):
+    base = key(track_item, ('t1', '1'), ('t2', '2'), ('t1', '3'))
+    assert key(track_item, ('t1', '3'), ('t1', '1'), ('t2', '2')) == base
+    # Salinan tambahan, salinan yang dibuang, dan added_at yang berubah semuanya mengubah kunci.
+    variants = [
+        key(track_item, ('t1', '1'), ('t2', '2'), ('t1', '3'), ('t1', '3')),
+        key(track_item, ('t1', '1'), ('t2', '2')),
+        key(track_item, ('t1', '1'), ('t2', '2'), ('t1', '4')),
+        key(track_item, ('t1', '1'), ('t2', '2'), ('t2', '3')),
+    ]
+    assert len({base, *variants}) == 5
@@ -0,0 +1,63 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from spotipy.exceptions import SpotifyException
+from src import auth
+
+
+@pytest.fixture
+def server():
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(int(self.path.strip('/')))
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}', hits
+    httpd.shutdown()
+
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_shared_session_leaves_status_retries_to_backoff(server, status):
+    # 429/5xx hanya diulang oleh call_with_backoff; transport tidak boleh mengulangnya juga.
+    url, hits = server
+    assert auth.shared_session().get(f'{url}/{status}').status_code == status
+    assert len(hits) == 1
+
+
+class FakeClient:
+    prefix = 'https://api.spotify.com/v1/'
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def current_user(self):
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else None
+        if status:
+            raise SpotifyException(status, -1, 'error', headers={'Retry-After': '0'})
+        return {'id': 'user', 'display_name': 'User'}
+
+
+@pytest.mark.parametrize('statuses, logged_in, calls', [
+    ((429, 503), True, 3),
+    ((429,) * 10, True, 6),
+    ((401,), False, 1),
+])
+def test_index_logs_out_only_on_auth_errors(client, monkeypatch, statuses, logged_in, calls):
+    sp = FakeClient(*statuses)
+    monkeypatch.setattr(client.app_module, 'get_spotify_client', lambda: sp)
+    assert client.get('/').status_code == 200
+    with client.session_transaction() as session:
+        assert ('user_id' in session) == logged_in
+    assert sp.calls == calls
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from src import database
+from src.analysis import find_different_versions, find_exact_duplicates
+from src.data import extract_track_info
+
+
+def sync(source_id, items):
+    table = extract_track_info(items)
+    ids = table.tracks['spotify_id']
+    new_tracks = table.select(~ids.isin(database.get_source_tracks(source_id)) & ~ids.duplicated())
+    database.apply_source_delta(source_id, new_tracks, [], members=table)
+
+
+def test_repeated_playlist_entries_are_kept(db, track_item):
+    item = track_item
+    sync('playlist_p', [
+        item('t1', 'Song', 'A', '2024-01-01T00:00:00Z'),
+        item('t2', 'Other', 'B', '2024-01-02T00:00:00Z'),
+        item('t1', 'Song', 'A', '2024-03-01T00:00:00Z'),
+    ])
+    table = database.get_tracks_from_db('playlist_p')
+    assert len(table) == 3
+    assert sorted(find_exact_duplicates(table)['spotify_id']) == ['t1', 't1']
+    versions = find_different_versions(table)
+    assert versions['added_at'].tolist() == ['2024-01-01T00:00:00Z', '2024-03-01T00:00:00Z']
+    track_ids, _, artist_names = table.track_artists()
+    assert sorted(zip(track_ids, artist_names)) == [('t1', 'A'), ('t1', 'A'), ('t2', 'B')]
+
+
+def test_full_sync_replaces_membership(db, track_item):
+    item = track_item
+    sync('playlist_p', [item('t1', 'Song', 'A', '1'), item('t1', 'Song', 'A', '2'), item('t2', 'Other', 'B', '3')])
+    sync('playlist_p', [item('t2', 'Other', 'B', '3')])
+    table = database.get_tracks_from_db('playlist_p')
+    assert table.tracks['spotify_id'].tolist() == ['t2']
+
+
+def test_old_source_tracks_schema_is_migrated(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE source_tracks (source_id TEXT, track_id TEXT, added_at TEXT, PRIMARY KEY (source_id, track_id))")
+        conn.execute("CREATE TABLE cache_log (source_id TEXT PRIMARY KEY, last_fetched TIMESTAMP)")
+        conn.execute("INSERT INTO source_tracks VALUES ('playlist_p', 't1', 'x')")
+        conn.execute("INSERT INTO cache_log VALUES ('playlist_p', '2024-01-01')")
+        conn.execute("INSERT INTO cache_log VALUES ('liked_u', '2024-01-01')")
+    monkeypatch.setattr(database, 'DB_FILE', path)
+    database.init_db()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT source_id, track_id, occurrence, added_at FROM source_tracks").fetchall() == [('playlist_p', 't1', 0, 'x')]
+        assert conn.execute("SELECT source_id FROM cache_log").fetchall() == [('liked_u',)]
+
+
+def test_db_file_does_not_depend_on_cwd(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = 'from src import database; print(database.DB_FILE)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=dict(os.environ, PYTHONPATH=root),
+                            capture_output=True, text=True, check=True).stdout.strip()
+    assert output == os.path.join(root, 'spotify_data.db')
+
+
+def test_resync_only_touches_changed_rows(db, track_item, monkeypatch):
+    item = track_item
+    sync('playlist_p', [item('t1', 'Song', 'A', '1'), item('t2', 'Other', 'B', '2'), item('t1', 'Song', 'A', '3'), item('t3', 'Third', 'C', '4')])
+    statements, connect = [], database.get_db_connection
+
+    def traced_connection():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(database, 'get_db_connection', traced_connection)
+    sync('playlist_p', [item('t1', 'Song', 'A', '1'), item('t2', 'Other', 'B', '2'), item('t1', 'Song', 'A', '3'), item('t4', 'New', 'D', '5')])
+    writes = [sql for sql in statements if 'source_tracks' in sql and not sql.lstrip().startswith('SELECT')]
+    assert len(writes) == 2
+    assert "DELETE FROM source_tracks WHERE source_id = 'playlist_p' AND track_id = 't3' AND occurrence = 0" in writes
+    assert any("'t4', 0, '5'" in sql for sql in writes)
+    table = database.get_tracks_from_db('playlist_p')
+    assert sorted(zip(table.tracks['spotify_id'], table.tracks['added_at'])) == [('t1', '1'), ('t1', '3'), ('t2', '2'), ('t4', '5')]
@@ -0,0 +1,56 @@
+import os
+import time
+import pytest
+from src import downloader
+from src.database import get_db_connection, get_download_entry, put_download_entry
+from src.downloader import DownloadStore
+from src.tasks import TaskStore
+
+
+@pytest.fixture
+def store_limit(db, monkeypatch):
+    limit = {'bytes': 15}
+    original = downloader.get_config_value
+    monkeypatch.setattr(downloader, 'get_config_value', lambda section, key, type='int': limit['bytes'] / 2**20 if key == 'store_max_mb' else original(section, key, type))
+    return limit
+
+
+def add_entry(root, spotify_id, used_at, size=10):
+    path = f'{spotify_id}.mp3'
+    (root / path).write_bytes(b'x' * size)
+    put_download_entry({'spotify_id': spotify_id, 'format': 'mp3', 'quality': 'auto', 'path': path, 'name': path,
+                        'size': size, 'checksum': spotify_id, 'crc32': 0, 'created_at': used_at, 'last_used_at': used_at})
+    return path
+
+
+def download_task(files, updated_at=None):
+    tasks = TaskStore()
+    task_id = tasks.create(user_id='u')
+    tasks.update(task_id, status='complete', result={'type': 'download_queue', 'tracks': [{'name': f, 'status': 'Selesai', 'file': f} for f in files]})
+    if updated_at is not None:
+        with get_db_connection() as conn:
+            conn.execute("UPDATE tasks SET updated_at = ? WHERE id = ?", (updated_at, task_id))
+            conn.commit()
+
+
+def test_evict_skips_files_of_live_tasks_and_kept_entry(tmp_path, store_limit):
+    paths = [add_entry(tmp_path, f't{i}', used_at=i) for i in range(1, 6)]
+    download_task([paths[0]])
+    download_task([paths[1]], updated_at=time.time() - 10 * 24 * 3600)
+    DownloadStore().evict(str(tmp_path), keep=paths[4])
+    assert [os.path.exists(tmp_path / p) for p in paths] == [True, False, False, False, True]
+    assert get_download_entry('t1', 'mp3', 'auto') is not None and get_download_entry('t2', 'mp3', 'auto') is None
+
+
+def test_new_download_is_not_evicted(tmp_path, store_limit, monkeypatch):
+    def download_one(url, output_dir, format, quality):
+        with open(os.path.join(output_dir, 'Song.mp3'), 'wb') as f:
+            f.write(b'y' * 20)
+        return {'ok': True, 'error': None}
+
+    monkeypatch.setattr(downloader, 'download_one', download_one)
+    old = add_entry(tmp_path, 'old', used_at=1)
+    result = DownloadStore().fetch(str(tmp_path), 'https://open.spotify.com/track/abc123', 'mp3', None)
+    assert result['ok'] and not result['cached']
+    assert os.path.exists(tmp_path / result['file'])
+    assert not os.path.exists(tmp_path / old)
@@ -0,0 +1,136 @@
+import threading
+import time
+import pytest
+from src import jobs
+from src.jobs import JobScheduler, QuotaExceeded
+
+
+@pytest.fixture
+def jobs_config(monkeypatch):
+    original = jobs.get_config_value
+
+    def apply(**overrides):
+        def get_config_value(section, key, type='int'):
+            if section == 'Jobs' and key in overrides:
+                return overrides[key]
+            return original(section, key, type)
+        monkeypatch.setattr(jobs, 'get_config_value', get_config_value)
+    return apply
+
+
+def test_run_cpu_timeout_fails_and_replaces_pool(jobs_config):
+    jobs_config(cpu_executor='process', cpu_workers=1, cpu_timeout=1.0)
+    scheduler = JobScheduler(workers=1, per_user=1, max_queued_per_user=1)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        scheduler.run_cpu(time.sleep, 30)
+    assert time.monotonic() - started < 10
+    assert scheduler._cpu_pool is None
+    assert scheduler.run_cpu(max, 1, 2) == 2
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timeout'
+        time.sleep(0.01)
+
+
+def test_priority_order():
+    scheduler = JobScheduler(workers=1, per_user=1, max_queued_per_user=10)
+    release, order = threading.Event(), []
+    blocker = scheduler.submit('blocker', release.wait, user='x')
+    wait_for(lambda: blocker.state == 'running')
+    submitted = [scheduler.submit(name, order.append, name, user='y', priority=priority)
+                 for name, priority in (('analysis', jobs.PRIORITY_ANALYSIS), ('track', jobs.PRIORITY_TRACK), ('download', jobs.PRIORITY_DOWNLOAD), ('track2', jobs.PRIORITY_TRACK))]
+    assert scheduler.metrics()['queue_depth'] == 4
+    release.set()
+    wait_for(lambda: all(job.state == 'done' for job in submitted))
+    assert order == ['track', 'track2', 'download', 'analysis']
+
+
+def test_per_user_limits():
+    scheduler = JobScheduler(workers=3, per_user=1, max_queued_per_user=2)
+    release = threading.Event()
+    first = scheduler.submit('a1', release.wait, user='a')
+    second = scheduler.submit('a2', release.wait, user='a')
+    other = scheduler.submit('b1', release.wait, user='b')
+    wait_for(lambda: first.state == 'running' and other.state == 'running')
+    time.sleep(0.05)
+    assert second.state == 'queued'
+    scheduler.submit('a3', release.wait, user='a')
+    with pytest.raises(QuotaExceeded):
+        scheduler.submit('a4', release.wait, user='a')
+    release.set()
+    wait_for(lambda: second.state == 'done')
+    assert scheduler.metrics()['finished']['done'] >= 3
+
+
+def test_cancel_queued_and_running():
+    scheduler = JobScheduler(workers=1, per_user=1, max_queued_per_user=10)
+    started, ran = threading.Event(), []
+
+    def cancellable():
+        started.set()
+        while True:
+            scheduler.raise_if_cancelled('running')
+            time.sleep(0.01)
+
+    running = scheduler.submit('running', cancellable, user='a')
+    queued = scheduler.submit('queued', ran.append, 'queued', user='b')
+    assert started.wait(5)
+    assert scheduler.cancel('queued') == 'queued'
+    assert scheduler.cancel('queued') is None
+    assert scheduler.cancel('running') == 'running'
+    wait_for(lambda: running.state == 'cancelled')
+    time.sleep(0.05)
+    assert queued.state == 'queued' and ran == []
+    assert scheduler.metrics()['finished'] == {'cancelled': 2}
+    assert scheduler.metrics()['queue_depth'] == 0
+
+
+@pytest.fixture
+def shared_store(db):
+    # Dua JobScheduler dengan satu TaskStore mewakili dua worker proses app.
+    from src.tasks import TaskStore
+    return TaskStore()
+
+
+def test_per_user_limits_span_schedulers(shared_store):
+    first, second = (JobScheduler(workers=2, per_user=1, max_queued_per_user=1, store=shared_store) for _ in range(2))
+    release, ran = threading.Event(), []
+    running_id = shared_store.create(user_id='a')
+    running = first.submit(running_id, release.wait, user='a')
+    wait_for(lambda: running.state == 'running')
+    waiting_id = shared_store.create(user_id='a')
+    waiting = second.submit(waiting_id, ran.append, waiting_id, user='a')
+    time.sleep(0.3)
+    assert waiting.state == 'queued' and ran == []
+    # Tugas pending milik user di proses lain ikut dihitung dalam batas antrean.
+    with pytest.raises(QuotaExceeded):
+        first.submit(shared_store.create(user_id='a'), ran.append, 'x', user='a')
+    release.set()
+    shared_store.update(running_id, status='complete')
+    wait_for(lambda: waiting.state == 'done')
+    assert ran == [waiting_id]
+
+
+def test_cancel_reaches_other_scheduler(shared_store):
+    owner, other = (JobScheduler(workers=1, per_user=1, max_queued_per_user=5, store=shared_store) for _ in range(2))
+    running_id, queued_id = shared_store.create(user_id='a'), shared_store.create(user_id='a')
+    ran = []
+
+    def cancellable():
+        while True:
+            owner.raise_if_cancelled(running_id)
+            time.sleep(0.01)
+
+    running = owner.submit(running_id, cancellable, user='a')
+    queued = owner.submit(queued_id, ran.append, queued_id, user='a')
+    wait_for(lambda: running.state == 'running')
+    assert other.cancel(queued_id) == 'queued'
+    assert other.cancel(running_id) == 'running'
+    assert other.cancel(running_id) is None
+    wait_for(lambda: running.state == 'cancelled' and queued.state == 'cancelled')
+    assert ran == []
+    assert owner.metrics()['finished'] == {'cancelled': 2}
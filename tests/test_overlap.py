@@ -0,0 +1,60 @@
+import pytest
+from src import database, overlap
+from src.data import extract_track_info
+from src.overlap import overlap_analysis
+
+# t1..t6 dengan artis a1..a6, kecuali t6 yang dinyanyikan a1.
+SOURCES = {
+    'playlist_a': ['t1', 't2', 't3', 't4'],
+    'playlist_b': ['t1', 't2', 't3', 't4', 't5'],
+    'playlist_c': ['t5', 't6'],
+    'playlist_d': ['t1', 't2', 't3', 't4', 't1'],
+}
+
+
+@pytest.fixture
+def sources(db, track_item):
+    artist = lambda track_id: 'a1' if track_id == 't6' else f'a{track_id[1:]}'
+    for source_id, track_ids in SOURCES.items():
+        table = extract_track_info([track_item(t, f'Song {t}', artist(t)) for t in track_ids])
+        database.save_tracks_to_db(source_id, table)
+    return [(source_id, source_id[-1].upper()) for source_id in SOURCES]
+
+
+@pytest.fixture(params=['dense', 'sparse'])
+def analyse(request, monkeypatch, sources):
+    original = overlap.get_config_value
+    dense_max = 10 ** 9 if request.param == 'dense' else 0
+    monkeypatch.setattr(overlap, 'get_config_value', lambda section, key, type='int': dense_max if key == 'dense_max_cells' else original(section, key, type))
+    return lambda: overlap_analysis(sources, *database.get_source_incidence([s for s, _ in sources]))
+
+
+def pairs_by_name(pairs):
+    return {frozenset((p['a'], p['b'])): p for p in pairs}
+
+
+def test_pair_scores(analyse):
+    result = analyse()
+    pairs = pairs_by_name(result['pairs'])
+    assert set(pairs) == {frozenset(p) for p in ('AB', 'AD', 'BD', 'BC')}
+    assert (pairs[frozenset('AB')]['shared'], pairs[frozenset('AB')]['jaccard'], pairs[frozenset('AB')]['containment']) == (4, 0.8, 1.0)
+    assert (pairs[frozenset('AD')]['shared'], pairs[frozenset('AD')]['jaccard'], pairs[frozenset('AD')]['containment']) == (4, 1.0, 1.0)
+    assert (pairs[frozenset('BC')]['shared'], pairs[frozenset('BC')]['jaccard'], pairs[frozenset('BC')]['containment']) == (1, round(1 / 6, 4), 0.5)
+    assert pairs[frozenset('BC')]['artist_jaccard'] == 0.4
+    assert (pairs[frozenset('AB')]['smaller'], pairs[frozenset('AB')]['larger']) == ('A', 'B')
+    assert [p['jaccard'] for p in result['pairs']] == sorted((p['jaccard'] for p in result['pairs']), reverse=True)
+
+
+def test_duplicates_subsets_and_sources(analyse):
+    result = analyse()
+    assert set(pairs_by_name(result['duplicates'])) == {frozenset('AD')}
+    assert set(pairs_by_name(result['subsets'])) == {frozenset('AB'), frozenset('BD')}
+    by_name = {s['name']: s for s in result['sources']}
+    assert {name: s['tracks'] for name, s in by_name.items()} == {'A': 4, 'B': 5, 'C': 2, 'D': 4}
+    assert {name: s['exclusive_tracks'] for name, s in by_name.items()} == {'A': 0, 'B': 0, 'C': 1, 'D': 0}
+    assert by_name['C']['closest'] == 'B'
+    assert result['summary'] == {
+        'sources': 4, 'memberships': 15, 'unique_tracks': 6, 'shared_tracks': 5, 'unique_artists': 5, 'overlapping_pairs': 4,
+    }
+    assert result['top_tracks'][0]['sources'] == 3
+    assert {a['artist']: a['sources'] for a in result['top_artists']}['a1'] == 4
@@ -0,0 +1,65 @@
+import json
+import pytest
+from src.results import store_result
+
+
+@pytest.fixture
+def task_id(client):
+    data = {
+        'stats': {'total': 25}, 'profile': {}, 'versions': [], 'groups': [],
+        'genres': [(f'genre {i:02d}', 25 - i) for i in range(25)],
+        'duplicates': [{'name': f'Song {i}', 'artists': 'Rock Band' if i % 5 == 0 else 'Other', 'album': '100%_pure', 'spotify_id': f't{i}', 'external_url': ''} for i in range(7)],
+    }
+    task_id = client.task_store.create(user_id='user')
+    client.task_store.update(task_id, status='complete', result=store_result(f'result-{task_id}', 'analysis', data))
+    return task_id
+
+
+def pages(client, url, **params):
+    items, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor is not None else {}))
+        page = client.get(url, query_string=query).get_json()
+        assert len(page['items']) <= params.get('limit', 100)
+        items += page['items']
+        cursor = page['next_cursor']
+        if cursor is None:
+            return items, page['total']
+
+
+def test_summary_and_section_counts(client, task_id):
+    result = client.task_store.get(task_id)['result']
+    assert result['summary'] == {'stats': {'total': 25}, 'profile': {}}
+    assert result['sections'] == {'genres': 25, 'duplicates': 7, 'versions': 0, 'groups': 0}
+
+
+@pytest.mark.parametrize('limit', [1, 7, 10, 25, 100])
+def test_cursor_paging_returns_every_item_once(client, task_id, limit):
+    items, total = pages(client, f'/results/{task_id}/genres', limit=limit)
+    assert total == 25
+    assert items == [{'genre': f'genre {i:02d}', 'count': 25 - i} for i in range(25)]
+
+
+def test_filter_and_ndjson(client, task_id):
+    items, _ = pages(client, f'/results/{task_id}/duplicates', limit=1, q='ROCK band')
+    assert [item['spotify_id'] for item in items] == ['t0', 't5']
+    # %, _ dan \ di filter dicari apa adanya, bukan sebagai wildcard LIKE.
+    assert len(pages(client, f'/results/{task_id}/duplicates', q='100%_p')[0]) == 7
+    assert pages(client, f'/results/{task_id}/duplicates', q='100_%')[0] == []
+    response = client.get(f'/results/{task_id}/genres', query_string={'format': 'ndjson', 'cursor': 19})
+    assert [json.loads(line)['genre'] for line in response.get_data(as_text=True).splitlines()] == [f'genre {i}' for i in range(20, 25)]
+
+
+def test_section_access(client, task_id):
+    assert client.get(f'/results/{task_id}/missing').status_code == 404
+    with client.session_transaction() as session:
+        session['user_id'] = 'someone else'
+    assert client.get(f'/results/{task_id}/genres').status_code == 404
+
+
+def test_total_follows_filter(client, task_id):
+    url = f'/results/{task_id}/duplicates'
+    assert client.get(url, query_string={'limit': 1}).get_json()['total'] == 7
+    page = client.get(url, query_string={'limit': 1, 'q': 'rock'}).get_json()
+    assert page['total'] == 2 and len(page['items']) == 1
+    assert client.get(url, query_string={'q': 'nothing matches'}).get_json() == {'items': [], 'next_cursor': None, 'total': 0}
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+from fuzzywuzzy import fuzz
+
+from src.similarity import similar_title_pairs
+from src.titles import clean_title
+
+WORDS = ['time', 'after', 'love', 'yesterday', 'remastered', 'night', 'day', 'heart', 'sun', 'moon', 'a', 'i', 'go', 'me',
+         'dance', 'forever', 'young', 'wild', 'wonderwall', 'blue', 'red', 'live', 'mix', 'edit', 'ft', 'x', 'on', 'in']
+
+def adversarial_titles(n, seed=0):
+    # Judul dengan kata umum, tahun/angka berbeda, typo, urutan terbalik, dan kata digabung:
+    # kasus yang skornya ditentukan oleh rasio kedua judul utuh, bukan oleh token bersama.
+    rng = random.Random(seed)
+    titles = []
+    while len(titles) < n:
+        base = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        titles.append(base)
+        for _ in range(rng.randint(0, 3)):
+            kind = rng.randrange(5)
+            if kind == 0:
+                titles.append(f"{base} {rng.randint(1960, 2024)}")
+            elif kind == 1 and len(base) > 3:
+                k = rng.randrange(len(base))
+                titles.append(base[:k] + rng.choice('abcdefxyz0123456789 ') + base[k + 1:])
+            elif kind == 2:
+                titles.append(' '.join(reversed(base.split())) + ' ' + rng.choice(WORDS))
+            elif kind == 3:
+                titles.append(base.replace(' ', '', 1))
+            else:
+                titles.append(f"{base} - {rng.choice(['remastered', 'live', 'radio edit', 'demo'])} {rng.randint(1, 20)}")
+    return titles[:n]
+
+def legacy_pairs(titles, threshold):
+    # Loop O(n^2) versi awal find_similar_titles_enhanced.
+    return {
+        (i, j): fuzz.token_set_ratio(titles[i], titles[j])
+        for i in range(len(titles)) for j in range(i + 1, len(titles))
+        if fuzz.token_set_ratio(titles[i], titles[j]) >= threshold
+    }
+
+def engine_pairs(titles, threshold, method):
+    left, right, scores = similar_title_pairs(titles, threshold, method=method)
+    return dict(zip(zip(left.tolist(), right.tolist()), scores.tolist()))
+
+@pytest.mark.parametrize('method', ['blocking', 'exhaustive'])
+@pytest.mark.parametrize('threshold', [85, 70, 60])
+def test_engine_matches_legacy_loop(method, threshold):
+    titles = [clean_title(t) for t in adversarial_titles(300, seed=3)]
+    assert engine_pairs(titles, threshold, method) == legacy_pairs(titles, threshold)
+
+@pytest.mark.parametrize('a, b', [
+    ('Yesterday - Remastered 2009', 'Yesterday - Remastered 2015'),
+    ('Time After Time 1984', 'Time After Time 2019'),
+])
+def test_blocking_finds_pairs_scored_on_full_titles(a, b):
+    titles = [clean_title(a), clean_title(b)]
+    assert fuzz.token_set_ratio(*titles) >= 85
+    assert engine_pairs(titles, 85, 'blocking') == {(0, 1): fuzz.token_set_ratio(*titles)}
+
+def test_empty_titles_never_match():
+    titles = ['', 'love song', '', 'love songs']
+    assert engine_pairs(titles, 50, 'blocking') == legacy_pairs(titles, 50) == {(1, 3): fuzz.token_set_ratio(titles[1], titles[3])}
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        similar_title_pairs(['a b', 'a c'], 85, method='minhash')
@@ -0,0 +1,73 @@
+import time
+import pytest
+from src import tasks
+from src.database import get_db_connection, has_result_set, put_result_set
+from src.tasks import TaskStore
+
+
+@pytest.fixture
+def store(db, monkeypatch):
+    limits = {'ttl_hours': 1.0, 'max_tasks': 100}
+    original = tasks.get_config_value
+    monkeypatch.setattr(tasks, 'get_config_value', lambda section, key, type='int': limits[key] if section == 'Tasks' and key in limits else original(section, key, type))
+    store = TaskStore()
+    store.limits = limits
+    return store
+
+
+def set_updated_at(task_id, updated_at):
+    with get_db_connection() as conn:
+        conn.execute("UPDATE tasks SET updated_at = ? WHERE id = ?", (updated_at, task_id))
+        conn.commit()
+
+
+def test_update_and_events(store):
+    task_id = store.create(user_id='u', kind='analysis')
+    store.update(task_id, status='running', progress=10)
+    store.update(task_id, result={'tracks': [{'status': 'queued'}]})
+    store.update_track(task_id, 0, status='done')
+    task = store.get(task_id)
+    assert (task['status'], task['progress'], task['user_id'], task['seq']) == ('running', 10, 'u', 3)
+    assert task['result']['tracks'][0]['status'] == 'done'
+    assert store.events_since(task_id, 1) == [(2, {'result': {'tracks': [{'status': 'queued'}]}}), (3, {'track': {'status': 'done', 'index': 0}})]
+    assert store.update('missing', status='x') is None
+
+
+def test_expired_tasks_are_evicted(store):
+    old, fresh = store.create(), store.create()
+    store.update(old, status='complete')
+    set_updated_at(old, time.time() - 2 * 3600)
+    store.evict()
+    assert store.get(old) is None and store.events_since(old, 0) == []
+    assert store.get(fresh) is not None
+
+
+def test_oldest_tasks_are_evicted_beyond_max(store):
+    task_ids = [store.create() for _ in range(5)]
+    now = time.time()
+    for age, task_id in enumerate(reversed(task_ids)):
+        set_updated_at(task_id, now - age)
+    store.limits['max_tasks'] = 3
+    store.evict()
+    assert [store.get(task_id) is not None for task_id in task_ids] == [False, False, True, True, True]
+
+
+def test_unreferenced_result_sets_are_pruned(store):
+    task_id = store.create()
+    for result_id in ('kept', 'orphan', 'recent'):
+        put_result_set(result_id, 'analysis', {'genres': [('rock', '{}')]})
+    store.update(task_id, status='complete', result={'result_id': 'kept'})
+    with get_db_connection() as conn:
+        conn.execute("UPDATE result_sets SET created_at = ? WHERE id != 'recent'", (time.time() - 2 * tasks.RESULT_GRACE_SECONDS,))
+        conn.commit()
+    store.evict()
+    assert [has_result_set(result_id) for result_id in ('kept', 'orphan', 'recent')] == [True, False, True]
+    with get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM result_rows WHERE result_id = 'orphan'").fetchone()[0] == 0
+
+
+def test_update_converts_numpy_values(store):
+    import numpy as np
+    task_id = store.create()
+    store.update(task_id, result={np.int64(3): [np.float32(0.5), np.nan, float('nan')], 'array': np.arange(3), 'flag': np.bool_(True), 'nested': ({'x': np.str_('a')},)})
+    assert store.get(task_id)['result'] == {'3': [0.5, None, None], 'array': [0, 1, 2], 'flag': True, 'nested': [{'x': 'a'}]}
@@ -0,0 +1,35 @@
+import random
+import re
+import pytest
+from src.titles import COMMON_WORDS, clean_title, clean_titles
+
+
+def legacy_clean_title(title):
+    common_words = ['feat', 'ft', 'remix', 'remastered', 'live', 'acoustic', 'version', 'edit', 'original', 'radio', 'mix']
+    title_lower = title.lower()
+    for word in common_words:
+        title_lower = title_lower.replace(f' {word} ', ' ').replace(f'({word})', ' ').replace(f'[{word}]', ' ')
+    cleaned = re.sub(r'[^a-z0-9\s]', ' ', title_lower)
+    return ' '.join(cleaned.split())
+
+
+def random_titles(n, seed):
+    # Potongan yang sengaja memancing kata umum berdempetan, bertumpuk dan di dalam kurung.
+    rng = random.Random(seed)
+    pieces = list(COMMON_WORDS) + [w.upper() for w in COMMON_WORDS] + ['love', 'Song', 'x', 'mixed', 'edits', '2009', 'Ft.', 'café']
+    separators = [' ', '  ', '(', ')', '[', ']', ' (', ') ', ' - ', '/', '.', '\t', '']
+    for _ in range(n):
+        yield ''.join(rng.choice(pieces) + rng.choice(separators) for _ in range(rng.randint(1, 8)))
+
+
+@pytest.mark.parametrize('title', [
+    'Song (feat. Artist)', 'Song - Remastered 2009', 'Song (Live) [Radio Edit]', 'Song feat ft mix',
+    'Song (feat)ft remix', ' mix  mix ', '[edit](edit)', '', 'Ünïcode Söng (Acoustic Version)',
+])
+def test_clean_title_matches_legacy_examples(title):
+    assert clean_title(title) == legacy_clean_title(title)
+
+
+def test_clean_title_matches_legacy_random():
+    titles = list(random_titles(20000, seed=7))
+    assert clean_titles(titles) == [legacy_clean_title(t) for t in titles]
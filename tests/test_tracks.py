@@ -0,0 +1,22 @@
+from src import database
+from src.data import extract_track_info
+
+
+def test_with_features_keeps_track_columns(track_item):
+    table = extract_track_info([track_item('t1', 'Song', 'A'), track_item('t2', 'Other', 'B'), track_item('t1', 'Song', 'A')])
+    features = [
+        {'id': 't1', 'danceability': 0.5, 'energy': 0.7, 'duration_ms': 1, 'uri': 'spotify:track:t1', 'type': 'audio_features'},
+        {'id': 't2', 'danceability': 0.1, 'energy': 0.2, 'duration_ms': 2, 'uri': 'spotify:track:t2', 'type': 'audio_features'},
+    ]
+    merged = table.with_features(features).tracks
+    assert merged['duration_ms'].tolist() == [200000, 200000, 200000]
+    assert merged['danceability'].tolist() == [0.5, 0.1, 0.5]
+    assert not {'duration_ms_x', 'duration_ms_y', 'uri', 'type'} & set(merged.columns)
+    assert len(table.with_features(features).with_features(features[:1]).tracks.columns) == len(merged.columns)
+
+
+def test_features_round_trip_through_database(db, track_item):
+    table = extract_track_info([track_item('t1', 'Song', 'A')])
+    database.save_tracks_to_db('playlist_x', table.with_features([{'id': 't1', 'energy': 0.7, 'duration_ms': 1}]))
+    stored = database.get_tracks_from_db('playlist_x').tracks
+    assert (stored['duration_ms'].tolist(), stored['energy'].tolist()) == ([200000], [0.7])
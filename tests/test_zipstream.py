@@ -0,0 +1,55 @@
+import io
+import os
+import zipfile
+import zlib
+import pytest
+from src.zipstream import Member, ZipPlan, ZipStream
+
+
+@pytest.fixture
+def members(tmp_path):
+    contents = {'a.mp3': os.urandom(70000), 'Lagu é (2).mp3': b'', 'c.flac': os.urandom(1234)}
+    result = []
+    for name, data in contents.items():
+        path = tmp_path / f'{len(result)}.bin'
+        path.write_bytes(data)
+        result.append(Member(name, str(path), len(data), zlib.crc32(data), 1700000000))
+    return contents, result
+
+
+def check_archive(archive, contents):
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == list(contents)
+        for name, data in contents.items():
+            assert zf.read(name) == data
+
+
+def test_plan_round_trip(members):
+    contents, members = members
+    plan = ZipPlan(members)
+    archive = b''.join(plan.iter_range(0, plan.length, 4096))
+    assert len(archive) == plan.length
+    check_archive(archive, contents)
+
+
+def test_plan_range_slices(members):
+    _, members = members
+    plan = ZipPlan(members)
+    archive = b''.join(plan.iter_range(0, plan.length, 4096))
+    # Batas di dalam header, di dalam file, tepat di batas segmen, dan di direktori pusat.
+    cuts = sorted({0, 1, 29, 30, 1000, 70000, plan.segments[2][0], plan.segments[-1][0], plan.length - 5, plan.length})
+    for start in cuts:
+        for stop in cuts:
+            if start <= stop:
+                assert b''.join(plan.iter_range(start, stop, 333)) == archive[start:stop]
+
+
+def test_stream_matches_plan(members):
+    contents, members = members
+    stream = ZipStream(4096)
+    archive = b''.join(chunk for member in members for chunk in stream.add(member)) + stream.finish()
+    check_archive(archive, contents)
+    fresh = [Member(m.name.decode('utf-8'), m.path, m.size, m.crc32, m.mtime) for m in members]
+    plan = ZipPlan(fresh)
+    assert archive == b''.join(plan.iter_range(0, plan.length, 4096))